@@ -1,19 +1,160 @@
-from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, Optional
 import jwt
-from fastapi import HTTPException, status
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from app.backend.core.cache import TTLCache
 from app.backend.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 def create_jwt_token(data: dict, expires_minutes: int = 30):
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=expires_minutes)
-    to_encode.update({"exp": expire})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(minutes=expires_minutes)
+    # jti lets a single token be revoked before it expires
+    to_encode.update({"exp": expire, "iat": now, "jti": to_encode.get("jti") or uuid.uuid4().hex})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
-def verify_jwt_token(token: str):
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenCache:
+    """Verified claims keyed by token digest, valid until the token's ``exp``.
+
+    A hit skips signature verification entirely. Revoked tokens (by digest
+    or by ``jti``) are dropped from the cache and refused on later lookups.
+    With a Mongo ``collection``, revocations are stored there and ``watch``
+    polls it, so a token revoked through one worker is refused by all of them.
+    """
+
+    def __init__(self, maxsize: int = 10000, collection=None):
+        self._claims = TTLCache(maxsize=maxsize, ttl=0)
+        self._revoked: Dict[str, float] = {}
+        self._lock = Lock()
+        self._collection = collection
+
+    def use_collection(self, collection) -> None:
+        self._collection = collection
+
+    def get(self, token: str) -> Optional[dict]:
+        claims = self._claims.get(token_digest(token))
+        if claims is not None and self.is_revoked(token, claims):
+            return None
+        return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        remaining = claims.get("exp", 0) - time.time()
+        if remaining > 0:
+            self._claims.set(token_digest(token), claims, ttl=remaining)
+
+    def _remember(self, revoked: Dict[str, float]) -> None:
+        with self._lock:
+            now = time.time()
+            # Entries past the token's own exp are useless; prune them on each write
+            for key in [k for k, t in self._revoked.items() if t < now]:
+                del self._revoked[key]
+            self._revoked.update(revoked)
+            for key in revoked:
+                if not key.startswith("jti:"):
+                    self._claims.pop(key)
+
+    async def revoke(
+        self, token: Optional[str] = None, jti: Optional[str] = None, expires_at: Optional[float] = None
+    ) -> None:
+        """Revoke a token or a jti; the entry is kept until ``expires_at``.
+
+        ``expires_at`` defaults to the token's own ``exp``, so the revocation
+        lasts as long as the token could be used. A bare jti (or a token that
+        cannot be decoded) is kept for one day.
+        """
+        until = expires_at or (token and _expiry(token)) or time.time() + 86400
+        keys = ([token_digest(token)] if token else []) + ([f"jti:{jti}"] if jti else [])
+        self._remember(dict.fromkeys(keys, until))
+        if self._collection is not None:
+            expires = datetime.fromtimestamp(until, timezone.utc)
+            for key in keys:
+                await self._collection.update_one({"_id": key}, {"$set": {"expires_at": expires}}, upsert=True)
+
+    async def load(self) -> int:
+        """Pick up revocations made by other workers; returns how many are in force."""
+        if self._collection is None:
+            return len(self._revoked)
+        # A TTL index drops expired entries, so this stays as small as the set of live revocations
+        docs = await self._collection.find({"expires_at": {"$gt": datetime.now(timezone.utc)}}).to_list(None)
+        self._remember({doc["_id"]: _timestamp(doc["expires_at"]) for doc in docs})
+        return len(self._revoked)
+
+    async def watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.load()
+            except Exception:
+                logger.exception("Token revocation refresh failed")
+
+    def is_revoked(self, token: str, claims: Optional[dict] = None) -> bool:
+        if not self._revoked:
+            return False
+        if token_digest(token) in self._revoked:
+            return True
+        return bool(claims and f"jti:{claims.get('jti')}" in self._revoked)
+
+    def stats(self) -> dict:
+        return {**self._claims.stats(), "revoked": len(self._revoked)}
+
+
+def _expiry(token: str) -> Optional[float]:
+    # Already-expired tokens are still revoked; the entry is pruned on the next write
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        claims = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM], options={"verify_exp": False}
+        )
+    except jwt.InvalidTokenError:
+        return None
+    return claims.get("exp")
+
+
+def _timestamp(value: datetime) -> float:
+    # Mongo hands back naive UTC datetimes unless the client is tz_aware
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+token_cache = TokenCache(maxsize=settings.TOKEN_CACHE_SIZE)
+
+def verify_jwt_token(token: str, cache: Optional[TokenCache] = None):
+    if cache is None:
+        cache = token_cache
+    payload = cache.get(token)
+    if payload is not None:
         return payload
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    if cache.is_revoked(token, payload):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    cache.put(token, payload)
+    return payload
+
+bearer_scheme = HTTPBearer()
+
+# Async so the (usually cached) check runs on the loop instead of a threadpool hop
+async def get_current_claims(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> dict:
+    return verify_jwt_token(credentials.credentials)
+
+async def require_admin(claims: dict = Depends(get_current_claims)) -> dict:
+    if claims.get("role") != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return claims
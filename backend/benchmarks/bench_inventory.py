@@ -0,0 +1,126 @@
+"""Reservation throughput on one hot product, by number of stock shards.
+
+    python -m app.backend.benchmarks.bench_inventory --stock 5000 --requests 8000 --concurrency 200
+    python -m app.backend.benchmarks.bench_inventory --backend mongo --shards 1 8 32
+
+Runs ``core.inventory.reserve`` from many concurrent buyers against a single
+product until it sells out, once per shard count, and checks that no more
+units were sold than were stocked.
+
+The ``memory`` backend has no write contention of its own, so by default it
+serialises writes per counter and holds each one for ``--write-ms``, the way
+a document or row lock does in a database. ``mongo`` (MONGO_URL/DB_NAME) and
+``sql`` (DATABASE_URL) use a real database; SQLite allows one writer at a
+time, so shards only help on server databases.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_inventory.db')}")
+
+from app.backend.core.inventory import OutOfStock, reserve, set_stock  # noqa: E402
+from app.backend.db.repository import MemoryRepository, create_repository  # noqa: E402
+
+PRODUCT_ID = "bench-launch-product"
+
+
+class LockedCounters(MemoryRepository):
+    """Memory backend whose stock writes queue per counter, like document locks."""
+
+    def __init__(self, write_ms: float):
+        super().__init__()
+        self.write_s = write_ms / 1000
+        self.locks = defaultdict(asyncio.Lock)
+
+    async def _locked(self, product_id: str, shard: int, write):
+        async with self.locks[(product_id, shard)]:
+            await asyncio.sleep(self.write_s)
+            return await write(product_id, shard)
+
+    async def take_stock(self, product_id: str, shard: int, quantity: int) -> bool:
+        take = super().take_stock
+        return await self._locked(product_id, shard, lambda p, s: take(p, s, quantity))
+
+    async def return_stock(self, product_id: str, shard: int, quantity: int) -> None:
+        give = super().return_stock
+        await self._locked(product_id, shard, lambda p, s: give(p, s, quantity))
+
+
+def open_repository(backend: str, write_ms: float):
+    if backend == "memory":
+        return LockedCounters(write_ms)
+    db = None
+    if backend == "mongo":
+        from app.backend.db.mongo import connect_from_env
+
+        _, db = connect_from_env()
+    return create_repository(backend, db=db)
+
+
+async def run(repository, shards: int, stock: int, requests: int, concurrency: int, max_quantity: int) -> dict:
+    await set_stock(repository, PRODUCT_ID, stock, shards)
+    rng = random.Random(42)
+    queue = iter([rng.randint(1, max_quantity) for _ in range(requests)])
+    latencies, sold, refused = [], 0, 0
+
+    async def buyer():
+        nonlocal sold, refused
+        for quantity in queue:
+            start = time.perf_counter()
+            try:
+                allocations = await reserve(repository, [(PRODUCT_ID, quantity)], rng)
+                sold += sum(a["quantity"] for a in allocations)
+            except OutOfStock:
+                refused += 1
+            latencies.append(time.perf_counter() - start)
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(buyer() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_start
+
+    left = sum((await repository.inventory([PRODUCT_ID]))[PRODUCT_ID])
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)  # noqa: E731
+    return {
+        "reservations_per_s": round(requests / wall, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+        "sold": sold,
+        "refused": refused,
+        "left": left,
+        "consistent": sold <= stock and sold + left == stock,
+    }
+
+
+async def main(args) -> None:
+    repository = open_repository(args.backend, args.write_ms)
+    await repository.init()
+    print(
+        f"{args.backend}: stock {args.stock}, {args.requests} requests of 1-{args.max_quantity} units, "
+        f"concurrency {args.concurrency}"
+    )
+    try:
+        for shards in args.shards:
+            result = await run(repository, shards, args.stock, args.requests, args.concurrency, args.max_quantity)
+            print(f"{shards:>3} shards: " + "  ".join(f"{k}={v}" for k, v in result.items()))
+    finally:
+        await repository.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "mongo", "sql"], default="memory")
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--stock", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--max-quantity", type=int, default=2)
+    parser.add_argument("--write-ms", type=float, default=1.0, help="simulated write lock hold time (memory only)")
+    asyncio.run(main(parser.parse_args()))
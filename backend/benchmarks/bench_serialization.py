@@ -0,0 +1,103 @@
+"""CPU cost per request of the catalog response path, before and after FAST_JSON_RESPONSES.
+
+    python -m app.backend.benchmarks.bench_serialization --items 50 --requests 2000
+
+Runs the real list_products handler in process against canned documents
+(no database), once through response_model validation and once through the
+orjson fast path. It reports CPU time per full request (including the
+in-process HTTP client) and for the response serialization step alone.
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timezone
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "enpixels_bench")
+
+import httpx  # noqa: E402
+from fastapi import Response  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+from app.backend import server  # noqa: E402
+
+
+def make_products(count: int) -> list:
+    return [
+        {
+            "id": str(uuid.uuid4()),
+            "title": f"Geometric Poster {i}",
+            "description": "Abstract poster designs in high-res PNG & PSD.",
+            "price": 22.0 + i,
+            "currency": "USD",
+            "category_slug": ("digital", "prints", "local")[i % 3],
+            "image_url": server.SAMPLE_IMAGES[i % len(server.SAMPLE_IMAGES)],
+            "created_at": datetime.now(timezone.utc),
+        }
+        for i in range(count)
+    ]
+
+
+async def measure(client: httpx.AsyncClient, url: str, requests: int) -> dict:
+    await client.get(url)  # warm caches
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(url)
+        response.raise_for_status()
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    return {"cpu_us_per_request": round(cpu / requests * 1e6, 1), "rps": round(requests / wall, 1)}
+
+
+async def measure_serialization(products: list, requests: int) -> dict:
+    route = next(r for r in server.app.routes if getattr(r, "path", None) == "/api/products" and "GET" in r.methods)
+    timings = {}
+    cpu_start = time.process_time()
+    for _ in range(requests):
+        content = await serialize_response(field=route.response_field, response_content=products, is_coroutine=True)
+        JSONResponse(content).body
+    timings["validated"] = time.process_time() - cpu_start
+    server.encoded_products.clear()
+    cpu_start = time.process_time()
+    for _ in range(requests):
+        server.catalog_response(products, Response()).body
+    timings["fast"] = time.process_time() - cpu_start
+    return {name: round(cpu / requests * 1e6, 1) for name, cpu in timings.items()}
+
+
+async def run(items: int, requests: int) -> dict:
+    products = make_products(items)
+    # Serve list_products from a warm catalog cache so only serialization is measured
+    server.catalog_cache.set(("list", None, None, items), products)
+    transport = httpx.ASGITransport(app=server.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for fast in (False, True):
+            server.settings.FAST_JSON_RESPONSES = fast
+            server.encoded_products.clear()
+            results["fast" if fast else "validated"] = await measure(client, f"/api/products?limit={items}", requests)
+    server.settings.FAST_JSON_RESPONSES = True
+    for name, cpu_us in (await measure_serialization(products, requests)).items():
+        results[name]["serialize_cpu_us"] = cpu_us
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    results = asyncio.run(run(args.items, args.requests))
+    for name, result in results.items():
+        print(
+            f"{name:>10}: {result['cpu_us_per_request']:>8} us CPU/request  {result['rps']:>8} req/s  "
+            f"{result['serialize_cpu_us']:>8} us serializing"
+        )
+    for key, label in (("cpu_us_per_request", "request"), ("serialize_cpu_us", "serialization")):
+        print(f"{label:>14} speedup: {results['validated'][key] / results['fast'][key]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
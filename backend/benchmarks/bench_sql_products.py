@@ -0,0 +1,111 @@
+"""Concurrent read throughput of the SQL product routes: sync Session vs async engine.
+
+    python -m app.backend.benchmarks.bench_sql_products --rows 500 --concurrency 50 --requests 5000
+
+Seeds a throwaway SQLite file (WAL mode, see db/connection.py) and drives two
+in-process apps with the same list/get endpoints: the previous sync ``def``
+handlers on a blocking Session (each request takes a threadpool slot) and the
+async handlers from routes/product_routes.py. Set DATABASE_URL to benchmark
+another database.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_products.db')}")
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI, HTTPException  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.backend.db.connection import Base, SessionLocal, async_engine, engine, get_db  # noqa: E402
+from app.backend.models.product_model import Product  # noqa: E402
+from app.backend.routes import product_routes  # noqa: E402
+from app.backend.schemas.product_schema import ProductResponse  # noqa: E402
+
+
+def sync_app() -> FastAPI:
+    """The handlers as they were before the async engine."""
+    app = FastAPI()
+
+    @app.get("/products/", response_model=list[ProductResponse])
+    def get_products(db: Session = Depends(get_db)):
+        return db.query(Product).all()
+
+    @app.get("/products/{product_id}", response_model=ProductResponse)
+    def get_product(product_id: int, db: Session = Depends(get_db)):
+        product = db.query(Product).filter(Product.id == product_id).first()
+        if not product:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return product
+
+    return app
+
+
+def async_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(product_routes.router, prefix="/products")
+    return app
+
+
+def seed(rows: int) -> None:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        db.add_all(Product(name=f"Product {i}", description="Benchmark row", price=10.0 + i) for i in range(rows))
+        db.commit()
+
+
+async def run(app: FastAPI, rows: int, requests: int, concurrency: int, list_ratio: float) -> dict:
+    rng = random.Random(42)
+    paths = [
+        "/products/" if rng.random() < list_ratio else f"/products/{rng.randint(1, rows)}" for _ in range(requests)
+    ]
+    queue = iter(paths)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await client.get("/products/1")  # warm the pool and statement caches
+
+        async def worker():
+            for path in queue:
+                start = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    pct = lambda p: round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2)  # noqa: E731
+    return {
+        "rps": round(requests / wall, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+async def main(args) -> None:
+    seed(args.rows)
+    print(f"{engine.url}: {args.rows} rows, {args.requests} requests, concurrency {args.concurrency}")
+    for name, app in (("sync", sync_app()), ("async", async_app())):
+        result = await run(app, args.rows, args.requests, args.concurrency, args.list_ratio)
+        print(f"{name:>6}: " + "  ".join(f"{k}={v}" for k, v in result.items()))
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--list-ratio", type=float, default=0.1, help="share of requests that list all products")
+    asyncio.run(main(parser.parse_args()))
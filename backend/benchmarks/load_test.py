@@ -0,0 +1,273 @@
+"""In-process load test: mixed shopper traffic against the full API stack.
+
+    python -m app.backend.benchmarks.load_test --duration 20 --concurrency 64 --out results.json
+    python -m app.backend.benchmarks.load_test --out after.json --compare before.json
+
+Starts the app in this process (startup hooks included) on the in-memory
+storage backend by default, so the numbers measure the API layer rather than
+a database. ``--backend sql`` uses a throwaway SQLite file, ``--backend mongo``
+the MONGO_URL/DB_NAME from the environment and ``--backend mongomock`` the
+mongomock-motor stand-in when it is installed.
+
+Each virtual user loops over a weighted mix of scenarios (browse, search,
+product detail, order, checkout) through an httpx ASGI client. Results are
+reported per endpoint (requests, errors, RPS, mean, p50/p95/p99) and can be
+saved as JSON together with the commit and settings they were taken at;
+``--compare`` prints the change against an earlier result file.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+SCENARIOS = {
+    "browse": 40,
+    "search": 20,
+    "detail": 25,
+    "order": 10,
+    "checkout": 5,
+}
+
+SEARCH_TERMS = ["poster", "print", "minimal", "geometric", "brand kit", "typography", "cards", "postr"]
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def configure_backend(backend: str) -> None:
+    """Environment for app.backend.server; must run before it is imported."""
+    os.environ["STORAGE_BACKEND"] = "mongo" if backend == "mongomock" else backend
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "enpixels_loadtest")
+    if backend == "sql":
+        os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'loadtest.db')}")
+
+
+def use_mongomock(server) -> None:
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("--backend mongomock needs the mongomock-motor package")
+    from app.backend.db.mongo_repository import MongoRepository
+
+    server.client = AsyncMongoMockClient(tz_aware=True)
+    server.db = server.client[os.environ["DB_NAME"]]
+    server.repository = MongoRepository(server.db)
+    server.idempotency._collection = server.db.idempotency_keys
+    server.catalog_version = server.CatalogVersion(server.repository)
+
+
+async def seed_products(server, count: int) -> None:
+    rng = random.Random(7)
+    words = ["Minimal", "Geometric", "Poster", "Print", "Brand", "Mockup", "Typography", "Flyer", "Card", "Kit"]
+    docs = [
+        server.Product(
+            title=" ".join(rng.sample(words, 3)) + f" {i}",
+            description=" ".join(rng.sample(words, 5)),
+            price=round(rng.uniform(5, 80), 2),
+            category_slug=rng.choice(["digital", "prints", "local"]),
+            image_url=server.SAMPLE_IMAGES[i % len(server.SAMPLE_IMAGES)],
+        ).model_dump()
+        for i in range(count)
+    ]
+    for start in range(0, len(docs), 500):
+        batch = docs[start:start + 500]
+        await server.repository.insert_products(batch)
+        await server.catalog_changed(batch)
+
+
+class LoadTest:
+    def __init__(self, client, product_ids: List[str], seed: int = 1):
+        self.client = client
+        self.product_ids = product_ids
+        self.rng = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    async def request(self, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        if self.recording:
+            self.latencies[name].append(time.perf_counter() - start)
+            if not ok:
+                self.errors[name] += 1
+        # A request served entirely from memory never suspends; without this one
+        # user could monopolise the loop, which a socket-backed server never does
+        await asyncio.sleep(0)
+        return response if ok else None
+
+    def cart(self) -> dict:
+        items = [{"product_id": pid, "quantity": self.rng.randint(1, 3)} for pid in self.rng.sample(self.product_ids, 2)]
+        return {"email": f"load{self.rng.randint(1, 500)}@example.com", "name": "Load Test", "items": items}
+
+    async def browse(self):
+        await self.request("GET /api/categories", "GET", "/api/categories")
+        category = self.rng.choice([None, "digital", "prints", "local"])
+        params = {"category": category} if category else {}
+        await self.request("GET /api/products", "GET", "/api/products", params=params)
+        page = await self.request("GET /api/products/page", "GET", "/api/products/page", params={**params, "limit": 24})
+        cursor = page.json().get("next_cursor") if page is not None else None
+        if cursor:
+            await self.request(
+                "GET /api/products/page", "GET", "/api/products/page", params={**params, "limit": 24, "cursor": cursor}
+            )
+
+    async def search(self):
+        await self.request("GET /api/products?q", "GET", "/api/products", params={"q": self.rng.choice(SEARCH_TERMS)})
+
+    async def detail(self):
+        product_id = self.rng.choice(self.product_ids)
+        await self.request("GET /api/products/{id}", "GET", f"/api/products/{product_id}")
+
+    async def order(self):
+        order = await self.request("POST /api/orders", "POST", "/api/orders", json=self.cart())
+        if order is not None:
+            order_id = order.json()["id"]
+            await self.request("GET /api/orders/{id}", "GET", f"/api/orders/{order_id}")
+            await self.request("POST /api/checkout/session", "POST", "/api/checkout/session", json={"order_id": order_id})
+
+    async def checkout(self):
+        await self.request("POST /api/checkout", "POST", "/api/checkout", json=self.cart())
+
+    async def user(self, deadline: float):
+        names, weights = list(SCENARIOS), list(SCENARIOS.values())
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(names, weights)[0])()
+
+    async def run(self, concurrency: int, duration: float, warmup: float) -> float:
+        await asyncio.gather(*(self.user(time.perf_counter() + warmup) for _ in range(concurrency)))
+        self.recording = True
+        start = time.perf_counter()
+        await asyncio.gather(*(self.user(start + duration) for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+    def report(self, elapsed: float) -> Dict[str, dict]:
+        endpoints = {}
+        everything = []
+        for name, values in sorted(self.latencies.items()):
+            everything.extend(values)
+            endpoints[name] = summarize(sorted(values), self.errors[name], elapsed)
+        endpoints["ALL"] = summarize(sorted(everything), sum(self.errors.values()), elapsed)
+        return endpoints
+
+
+def summarize(values: List[float], errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 1),
+        "mean_ms": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=Path(__file__).parent, timeout=5
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_table(endpoints: Dict[str, dict], baseline: Optional[Dict[str, dict]] = None) -> None:
+    header = f"{'endpoint':<28}{'reqs':>8}{'err':>6}{'rps':>9}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline is not None:
+        header += f"{'Δrps':>9}{'Δp95':>9}"
+    print(header)
+    for name, r in endpoints.items():
+        line = (
+            f"{name:<28}{r['requests']:>8}{r['errors']:>6}{r['rps']:>9}"
+            f"{r['mean_ms']:>9}{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}"
+        )
+        base = (baseline or {}).get(name)
+        if base:
+            line += f"{change(r['rps'], base['rps']):>9}{change(r['p95_ms'], base['p95_ms']):>9}"
+        print(line)
+
+
+def change(current: float, previous: float) -> str:
+    if not previous:
+        return "n/a"
+    return f"{(current - previous) / previous * 100:+.1f}%"
+
+
+async def main(args) -> dict:
+    configure_backend(args.backend)
+    import httpx
+
+    from app.backend import server
+
+    if args.backend == "mongomock":
+        use_mongomock(server)
+
+    await server.app.router.startup()
+    try:
+        if args.products:
+            await seed_products(server, args.products)
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            products = (await client.get("/api/products", params={"limit": 500})).json()
+            test = LoadTest(client, [p["id"] for p in products], seed=args.seed)
+            elapsed = await test.run(args.concurrency, args.duration, args.warmup)
+    finally:
+        await server.app.router.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "taken_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "catalog_size": len(products),
+        "scenarios": SCENARIOS,
+        "settings": {"FAST_JSON_RESPONSES": server.settings.FAST_JSON_RESPONSES},
+        "endpoints": test.report(elapsed),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sql", "mongo", "mongomock"], default="memory")
+    parser.add_argument("--concurrency", type=int, default=32, help="virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds before the run")
+    parser.add_argument("--products", type=int, default=200, help="synthetic products added on top of the seed data")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="write results to this JSON file")
+    parser.add_argument("--compare", help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    baseline = None
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text())
+        baseline = previous["endpoints"]
+        print(f"compared with {args.compare} (commit {previous.get('commit')}, backend {previous.get('backend')})")
+    print(f"{result['backend']} backend, {result['concurrency']} users, {result['duration_s']}s, commit {result['commit']}")
+    print_table(result["endpoints"], baseline)
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2) + "\n")
+        print(f"saved {args.out}")
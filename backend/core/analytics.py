@@ -0,0 +1,245 @@
+"""Sales rollups kept up to date on every order write, plus a pandas backfill.
+
+Each order adds to rollup rows keyed by (day, category, delivery method,
+status), with counters ``orders``, ``units`` and ``revenue_cents``:
+
+- one row under category ``all`` for the order as a whole (revenue is the
+  order total, delivery fee included)
+- one row per product category in the order (revenue is that category's
+  item subtotal)
+
+A status change moves the order's contribution from the old status's rows
+to the new one's. Dashboard queries read only the rollups of the days asked
+for, so their cost depends on the date range and not on the number of orders.
+
+Rollups can drift if a process dies between an order write and its rollup
+update; ``backfill`` rebuilds them from the orders::
+
+    python -m app.backend.core.analytics --batch-size 5000
+"""
+import asyncio
+import json
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+
+from app.backend.db.repository import ROLLUP_COUNTERS, ROLLUP_KEY, Repository, utc
+
+ALL = "all"
+UNKNOWN = "unknown"
+# Statuses counted by default: every order that was placed and not cancelled
+PLACED_STATUSES = ("created", "pending_payment", "paid", "fulfilled")
+
+ProductLoader = Callable[[Iterable[str]], Awaitable[Dict[str, Optional[dict]]]]
+
+
+def cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def rollup_rows(order: dict, status: Optional[str] = None, sign: int = 1) -> List[dict]:
+    """Rollup increments for ``order`` counted under ``status`` (default: its own); ``sign=-1`` removes them.
+
+    Items need ``unit_price`` and ``category_slug``, as stored by create_order.
+    """
+    key = {
+        "day": utc(order["created_at"]).date().isoformat(),
+        "delivery_method": order.get("delivery_method") or "digital",
+        "status": status or order["status"],
+    }
+    categories: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    for item in order["items"]:
+        totals = categories[item.get("category_slug") or UNKNOWN]
+        totals[0] += item["quantity"]
+        totals[1] += cents(item.get("unit_price") or 0) * item["quantity"]
+    rows = [
+        {
+            **key,
+            "category": ALL,
+            "orders": sign,
+            "units": sign * sum(units for units, _ in categories.values()),
+            "revenue_cents": sign * cents(order["total"]),
+        }
+    ]
+    for category, (units, revenue) in categories.items():
+        rows.append({**key, "category": category, "orders": sign, "units": sign * units, "revenue_cents": sign * revenue})
+    return rows
+
+
+async def with_item_prices(order: dict, load_products: ProductLoader) -> dict:
+    """``order`` with catalog prices/categories filled in for items stored without them (older orders)."""
+    missing = [i["product_id"] for i in order["items"] if i.get("unit_price") is None]
+    if not missing:
+        return order
+    products = await load_products(missing)
+    items = []
+    for item in order["items"]:
+        product = products.get(item["product_id"]) or {}
+        if item.get("unit_price") is None:
+            item = {**item, "unit_price": product.get("price", 0), "category_slug": product.get("category_slug")}
+        items.append(item)
+    return {**order, "items": items}
+
+
+async def record_order(repository: Repository, order: dict) -> None:
+    await repository.add_rollups(rollup_rows(order))
+
+
+async def move_order(repository: Repository, order: dict, status: str, load_products: ProductLoader) -> None:
+    """Move ``order``'s contribution from its current status to ``status``."""
+    order = await with_item_prices(order, load_products)
+    await repository.add_rollups(rollup_rows(order, sign=-1) + rollup_rows(order, status=status))
+
+
+def _counters() -> Dict[str, int]:
+    return dict.fromkeys(ROLLUP_COUNTERS, 0)
+
+
+def _money(counters: Dict[str, int]) -> dict:
+    return {
+        "orders": counters["orders"],
+        "units": counters["units"],
+        "revenue": counters["revenue_cents"] / 100,
+        "average_order_value": round(counters["revenue_cents"] / counters["orders"] / 100, 2) if counters["orders"] else 0.0,
+    }
+
+
+async def sales_summary(
+    repository: Repository, start: date, end: date, statuses: Sequence[str] = PLACED_STATUSES
+) -> dict:
+    """Totals and breakdowns by day, category and delivery method for ``start``..``end``."""
+    totals = _counters()
+    by_day = {(start + timedelta(days=n)).isoformat(): _counters() for n in range((end - start).days + 1)}
+    by_category: Dict[str, Dict[str, int]] = defaultdict(_counters)
+    by_method: Dict[str, Dict[str, int]] = defaultdict(_counters)
+    for row in await repository.rollups(start.isoformat(), end.isoformat()):
+        if row["status"] not in statuses:
+            continue
+        if row["category"] == ALL:
+            targets = (totals, by_day[row["day"]], by_method[row["delivery_method"]])
+        else:
+            targets = (by_category[row["category"]],)
+        for target in targets:
+            for counter in ROLLUP_COUNTERS:
+                target[counter] += row[counter]
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "statuses": list(statuses),
+        "totals": _money(totals),
+        "by_day": [{"day": day, **_money(c)} for day, c in by_day.items()],
+        # Rows emptied by status changes are left in storage; they are not reported
+        "by_category": {category: _money(c) for category, c in sorted(by_category.items()) if any(c.values())},
+        "by_delivery_method": {method: _money(c) for method, c in sorted(by_method.items()) if any(c.values())},
+    }
+
+
+# ---------- Backfill ----------
+def rollup_frame(orders: List[dict], prices):
+    """Rollups of a batch of orders as a DataFrame, computed column-wise.
+
+    ``prices`` is a DataFrame indexed by product id with ``price`` and
+    ``catalog_category``; it supplies the values for items stored without them.
+    """
+    import pandas as pd
+
+    frame = pd.DataFrame(
+        {
+            "order": range(len(orders)),
+            "day": pd.to_datetime([o["created_at"] for o in orders], utc=True).strftime("%Y-%m-%d"),
+            "delivery_method": [o.get("delivery_method") or "digital" for o in orders],
+            "status": [o["status"] for o in orders],
+            "total": [o["total"] for o in orders],
+        }
+    )
+    items = pd.DataFrame(
+        [
+            (n, i["product_id"], i["quantity"], i.get("unit_price"), i.get("category_slug"))
+            for n, o in enumerate(orders)
+            for i in o["items"]
+        ],
+        columns=["order", "product_id", "quantity", "unit_price", "category_slug"],
+    )
+    items = items.join(prices, on="product_id")
+    items["unit_price"] = items["unit_price"].astype(float).fillna(items["price"]).fillna(0.0)
+    items["category"] = items["category_slug"].fillna(items["catalog_category"]).fillna(UNKNOWN)
+    items["revenue_cents"] = (items["unit_price"] * 100).round().astype("int64") * items["quantity"]
+
+    keys = frame[["order", "day", "delivery_method", "status"]]
+    whole = keys.assign(
+        category=ALL,
+        orders=1,
+        units=frame["order"].map(items.groupby("order")["quantity"].sum()).fillna(0).astype("int64"),
+        revenue_cents=(frame["total"] * 100).round().astype("int64"),
+    )
+    per_category = (
+        items.groupby(["order", "category"], as_index=False)[["quantity", "revenue_cents"]]
+        .sum()
+        .rename(columns={"quantity": "units"})
+        .assign(orders=1)
+        .merge(keys, on="order")
+    )
+    combined = pd.concat([whole, per_category], ignore_index=True)
+    return combined.groupby(list(ROLLUP_KEY), as_index=False)[list(ROLLUP_COUNTERS)].sum()
+
+
+async def backfill(repository: Repository, batch_size: int = 5000) -> dict:
+    """Rebuild every rollup from the stored orders, one batch of orders in memory at a time."""
+    import pandas as pd
+
+    products = [p async for p in repository.iter_products(fields=["id", "price", "category_slug"])]
+    prices = pd.DataFrame(products, columns=["id", "price", "category_slug"]).rename(
+        columns={"category_slug": "catalog_category"}
+    )
+    prices = prices.set_index("id")
+
+    partials, batch, count = [], [], 0
+    async for order in repository.iter_orders():
+        batch.append(order)
+        if len(batch) >= batch_size:
+            partials.append(rollup_frame(batch, prices))
+            count += len(batch)
+            batch = []
+    if batch:
+        partials.append(rollup_frame(batch, prices))
+        count += len(batch)
+
+    rows: List[dict] = []
+    if partials:
+        merged = pd.concat(partials, ignore_index=True).groupby(list(ROLLUP_KEY), as_index=False)[list(ROLLUP_COUNTERS)].sum()
+        rows = [
+            {**{k: str(r[k]) for k in ROLLUP_KEY}, **{c: int(r[c]) for c in ROLLUP_COUNTERS}}
+            for r in merged.to_dict("records")
+        ]
+    await repository.replace_rollups(rows)
+    return {"orders": count, "rollups": len(rows)}
+
+
+def main():
+    import typer
+
+    from app.backend.core.config import settings
+    from app.backend.db.repository import create_repository
+
+    def run(batch_size: int = typer.Option(5000, min=1, help="Orders per DataFrame batch")):
+        db = None
+        if settings.STORAGE_BACKEND == "mongo":
+            from app.backend.db.mongo import connect_from_env
+
+            _, db = connect_from_env()
+        repository = create_repository(settings.STORAGE_BACKEND, db=db)
+
+        async def rebuild() -> dict:
+            await repository.init()
+            try:
+                return await backfill(repository, batch_size)
+            finally:
+                await repository.close()
+
+        typer.echo(json.dumps(asyncio.run(rebuild())))
+
+    typer.run(run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogVersion:
+    """Monotonic catalog version shared by all workers through the repository.
+
+    Every catalog write calls ``bump``. Readers use the in-process copy, so
+    building validators never touches the database. ``watch`` polls the
+    stored record and calls ``on_change`` when another worker bumped it.
+    """
+
+    def __init__(self, repository):
+        self._repository = repository
+        self.value = 0
+        self.updated_at = datetime.now(timezone.utc)
+
+    def _apply(self, doc: Optional[dict]) -> bool:
+        if not doc:
+            return False
+        updated_at = doc["updated_at"]
+        if updated_at.tzinfo is None:
+            updated_at = updated_at.replace(tzinfo=timezone.utc)
+        updated_at = updated_at.astimezone(timezone.utc)
+        # A later timestamp with a lower version is a store that was reset and written again
+        if doc["version"] <= self.value and updated_at <= self.updated_at:
+            return False
+        self.value = doc["version"]
+        self.updated_at = updated_at
+        return True
+
+    async def load(self) -> bool:
+        return self._apply(await self._repository.catalog_version())
+
+    async def init(self) -> None:
+        """Load the stored version, persisting the first one when the store has none.
+
+        Without a stored record every worker (and every restart) would fall
+        back to its own start time, giving the same catalog different
+        validators. Workers racing here each bump once; ``watch`` then
+        brings them all to the highest version.
+        """
+        doc = await self._repository.catalog_version()
+        if doc is None:
+            doc = await self._repository.bump_catalog_version(datetime.now(timezone.utc))
+        self._apply(doc)
+
+    async def bump(self) -> int:
+        self._apply(await self._repository.bump_catalog_version(datetime.now(timezone.utc)))
+        return self.value
+
+    async def watch(self, interval: float, on_change: Callable[[int], Awaitable[None]]) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.load():
+                    await on_change(self.value)
+            except Exception:
+                logger.exception("Catalog version refresh failed")
+
+    @property
+    def stamp(self) -> Tuple[int, float]:
+        """Version plus its timestamp; identifies a catalog state even across database resets."""
+        return self.value, self.updated_at.timestamp()
+
+    # ---------- HTTP validators ----------
+    def etag(self, representation: str) -> str:
+        """Strong ETag for one representation (path + query) of the catalog at ``stamp``.
+
+        The version number alone repeats whenever a store starts counting
+        again (a new memory backend, a reset database), so the stamp's
+        timestamp is part of the digest.
+        """
+        digest = hashlib.sha1(f"{self.stamp}|{representation}".encode()).hexdigest()[:16]
+        return f'"v{self.value}-{digest}"'
+
+    @property
+    def _modified_second(self) -> datetime:
+        # HTTP dates have second precision and must be expressed in GMT
+        return self.updated_at.replace(microsecond=0)
+
+    @property
+    def last_modified(self) -> str:
+        return format_datetime(self._modified_second, usegmt=True)
+
+    def not_modified(self, etag: str, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+        if if_none_match is not None:
+            # If-None-Match takes precedence and uses weak comparison
+            tags = {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+            return "*" in tags or etag in tags
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return since.tzinfo is not None and self._modified_second <= since
+        return False
@@ -9,4 +9,107 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecretkey")
     ALGORITHM: str = "HS256"
 
+    # Where products, categories, orders and checkout sessions live: mongo, sql or memory
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "mongo").lower()
+
+    # Motor client pool, timeouts (0 = driver default/unbounded) and wire compression
+    # ("zstd,snappy,zlib"; zstd and snappy need the zstandard/python-snappy packages)
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0"))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0"))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "20000"))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "30000"))
+    MONGO_COMPRESSORS: str = os.getenv("MONGO_COMPRESSORS", "")
+
+    # Read preferences: catalog (categories/products) reads may go to secondaries,
+    # in which case a lagging secondary can be cached for up to CATALOG_CACHE_TTL;
+    # orders default to the primary so a customer always reads their own writes
+    MONGO_CATALOG_READ_PREFERENCE: str = os.getenv("MONGO_CATALOG_READ_PREFERENCE", "primaryPreferred")
+    MONGO_CATALOG_MAX_STALENESS_S: int = int(os.getenv("MONGO_CATALOG_MAX_STALENESS_S", "-1"))
+    MONGO_ORDERS_READ_PREFERENCE: str = os.getenv("MONGO_ORDERS_READ_PREFERENCE", "primary")
+
+    # SQL product store: async URL (derived from DATABASE_URL when empty), pool
+    # sizing and statement caches (driver prepared statements / compiled SQL)
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    SQL_POOL_SIZE: int = int(os.getenv("SQL_POOL_SIZE", "10"))
+    SQL_MAX_OVERFLOW: int = int(os.getenv("SQL_MAX_OVERFLOW", "10"))
+    SQL_POOL_TIMEOUT: float = float(os.getenv("SQL_POOL_TIMEOUT", "30"))
+    SQL_STATEMENT_CACHE_SIZE: int = int(os.getenv("SQL_STATEMENT_CACHE_SIZE", "256"))
+    SQL_COMPILED_CACHE_SIZE: int = int(os.getenv("SQL_COMPILED_CACHE_SIZE", "500"))
+
+    # Verified JWT claims cached per token until exp, and how often workers poll
+    # the shared revocation list for tokens revoked through other workers
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_REVOCATION_REFRESH: float = float(os.getenv("TOKEN_REVOCATION_REFRESH", "5"))
+
+    # bcrypt cost and the thread pool that runs it off the event loop
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+    # In-process catalog cache (products list/detail)
+    CATALOG_CACHE_SIZE: int = int(os.getenv("CATALOG_CACHE_SIZE", "1024"))
+    CATALOG_CACHE_TTL: float = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+    # HTTP caching of catalog reads (max-age seconds) and how often workers
+    # poll the shared catalog version for changes made by other workers
+    CATALOG_MAX_AGE: int = int(os.getenv("CATALOG_MAX_AGE", "0"))
+    CATALOG_VERSION_REFRESH: float = float(os.getenv("CATALOG_VERSION_REFRESH", "5"))
+
+    # Catalog snapshot file memory-mapped by all workers on a host; empty disables it
+    CATALOG_SNAPSHOT_PATH: str = os.getenv("CATALOG_SNAPSHOT_PATH", "")
+
+    # Product images: originals and derivative cache root, derivative widths/formats,
+    # encoder quality, render threads and upload size limit
+    IMAGE_ROOT: str = os.getenv("IMAGE_ROOT", "./app/backend/media")
+    IMAGE_WIDTHS: tuple = tuple(int(w) for w in os.getenv("IMAGE_WIDTHS", "320,640,960,1280,1600").split(","))
+    IMAGE_FORMATS: tuple = tuple(f.strip() for f in os.getenv("IMAGE_FORMATS", "webp,jpeg").split(","))
+    IMAGE_QUALITY: int = int(os.getenv("IMAGE_QUALITY", "80"))
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "2"))
+    IMAGE_MAX_UPLOAD_BYTES: int = int(os.getenv("IMAGE_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+
+    # Digital downloads: asset root, signed link lifetime (s), bytes per order item as
+    # a number of whole copies of the file (0 = unlimited), fallback read size, and the nginx internal location that serves
+    # DOWNLOAD_ROOT via X-Accel-Redirect (empty streams from the app)
+    DOWNLOAD_ROOT: str = os.getenv("DOWNLOAD_ROOT", "./app/backend/downloads")
+    DOWNLOAD_LINK_TTL: int = int(os.getenv("DOWNLOAD_LINK_TTL", "900"))
+    DOWNLOAD_LIMIT: int = int(os.getenv("DOWNLOAD_LIMIT", "5"))
+    DOWNLOAD_CHUNK_SIZE: int = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(1024 * 1024)))
+    DOWNLOAD_ACCEL_PREFIX: str = os.getenv("DOWNLOAD_ACCEL_PREFIX", "")
+
+    # Delivery fee rules in cents: flat fee for delivered physical items, waived
+    # from FREE_DELIVERY_OVER_CENTS subtotal upwards (0 = never waived)
+    DELIVERY_FEE_CENTS: int = int(os.getenv("DELIVERY_FEE_CENTS", "700"))
+    FREE_DELIVERY_OVER_CENTS: int = int(os.getenv("FREE_DELIVERY_OVER_CENTS", "0"))
+
+    # Stock reservations: counters per newly tracked product (raise for launch products
+    # so concurrent orders write different shards), how long an unpaid order holds its
+    # stock (s), and how often expired reservations are released (s)
+    INVENTORY_DEFAULT_SHARDS: int = int(os.getenv("INVENTORY_DEFAULT_SHARDS", "1"))
+    RESERVATION_TTL: int = int(os.getenv("RESERVATION_TTL", "1800"))
+    RESERVATION_SWEEP_INTERVAL: float = float(os.getenv("RESERVATION_SWEEP_INTERVAL", "60"))
+
+    # Bulk product import: longer input lines are rejected as row errors, not buffered
+    IMPORT_MAX_LINE_BYTES: int = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(1024 * 1024)))
+
+    # Product id lookups are batched per event-loop tick, or per window when > 0
+    PRODUCT_LOADER_MAX_BATCH: int = int(os.getenv("PRODUCT_LOADER_MAX_BATCH", "500"))
+    PRODUCT_LOADER_WINDOW_MS: float = float(os.getenv("PRODUCT_LOADER_WINDOW_MS", "0"))
+
+    # Serve catalog/order reads as orjson bytes without response_model re-validation
+    FAST_JSON_RESPONSES: bool = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+    # Slow-request log: threshold, optional rotating JSONL file and explain plans
+    SLOW_REQUEST_MS: float = float(os.getenv("SLOW_REQUEST_MS", "500"))
+    SLOW_LOG_FILE: str = os.getenv("SLOW_LOG_FILE", "")
+    SLOW_LOG_MAX_BYTES: int = int(os.getenv("SLOW_LOG_MAX_BYTES", "10000000"))
+    SLOW_LOG_BACKUPS: int = int(os.getenv("SLOW_LOG_BACKUPS", "5"))
+    SLOW_LOG_EXPLAIN: bool = os.getenv("SLOW_LOG_EXPLAIN", "true").lower() in ("1", "true", "yes")
+
+    # Idempotency-Key responses are replayed for this long (seconds); a worker's claim
+    # on a key lapses this long after its last renewal (it renews while the handler runs)
+    IDEMPOTENCY_TTL: float = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+    IDEMPOTENCY_LEASE: float = float(os.getenv("IDEMPOTENCY_LEASE", "60"))
+
 settings = Settings()
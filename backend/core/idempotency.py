@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.backend.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyError(Exception):
+    pass
+
+
+class IdempotencyConflict(IdempotencyError):
+    """The key was already used for a request with a different body."""
+
+
+class IdempotencyInProgress(IdempotencyError):
+    """Another worker holds the key and did not finish within the wait timeout."""
+
+
+def fingerprint(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """Remembers the response of each (scope, key) for ``ttl`` seconds.
+
+    Completed responses are kept in process and, when ``collection`` is
+    given, in Mongo so other workers and restarts see them too. Concurrent
+    requests with the same key wait for the first one instead of running
+    the handler again: in-process via a shared future, across workers by
+    polling the pending Mongo claim.
+
+    A claim is a lease of ``lease`` seconds, renewed while the handler runs,
+    so only a worker that stopped renewing (it crashed) loses its claim to a
+    retry. ``wait_timeout`` only bounds how long a duplicate waits.
+    """
+
+    def __init__(
+        self,
+        collection=None,
+        ttl: float = 86400,
+        maxsize: int = 10000,
+        poll_interval: float = 0.05,
+        wait_timeout: float = 30.0,
+        lease: float = 60.0,
+        complete_attempts: int = 3,
+    ):
+        self._collection = collection
+        self.ttl = ttl
+        self.lease = lease
+        self.complete_attempts = complete_attempts
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self._completed = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.replays = 0
+        self.waits = 0
+        self.executions = 0
+
+    async def run(self, scope: str, key: str, request_hash: str, handler: Callable[[], Awaitable[dict]]) -> dict:
+        slot = f"{scope}:{key}"
+        cached = self._completed.get(slot)
+        if cached is not None:
+            return self._replay(cached, request_hash)
+        future = self._in_flight.get(slot)
+        if future is not None:
+            self.waits += 1
+            return self._replay(await asyncio.shield(future), request_hash, counted=False)
+
+        future = self._in_flight[slot] = asyncio.get_running_loop().create_future()
+        owner = uuid.uuid4().hex
+        try:
+            entry = await self._claim(slot, request_hash, owner)
+            if entry is None:
+                self.executions += 1
+                renewal = asyncio.get_running_loop().create_task(self._renew(slot, owner))
+                try:
+                    response = await handler()
+                except BaseException:
+                    # Failed requests are not remembered; a retry runs the handler again
+                    await self._release(slot, owner)
+                    raise
+                finally:
+                    renewal.cancel()
+                entry = {"request_hash": request_hash, "response": response}
+                await self._complete(slot, owner, entry)
+            self._completed.set(slot, entry)
+            future.set_result(entry)
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark retrieved: waiters re-raise it, but there may be none
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(slot, None)
+        return self._replay(entry, request_hash, counted=False)
+
+    def _replay(self, entry: dict, request_hash: str, counted: bool = True) -> dict:
+        if entry["request_hash"] != request_hash:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+        if counted:
+            self.replays += 1
+        return entry["response"]
+
+    async def _claim(self, slot: str, request_hash: str, owner: str) -> Optional[dict]:
+        """Reserve ``slot`` in Mongo; returns the stored entry if another worker owns it."""
+        if self._collection is None:
+            return None
+        now = datetime.now(timezone.utc)
+        # A claim left pending past its lease (owner stopped renewing) may be taken over
+        locked_until = now + timedelta(seconds=self.lease)
+        try:
+            await self._collection.insert_one(
+                {
+                    "_id": slot,
+                    "request_hash": request_hash,
+                    "status": "pending",
+                    "owner": owner,
+                    "locked_until": locked_until,
+                    "expires_at": now + timedelta(seconds=self.ttl),
+                }
+            )
+            return None
+        except DuplicateKeyError:
+            pass
+        deadline = asyncio.get_running_loop().time() + self.wait_timeout
+        while True:
+            doc = await self._collection.find_one({"_id": slot})
+            if doc is None:
+                # The owner failed and released the claim; try to take it over
+                return await self._claim(slot, request_hash, owner)
+            if doc.get("status") == "completed":
+                self.waits += 1
+                return {"request_hash": doc["request_hash"], "response": doc["response"]}
+            now = datetime.now(timezone.utc)
+            if doc["locked_until"] < now:
+                taken = await self._collection.update_one(
+                    {"_id": slot, "status": "pending", "locked_until": doc["locked_until"]},
+                    {
+                        "$set": {
+                            "request_hash": request_hash,
+                            "owner": owner,
+                            "locked_until": now + timedelta(seconds=self.lease),
+                        }
+                    },
+                )
+                if taken.modified_count:
+                    return None
+            if asyncio.get_running_loop().time() >= deadline:
+                raise IdempotencyInProgress("A request with this Idempotency-Key is still in progress")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _renew(self, slot: str, owner: str) -> None:
+        """Extend our claim every third of the lease until the handler returns."""
+        if self._collection is None:
+            return
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                await self._collection.update_one(
+                    {"_id": slot, "status": "pending", "owner": owner},
+                    {"$set": {"locked_until": datetime.now(timezone.utc) + timedelta(seconds=self.lease)}},
+                )
+            except Exception:
+                # The next renewal may succeed; the lease has two more thirds to run
+                logger.warning("Could not renew idempotency claim %s", slot, exc_info=True)
+
+    async def _complete(self, slot: str, owner: str, entry: dict) -> None:
+        """Store the response; a claim left pending would let a retry run the handler again."""
+        if self._collection is None:
+            return
+        for attempt in range(1, self.complete_attempts + 1):
+            try:
+                await self._collection.update_one(
+                    {"_id": slot, "owner": owner}, {"$set": {"status": "completed", "response": entry["response"]}}
+                )
+                return
+            except Exception:
+                if attempt == self.complete_attempts:
+                    # The handler already ran; the caller still gets its response
+                    logger.exception("Could not store the idempotent response for %s; a retry may run it again", slot)
+                    return
+                await asyncio.sleep(self.poll_interval * 2**attempt)
+
+    async def _release(self, slot: str, owner: str) -> None:
+        if self._collection is not None:
+            await self._collection.delete_one({"_id": slot, "status": "pending", "owner": owner})
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "replays": self.replays,
+            "waits": self.waits,
+            "in_flight": len(self._in_flight),
+            "cached": len(self._completed),
+        }
@@ -0,0 +1,260 @@
+"""Product image originals and their resized derivatives.
+
+Originals are stored under their SHA-256 (``originals/<hash>.<ext>`` plus a
+small JSON sidecar with their dimensions). Derivatives are rendered on a
+dedicated thread pool (Pillow releases the GIL while resizing and encoding)
+and cached on disk as ``derived/<hh>/<hash>-<width>-q<quality>.<format>``,
+served from ``<hash>/<width>-q<quality>.<format>``.
+The same content, width, format and quality therefore always map to the same
+file and URL, so responses can be cached forever.
+
+    python -m app.backend.core.images photos/*.jpg --warm
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+ORIGINAL_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp", "GIF": "gif", "TIFF": "tif"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _inspect(data: bytes) -> dict:
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.verify()
+        # verify() leaves the image unusable; reopen for the oriented size
+        with Image.open(io.BytesIO(data)) as img:
+            fmt = img.format
+            width, height = ImageOps.exif_transpose(img).size
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise InvalidImage(f"Not a supported image: {exc}") from exc
+    if fmt not in ORIGINAL_EXTENSIONS:
+        raise InvalidImage(f"Unsupported image format {fmt}")
+    return {"format": fmt, "width": width, "height": height, "bytes": len(data)}
+
+
+def _render(source: Path, target: Path, width: int, fmt: str, quality: int) -> None:
+    pil_format = FORMATS[fmt][0]
+    with Image.open(source) as img:
+        # Let the JPEG decoder downscale by a power of two first; a square box keeps
+        # both sides large enough whatever the EXIF orientation turns out to be
+        img.draft("RGB", (width, width))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((width, img.height), Image.LANCZOS, reducing_gap=3.0)
+        if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L"):
+            img = img.convert("RGBA")
+        out = io.BytesIO()
+        if pil_format == "JPEG":
+            img.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+        else:
+            img.save(out, "WEBP", quality=quality, method=4)
+    _write_atomic(target, out.getvalue())
+
+
+class ImageStore:
+    """Content-addressed originals plus a derivative cache, rendered in the background.
+
+    Concurrent requests for a derivative that is not on disk yet share one
+    render; at most ``max_workers`` renders run at a time.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        widths: Sequence[int] = (320, 640, 960, 1280, 1600),
+        formats: Sequence[str] = ("webp", "jpeg"),
+        quality: int = 80,
+        max_workers: int = 2,
+        url_prefix: str = "/api/images",
+    ):
+        self.root = Path(root)
+        self.widths = tuple(sorted(set(widths)))
+        self.formats = tuple(f for f in formats if f in FORMATS)
+        self.quality = quality
+        self.url_prefix = url_prefix
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="images")
+        self._in_flight: Dict[Path, asyncio.Future] = {}
+        self._meta: Dict[str, dict] = {}
+        self._background: set = set()
+        self.rendered = 0
+        self.hits = 0
+        self.failures = 0
+
+    # ---------- Originals ----------
+    def _original(self, image_id: str, meta: dict) -> Path:
+        return self.root / "originals" / f"{image_id}.{ORIGINAL_EXTENSIONS[meta['format']]}"
+
+    def _meta_path(self, image_id: str) -> Path:
+        return self.root / "originals" / f"{image_id}.json"
+
+    @staticmethod
+    def valid_id(image_id: str) -> bool:
+        return len(image_id) == 64 and all(c in "0123456789abcdef" for c in image_id)
+
+    def metadata(self, image_id: str) -> Optional[dict]:
+        if not self.valid_id(image_id):
+            return None
+        meta = self._meta.get(image_id)
+        if meta is None:
+            try:
+                meta = json.loads(self._meta_path(image_id).read_text())
+            except FileNotFoundError:
+                return None
+            self._meta[image_id] = meta
+        return meta
+
+    async def add_original(self, data: bytes, warm: bool = True) -> dict:
+        """Store an original (idempotent for identical bytes) and start rendering its derivatives."""
+        loop = asyncio.get_running_loop()
+        meta = await loop.run_in_executor(self._executor, _inspect, data)
+        image_id = hashlib.sha256(data).hexdigest()
+        if self.metadata(image_id) is None:
+            await loop.run_in_executor(self._executor, _write_atomic, self._original(image_id, meta), data)
+            # The sidecar goes last: an image is only visible once its original is complete
+            _write_atomic(self._meta_path(image_id), json.dumps(meta).encode())
+            self._meta[image_id] = meta
+        if warm:
+            self.warm(image_id)
+        return {"id": image_id, **meta, "variants": self.variants(image_id)}
+
+    # ---------- Derivatives ----------
+    def widths_for(self, meta: dict) -> List[int]:
+        """Configured widths not larger than the original; the original width if all are."""
+        widths = [w for w in self.widths if w <= meta["width"]]
+        return widths or [meta["width"]]
+
+    def url(self, image_id: str, width: int, fmt: str) -> str:
+        # The quality is part of the URL: changing IMAGE_QUALITY must not change the bytes behind a cached URL
+        return f"{self.url_prefix}/{image_id}/{width}-q{self.quality}.{fmt}"
+
+    def variants(self, image_id: str) -> List[dict]:
+        """``srcset``-ready variants, smallest first, for every configured format."""
+        meta = self.metadata(image_id)
+        if meta is None:
+            return []
+        return [
+            {
+                "url": self.url(image_id, width, fmt),
+                "width": width,
+                "height": round(meta["height"] * width / meta["width"]),
+                "type": FORMATS[fmt][1],
+            }
+            for fmt in self.formats
+            for width in self.widths_for(meta)
+        ]
+
+    def derivative_path(self, image_id: str, width: int, fmt: str) -> Path:
+        return self.root / "derived" / image_id[:2] / f"{image_id}-{width}-q{self.quality}.{fmt}"
+
+    async def derivative(self, image_id: str, width: int, fmt: str) -> Optional[Path]:
+        """Path of a rendered derivative, rendering it first if needed; None if not offered."""
+        meta = self.metadata(image_id)
+        if meta is None or fmt not in self.formats or width not in self.widths_for(meta):
+            return None
+        target = self.derivative_path(image_id, width, fmt)
+        if target.exists():
+            self.hits += 1
+            return target
+        future = self._in_flight.get(target)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._executor, _render, self._original(image_id, meta), target, width, fmt, self.quality
+            )
+            self._in_flight[target] = future
+            future.add_done_callback(lambda f: self._finished(target, f))
+        await asyncio.shield(future)
+        return target
+
+    def _finished(self, target: Path, future: asyncio.Future) -> None:
+        self._in_flight.pop(target, None)
+        if future.cancelled() or future.exception() is not None:
+            self.failures += 1
+        else:
+            self.rendered += 1
+
+    def warm(self, image_id: str) -> List[asyncio.Task]:
+        """Render every variant of ``image_id`` in the background."""
+        meta = self.metadata(image_id)
+        tasks = []
+        for fmt in self.formats if meta is not None else ():
+            for width in self.widths_for(meta):
+                task = asyncio.get_running_loop().create_task(self.derivative(image_id, width, fmt))
+                self._background.add(task)
+                task.add_done_callback(self._background.discard)
+                tasks.append(task)
+        return tasks
+
+    def stats(self) -> dict:
+        return {
+            "root": str(self.root),
+            "widths": list(self.widths),
+            "formats": list(self.formats),
+            "rendered": self.rendered,
+            "cache_hits": self.hits,
+            "failures": self.failures,
+            "rendering": len(self._in_flight),
+            "background": len(self._background),
+        }
+
+
+def main():
+    import typer
+
+    from app.backend.core.config import settings
+
+    def run(paths: List[Path], warm: bool = typer.Option(False, help="Render all derivatives before exiting")):
+        store = ImageStore(
+            settings.IMAGE_ROOT, settings.IMAGE_WIDTHS, settings.IMAGE_FORMATS, settings.IMAGE_QUALITY, settings.IMAGE_WORKERS
+        )
+
+        async def import_all() -> int:
+            failed = 0
+            for path in paths:
+                try:
+                    info = await store.add_original(path.read_bytes(), warm=False)
+                except InvalidImage as exc:
+                    failed += 1
+                    typer.echo(f"{path}: {exc}", err=True)
+                    continue
+                typer.echo(f"{path}\t{info['id']}\t{info['width']}x{info['height']}")
+                if warm:
+                    await asyncio.gather(*store.warm(info["id"]))
+            return failed
+
+        if asyncio.run(import_all()):
+            raise typer.Exit(code=1)
+
+    typer.run(run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Stock reservations for physical products.
+
+Stock is held in counters that the repository decrements conditionally:
+"take n if at least n are left", in a single atomic write, so two orders can
+never both get the last unit. Products without inventory rows (digital goods,
+or stock nobody tracks) are never refused.
+
+Stock for a hot launch product can be split over several shards: separate
+counters (documents or rows) that together hold the total. Each order starts
+at a random shard, so concurrent orders mostly write different counters
+instead of queueing on one. If that shard runs short, the order moves to
+another shard with enough stock. Only when no single shard holds the whole
+quantity is it split across shards.
+
+The stock an order took is recorded as a reservation. Paying the order keeps
+the stock and clears the reservation's expiry; the record stays until the
+order is fulfilled, so cancelling a paid order can still give the stock
+back. Cancelling or expiring an unpaid order gives it back too.
+``claim_reservation`` removes the record atomically, so stock is returned at
+most once even when a cancel races the expiry sweep.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.backend.db.repository import Repository
+
+logger = logging.getLogger(__name__)
+
+
+class OutOfStock(ValueError):
+    def __init__(self, product_id: str, requested: int, available: int):
+        super().__init__(f"Only {available} left of {product_id} ({requested} requested)")
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+
+
+def split_stock(quantity: int, shards: int) -> List[int]:
+    """``quantity`` spread as evenly as possible over ``shards`` counters."""
+    base, extra = divmod(quantity, shards)
+    return [base + (1 if shard < extra else 0) for shard in range(shards)]
+
+
+async def set_stock(repository: Repository, product_id: str, quantity: int, shards: int = 1) -> List[int]:
+    """Make ``quantity`` units available for new orders, over ``shards`` counters.
+
+    Stock held by open reservations is not included; it is added back on top
+    when those reservations are released, to shard 0 when fewer shards remain
+    than when it was taken.
+    """
+    counts = split_stock(quantity, shards)
+    await repository.set_inventory(product_id, counts)
+    return counts
+
+
+async def _take(repository: Repository, product_id: str, quantity: int, shards: int, rng: random.Random) -> List[dict]:
+    start = rng.randrange(shards)
+    if await repository.take_stock(product_id, start, quantity):
+        return [{"product_id": product_id, "shard": start, "quantity": quantity}]
+    # The random shard was short: look at the counts and try the others that can cover it
+    counts = (await repository.inventory([product_id])).get(product_id, [])
+    available = sum(counts)
+    if available < quantity:
+        raise OutOfStock(product_id, quantity, available)
+    rotation = [(start + offset) % len(counts) for offset in range(1, len(counts) + 1)]
+    for shard in rotation:
+        if counts[shard] >= quantity and await repository.take_stock(product_id, shard, quantity):
+            return [{"product_id": product_id, "shard": shard, "quantity": quantity}]
+    # No single shard holds it all: take what each one has
+    taken, remaining = [], quantity
+    for shard in rotation:
+        portion = min(counts[shard], remaining)
+        if portion and await repository.take_stock(product_id, shard, portion):
+            taken.append({"product_id": product_id, "shard": shard, "quantity": portion})
+            remaining -= portion
+        if not remaining:
+            return taken
+    # Concurrent orders got there first
+    await release(repository, taken)
+    raise OutOfStock(product_id, quantity, quantity - remaining)
+
+
+async def reserve(
+    repository: Repository, lines: Iterable[Tuple[str, int]], rng: Optional[random.Random] = None
+) -> List[dict]:
+    """Take stock for ``(product_id, quantity)`` lines; all or nothing.
+
+    Returns the allocations (``product_id``, ``shard``, ``quantity``) to keep
+    with the order. Raises OutOfStock, with everything already taken returned,
+    when a tracked product is short.
+    """
+    wanted: Dict[str, int] = {}
+    for product_id, quantity in lines:
+        wanted[product_id] = wanted.get(product_id, 0) + quantity
+    tracked = await repository.inventory(list(wanted))
+    allocations: List[dict] = []
+    try:
+        for product_id, quantity in wanted.items():
+            if tracked.get(product_id):
+                allocations += await _take(repository, product_id, quantity, len(tracked[product_id]), rng or random)
+    except BaseException:
+        await release(repository, allocations)
+        raise
+    return allocations
+
+
+async def release(repository: Repository, allocations: List[dict]) -> None:
+    await asyncio.gather(*(repository.return_stock(a["product_id"], a["shard"], a["quantity"]) for a in allocations))
+
+
+def reservation_doc(order_id: str, allocations: List[dict], ttl: float, now: Optional[datetime] = None) -> dict:
+    now = now or datetime.now(timezone.utc)
+    return {"order_id": order_id, "items": allocations, "created_at": now, "expires_at": now + timedelta(seconds=ttl)}
+
+
+async def release_order(repository: Repository, order_id: str) -> bool:
+    """Give back the stock held for ``order_id``; False if there was none (or it was already given back)."""
+    reservation = await repository.claim_reservation(order_id)
+    if reservation is None:
+        return False
+    await release(repository, reservation["items"])
+    return True
+
+
+async def sweep_expired(
+    repository: Repository, expire: Callable[[str], Awaitable[None]], batch_size: int = 500
+) -> int:
+    """Call ``expire(order_id)`` for up to ``batch_size`` reservations past their expiry, oldest first.
+
+    One batch per call: a reservation that ``expire`` could not settle is
+    retried on the next sweep rather than in a tight loop.
+    """
+    batch = await repository.expired_reservations(datetime.now(timezone.utc), batch_size)
+    for reservation in batch:
+        await expire(reservation["order_id"])
+    return len(batch)
+
+
+async def watch_expiry(repository: Repository, interval: float, expire: Callable[[str], Awaitable[None]]) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            expired = await sweep_expired(repository, expire)
+            if expired:
+                logger.info("Released %d expired reservations", expired)
+        except Exception:
+            logger.exception("Reservation sweep failed")
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+BatchFn = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class BatchLoader:
+    """Coalesces concurrent key lookups into batched fetches.
+
+    Keys requested during the same event-loop tick (or within ``window``
+    seconds, when set) are fetched with one ``batch_fn`` call. A key that is
+    already queued or in flight is not requested again; callers share the
+    pending result instead. Results are not cached beyond the fetch itself.
+    """
+
+    def __init__(self, batch_fn: BatchFn, max_batch_size: int = 500, window: float = 0.0):
+        self._batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.window = window
+        self._queued: Dict[Hashable, asyncio.Future] = {}
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._scheduled = False
+        self.loads = 0
+        self.coalesced = 0
+        self.batches = 0
+        self.keys_fetched = 0
+        self.max_batch = 0
+
+    async def load(self, key: Hashable) -> Optional[Any]:
+        self.loads += 1
+        future = self._in_flight.get(key) or self._queued.get(key)
+        if future is not None:
+            self.coalesced += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = self._queued[key] = loop.create_future()
+            if not self._scheduled:
+                self._scheduled = True
+                if self.window:
+                    loop.call_later(self.window, self._dispatch)
+                else:
+                    loop.call_soon(self._dispatch)
+        # Shield so one cancelled caller does not cancel the lookup for everyone else
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Optional[Any]]:
+        unique = list(dict.fromkeys(keys))
+        values = await asyncio.gather(*(self.load(key) for key in unique))
+        return dict(zip(unique, values))
+
+    def _dispatch(self) -> None:
+        self._scheduled = False
+        queued, self._queued = self._queued, {}
+        keys = list(queued)
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = {key: queued[key] for key in keys[start:start + self.max_batch_size]}
+            self._in_flight.update(batch)
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: Dict[Hashable, asyncio.Future]) -> None:
+        self.batches += 1
+        self.keys_fetched += len(batch)
+        self.max_batch = max(self.max_batch, len(batch))
+        try:
+            found = await self._batch_fn(list(batch))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+        else:
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(found.get(key))
+        finally:
+            for key in batch:
+                self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "dedup_rate": round(self.coalesced / self.loads, 4) if self.loads else 0.0,
+            "batches": self.batches,
+            "keys_fetched": self.keys_fetched,
+            "avg_batch_size": round(self.keys_fetched / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch,
+            "in_flight": len(self._in_flight),
+        }
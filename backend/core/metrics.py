@@ -0,0 +1,290 @@
+import threading
+import time
+from bisect import bisect_left
+from threading import Lock
+from typing import Dict, List, Sequence, Tuple
+
+from pymongo import monitoring
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Labels, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = Lock()
+
+    def inc(self, labels: Labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_label_text(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last slot is +Inf), sum, count]
+        self._values: Dict[Labels, list] = {}
+        self._lock = Lock()
+
+    def observe(self, labels: Labels, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, ([*e[0]], e[1], e[2])) for labels, e in self._values.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else _number(bound)
+                bucket_labels = _label_text(self.labelnames, labels, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _label_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {total!r}")
+            lines.append(f"{self.name}_count{label_text} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.http_requests = Counter(
+            "http_requests_total", "HTTP requests by route template, method and status.", ("route", "method", "status")
+        )
+        self.http_latency = Histogram(
+            "http_request_duration_seconds", "HTTP request latency by route template.", ("route", "method"), HTTP_BUCKETS
+        )
+        self.mongo_latency = Histogram(
+            "mongo_command_duration_seconds",
+            "MongoDB command round-trip time by collection and command.",
+            ("collection", "command"),
+            MONGO_BUCKETS,
+        )
+        self.mongo_failures = Counter(
+            "mongo_command_failures_total", "Failed MongoDB commands by collection and command.", ("collection", "command")
+        )
+        self.mongo_pool_wait = Histogram(
+            "mongo_pool_checkout_wait_seconds",
+            "Time spent waiting to check a connection out of the pool, by server.",
+            ("address",),
+            POOL_WAIT_BUCKETS,
+        )
+
+    def render(self) -> str:
+        lines: List[str] = []
+        metrics = (self.http_requests, self.http_latency, self.mongo_latency, self.mongo_failures, self.mongo_pool_wait)
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording request counts and latency per route template."""
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # The router stores the matched route in the scope; using its template keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            method = scope["method"]
+            self.registry.http_requests.inc((route, method, str(status)))
+            self.registry.http_latency.observe((route, method), elapsed)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo listener timing every command per collection.
+
+    Callbacks run on Motor's executor threads, so state is lock-protected.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self._pending: Dict[Tuple[object, int], Labels] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _collection(event: monitoring.CommandStartedEvent) -> str:
+        command = event.command
+        if event.command_name == "getMore":
+            return str(command.get("collection", ""))
+        target = command.get(event.command_name)
+        return target if isinstance(target, str) else ""
+
+    def started(self, event):
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = (self._collection(event), event.command_name)
+
+    def _finish(self, event) -> Labels:
+        with self._lock:
+            return self._pending.pop((event.connection_id, event.request_id), ("", event.command_name))
+
+    def succeeded(self, event):
+        self.registry.mongo_latency.observe(self._finish(event), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        labels = self._finish(event)
+        self.registry.mongo_latency.observe(labels, event.duration_micros / 1e6)
+        self.registry.mongo_failures.inc(labels)
+
+
+class MongoPoolMonitor(monitoring.ConnectionPoolListener):
+    """Connection pool state per server: open and checked-out connections and checkout waits.
+
+    A checkout starts and completes on the same driver thread, so the start
+    time is kept thread-locally.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self._pools: Dict[str, dict] = {}
+        self._lock = Lock()
+        self._local = threading.local()
+
+    def _pool(self, address) -> dict:
+        key = f"{address[0]}:{address[1]}"
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = {
+                "address": key,
+                "open": 0,
+                "checked_out": 0,
+                "max_checked_out": 0,
+                "waiting": 0,
+                "max_waiting": 0,
+                "checkouts": 0,
+                "checkout_failures": {},
+                "wait_seconds_total": 0.0,
+                "wait_seconds_max": 0.0,
+                "cleared": 0,
+            }
+        return pool
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address)["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self._pool(event.address)["open"] -= 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["waiting"] += 1
+            pool["max_waiting"] = max(pool["max_waiting"], pool["waiting"])
+
+    def _waited(self, pool: dict) -> float:
+        pool["waiting"] -= 1
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            waited = self._waited(pool)
+            pool["checked_out"] += 1
+            pool["max_checked_out"] = max(pool["max_checked_out"], pool["checked_out"])
+            pool["checkouts"] += 1
+            pool["wait_seconds_total"] += waited
+            pool["wait_seconds_max"] = max(pool["wait_seconds_max"], waited)
+        self.registry.mongo_pool_wait.observe((pool["address"],), waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            self._waited(pool)
+            failures = pool["checkout_failures"]
+            failures[event.reason] = failures.get(event.reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self._pool(event.address)["checked_out"] -= 1
+
+    def stats(self) -> List[dict]:
+        with self._lock:
+            pools = [{**p, "checkout_failures": dict(p["checkout_failures"])} for p in self._pools.values()]
+        for pool in pools:
+            checkouts = pool["checkouts"]
+            pool["wait_ms_avg"] = round(pool["wait_seconds_total"] / checkouts * 1000, 3) if checkouts else 0.0
+            pool["wait_ms_max"] = round(pool.pop("wait_seconds_max") * 1000, 3)
+            pool.pop("wait_seconds_total")
+        return pools
@@ -0,0 +1,170 @@
+"""Cart pricing in integer cents.
+
+``PricingEngine.quote`` prices a cart without writing anything; create_order
+and the /quote endpoint both use it. Prices come from a ``PriceTable``: the
+catalog entries it needs, batched into one product lookup for all of a
+cart's misses and cached until the catalog changes.
+
+Delivery fees come from an ordered list of rules. The first rule that returns
+a fee wins, and the fee is 0 when none applies.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence
+
+from app.backend.core.cache import TTLCache
+
+PHYSICAL_CATEGORIES = frozenset({"prints", "local"})
+
+
+class PricingError(ValueError):
+    pass
+
+
+def to_cents(amount) -> int:
+    # Through str(): 19.99 * 100 is 1998.9999999999998 in binary floating point
+    return int(Decimal(str(amount)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) * 100)
+
+
+def from_cents(cents: int) -> float:
+    return cents / 100
+
+
+class PriceEntry(NamedTuple):
+    title: str
+    price_cents: int
+    currency: str
+    category_slug: str
+
+
+class PriceTable:
+    """Catalog prices by product id, cached until ``clear()`` (called on catalog writes)."""
+
+    def __init__(
+        self,
+        load_many: Callable[[Iterable[str]], Awaitable[Dict[str, Optional[dict]]]],
+        maxsize: int = 10000,
+        ttl: float = 300.0,
+    ):
+        self._load_many = load_many
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def lookup(self, product_ids: Iterable[str]) -> Dict[str, Optional[PriceEntry]]:
+        entries: Dict[str, Optional[PriceEntry]] = {}
+        missing = []
+        for product_id in dict.fromkeys(product_ids):
+            entry = self._cache.get(product_id)
+            if entry is None:
+                missing.append(product_id)
+            else:
+                entries[product_id] = entry
+        if missing:
+            for product_id, doc in (await self._load_many(missing)).items():
+                entry = None
+                if doc is not None:
+                    entry = PriceEntry(doc["title"], to_cents(doc["price"]), doc.get("currency") or "USD", doc["category_slug"])
+                    self._cache.set(product_id, entry)
+                entries[product_id] = entry
+        return entries
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+class QuoteLine(NamedTuple):
+    product_id: str
+    title: str
+    quantity: int
+    unit_price_cents: int
+    category_slug: str
+
+    @property
+    def total_cents(self) -> int:
+        return self.unit_price_cents * self.quantity
+
+
+class Quote:
+    def __init__(self, lines: List[QuoteLine], delivery_method: str, currency: str):
+        self.lines = lines
+        self.delivery_method = delivery_method
+        self.currency = currency
+        self.subtotal_cents = sum(line.total_cents for line in lines)
+        self.contains_physical = any(line.category_slug in PHYSICAL_CATEGORIES for line in lines)
+        self.delivery_fee_cents = 0
+        self.applied_rule: Optional[str] = None
+
+    @property
+    def total_cents(self) -> int:
+        return self.subtotal_cents + self.delivery_fee_cents
+
+
+# ---------- Delivery fee rules ----------
+class FreeDeliveryOver:
+    """No delivery fee once the subtotal reaches ``threshold_cents``."""
+
+    name = "free_delivery_over"
+
+    def __init__(self, threshold_cents: int):
+        self.threshold_cents = threshold_cents
+
+    def fee_cents(self, quote: Quote) -> Optional[int]:
+        if quote.delivery_method == "delivery" and quote.subtotal_cents >= self.threshold_cents:
+            return 0
+        return None
+
+
+class FlatPhysicalDelivery:
+    """A flat fee when physical items are delivered (pickup and digital orders pay nothing)."""
+
+    name = "flat_physical_delivery"
+
+    def __init__(self, amount_cents: int = 700):
+        self.amount_cents = amount_cents
+
+    def fee_cents(self, quote: Quote) -> Optional[int]:
+        if quote.delivery_method == "delivery" and quote.contains_physical:
+            return self.amount_cents
+        return None
+
+
+class PricingEngine:
+    """Prices carts from ``prices`` and applies the first matching delivery ``rules`` entry."""
+
+    def __init__(self, prices: PriceTable, rules: Optional[Sequence] = None):
+        self.prices = prices
+        self.rules = list(rules) if rules is not None else [FlatPhysicalDelivery()]
+
+    async def quote(self, items: Sequence, delivery_method: str) -> Quote:
+        """Price ``items`` (objects with ``product_id`` and ``quantity``); PricingError for bad carts."""
+        if not items:
+            raise PricingError("Cart is empty")
+        entries = await self.prices.lookup(item.product_id for item in items)
+        lines = []
+        for item in items:
+            entry = entries.get(item.product_id)
+            if entry is None:
+                raise PricingError(f"Invalid product: {item.product_id}")
+            if item.quantity < 1:
+                raise PricingError(f"Invalid quantity for {item.product_id}: {item.quantity}")
+            lines.append(QuoteLine(item.product_id, entry.title, item.quantity, entry.price_cents, entry.category_slug))
+        currencies = {entries[line.product_id].currency for line in lines}
+        if len(currencies) > 1:
+            raise PricingError(f"Cart mixes currencies: {', '.join(sorted(currencies))}")
+        quote = Quote(lines, delivery_method, currencies.pop())
+        for rule in self.rules:
+            fee = rule.fee_cents(quote)
+            if fee is not None:
+                quote.delivery_fee_cents, quote.applied_rule = fee, rule.name
+                break
+        return quote
+
+
+def delivery_rules(flat_fee_cents: int, free_over_cents: int = 0) -> List:
+    """The rule list configured by DELIVERY_FEE_CENTS / FREE_DELIVERY_OVER_CENTS."""
+    rules: List = []
+    if free_over_cents > 0:
+        rules.append(FreeDeliveryOver(free_over_cents))
+    rules.append(FlatPhysicalDelivery(flat_fee_cents))
+    return rules
@@ -0,0 +1,65 @@
+"""Product models and the conversion of submitted fields into stored documents.
+
+Shared by the API and the bulk import command line, which validates rows
+without loading the web application.
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import List, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from app.backend.core.images import ImageStore
+
+
+class ImageVariant(BaseModel):
+    url: str
+    width: int
+    height: int
+    type: str
+
+
+class Product(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    title: str
+    description: str
+    price: float
+    currency: str = "USD"
+    category_slug: Literal["digital", "prints", "local"]
+    image_url: Optional[str] = None
+    image_id: Optional[str] = None
+    # Resized derivatives of image_id, smallest first per type; empty for remote image_urls
+    image_variants: List[ImageVariant] = []
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class ProductCreate(BaseModel):
+    title: str
+    description: str
+    price: float
+    currency: str = "USD"
+    category_slug: Literal["digital", "prints", "local"]
+    image_url: Optional[str] = None
+    image_id: Optional[str] = None
+
+
+def with_image(fields: dict, images: ImageStore) -> dict:
+    """Product fields with ``image_variants`` (and a default ``image_url``) filled from ``image_id``.
+
+    Variants are stored on the product so catalog reads never touch the image store.
+    """
+    image_id = fields.get("image_id")
+    if not image_id:
+        return fields
+    variants = images.variants(image_id)
+    if not variants:
+        raise ValueError(f"Unknown image {image_id}")
+    jpeg = [v for v in variants if v["type"] == "image/jpeg"] or variants
+    return {**fields, "image_variants": variants, "image_url": fields.get("image_url") or jpeg[-1]["url"]}
+
+
+def product_doc_from_row(row: dict, images: ImageStore) -> dict:
+    """Validate an imported row; rows with an ``id`` keep it so they upsert."""
+    extra = {"id": str(row["id"])} if row.get("id") else {}
+    return Product(**with_image(ProductCreate(**row).model_dump(), images), **extra).model_dump()
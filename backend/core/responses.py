@@ -0,0 +1,73 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Type, get_args, get_origin
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+# Matches Pydantic's JSON output for the UTC datetimes we store
+ORJSON_OPTIONS = orjson.OPT_UTC_Z
+
+
+def dumps(value) -> bytes:
+    return orjson.dumps(value, option=ORJSON_OPTIONS)
+
+
+class RawJSONResponse(Response):
+    """Response whose content is already-encoded JSON bytes.
+
+    Returning a Response from an endpoint skips FastAPI's response_model
+    validation and re-serialization, so only use it for documents that were
+    validated when they were written and shaped with ``conform``.
+    """
+
+    media_type = "application/json"
+
+
+def _nested_model(annotation) -> Tuple[Optional[Type[BaseModel]], bool]:
+    """The model inside ``Model``, ``Optional[Model]`` or ``List[Model]``, and whether it is a list."""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation, False
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        return _nested_model(get_args(annotation)[0])[0], True
+    for arg in get_args(annotation) if origin is not None else ():
+        model, many = _nested_model(arg)
+        if model is not None:
+            return model, many
+    return None, False
+
+
+_SHAPES: Dict[type, list] = {}
+
+
+def conform(doc: dict, model: Type[BaseModel]) -> dict:
+    """``doc`` with exactly the fields ``model`` would serialize.
+
+    Fields missing from documents written before they existed get the
+    model's default and unknown keys are dropped, recursively for nested
+    models, so raw documents encode to the same shape as the response_model
+    path without validating them.
+    """
+    shape = _SHAPES.get(model)
+    if shape is None:
+        shape = _SHAPES[model] = [
+            (name, field, *_nested_model(field.annotation)) for name, field in model.model_fields.items()
+        ]
+    out = {}
+    for name, field, nested, many in shape:
+        if name in doc:
+            value = doc[name]
+            if nested is not None and value is not None:
+                value = [conform(v, nested) for v in value] if many else conform(value, nested)
+        elif field.is_required():
+            continue
+        else:
+            value = field.get_default(call_default_factory=True)
+        out[name] = value
+    return out
+
+
+def encode_documents(docs: Iterable[dict], encode: Optional[Callable[[dict], bytes]] = None) -> bytes:
+    """JSON array of ``docs``; ``encode`` lets callers reuse per-document bytes."""
+    encode = encode or dumps
+    return b"[" + b",".join(encode(doc) for doc in docs) + b"]"
@@ -0,0 +1,152 @@
+import math
+import re
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+_TOKEN_RE = re.compile(r"\w+")
+
+# Field weights used when building the term frequencies of a document
+TITLE_WEIGHT = 2.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Score multipliers for the different ways a query token can match a term
+EXACT_BOOST = 1.0
+PREFIX_BOOST = 0.6
+FUZZY_BOOST = 0.4
+
+MIN_PREFIX_LEN = 2
+MIN_FUZZY_LEN = 4
+MAX_EXPANSIONS = 50
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def _deletes(term: str) -> Set[str]:
+    """Single-character deletions of ``term`` (symmetric delete spelling correction)."""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+class SearchIndex:
+    """In-process inverted index over product title and description.
+
+    Lookups go through the term dictionary (exact hit, bisect over the
+    sorted vocabulary for prefixes, and a deletion-neighbourhood map for
+    typos), so query cost depends on the matching postings rather than on
+    the number of products.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self) -> None:
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self._typo_keys: Dict[str, Set[str]] = defaultdict(set)
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_category: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_terms
+
+    # ---------- Maintenance ----------
+    def add(self, doc: dict) -> None:
+        doc_id = doc["id"]
+        if doc_id in self._doc_terms:
+            self.remove(doc_id)
+        terms: Dict[str, float] = defaultdict(float)
+        for token in tokenize(doc.get("title")):
+            terms[token] += TITLE_WEIGHT
+        for token in tokenize(doc.get("description")):
+            terms[token] += DESCRIPTION_WEIGHT
+        for term, weight in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocabulary, term)
+                if len(term) >= MIN_FUZZY_LEN:
+                    for key in _deletes(term) | {term}:
+                        self._typo_keys[key].add(term)
+            postings[doc_id] = weight
+        self._doc_terms[doc_id] = dict(terms)
+        self._doc_category[doc_id] = doc.get("category_slug")
+
+    def add_many(self, docs: Iterable[dict]) -> None:
+        for doc in docs:
+            self.add(doc)
+
+    def remove(self, doc_id: str) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        self._doc_category.pop(doc_id, None)
+        if not terms:
+            return
+        for term in terms:
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if postings:
+                continue
+            del self._postings[term]
+            del self._vocabulary[bisect_left(self._vocabulary, term)]
+            if len(term) >= MIN_FUZZY_LEN:
+                for key in _deletes(term) | {term}:
+                    keyed = self._typo_keys.get(key)
+                    if keyed is not None:
+                        keyed.discard(term)
+                        if not keyed:
+                            del self._typo_keys[key]
+
+    # ---------- Querying ----------
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Map a query token to the indexed terms it matches and their boost."""
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = EXACT_BOOST
+        if len(token) >= MIN_PREFIX_LEN:
+            i = bisect_left(self._vocabulary, token)
+            expanded = 0
+            while i < len(self._vocabulary) and expanded < MAX_EXPANSIONS:
+                term = self._vocabulary[i]
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_BOOST)
+                i += 1
+                expanded += 1
+        if len(token) >= MIN_FUZZY_LEN:
+            for key in _deletes(token) | {token}:
+                for term in self._typo_keys.get(key, ()):
+                    matches.setdefault(term, FUZZY_BOOST)
+        return matches
+
+    def search(self, q: str, category: Optional[str] = None, limit: int = 50) -> List[str]:
+        """Return ids of documents matching every token of ``q``, best first."""
+        tokens = list(dict.fromkeys(tokenize(q)))
+        if not tokens:
+            return []
+        total_docs = len(self._doc_terms) or 1
+        scores: Optional[Dict[str, float]] = None
+        for token in tokens:
+            token_scores: Dict[str, float] = {}
+            for term, boost in self._expand(token).items():
+                postings = self._postings[term]
+                idf = math.log(1 + total_docs / len(postings))
+                for doc_id, weight in postings.items():
+                    score = boost * weight * idf
+                    if score > token_scores.get(doc_id, 0.0):
+                        token_scores[doc_id] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {d: s + token_scores[d] for d, s in scores.items() if d in token_scores}
+            if not scores:
+                return []
+        if category:
+            scores = {d: s for d, s in scores.items() if self._doc_category.get(d) == category}
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [doc_id for doc_id, _ in ranked[:limit]]
@@ -1,9 +1,14 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
-from datetime import datetime, timedelta
-import jwt
+from typing import Awaitable, Callable, Optional
+from app.backend.auth.jwt_handler import create_jwt_token
 from app.backend.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -11,9 +16,120 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+class PasswordHasherBusy(Exception):
+    """Too many hash/verify calls are already waiting for a worker."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a dedicated thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL, so ``max_workers`` threads hash in parallel while
+    the loop keeps serving other requests. At most ``max_workers`` calls run
+    at once; callers beyond that wait, and once ``max_queue`` are waiting new
+    calls fail fast with PasswordHasherBusy (0 disables the limit).
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int = 2, max_queue: int = 0):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._background: set = set()
+        self.running = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.rehash_failures = 0
+        self.wait_seconds = 0.0
+
+    async def _run(self, fn, *args):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        if self.max_queue and self.queued >= self.max_queue and self._slots.locked():
+            self.rejected += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+        loop = asyncio.get_running_loop()
+        queued_at = loop.time()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.wait_seconds += loop.time() - queued_at
+        self.running += 1
+        try:
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(
+        self,
+        plain_password: str,
+        hashed_password: str,
+        on_rehash: Optional[Callable[[str], Awaitable[None]]] = None,
+    ) -> bool:
+        """Verify a password; if its hash uses outdated parameters, rehash it in the background.
+
+        ``on_rehash`` receives the new hash (e.g. to store it) once it is ready;
+        the caller does not wait for it.
+        """
+        ok = await self._run(self.context.verify, plain_password, hashed_password)
+        if ok and on_rehash is not None and self.context.needs_update(hashed_password):
+            task = asyncio.get_running_loop().create_task(self._rehash(plain_password, on_rehash))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        return ok
+
+    async def _rehash(self, plain_password: str, on_rehash: Callable[[str], Awaitable[None]]) -> None:
+        # Nobody awaits this task; a failure (e.g. storing the hash) is logged and counted here
+        try:
+            new_hash = await self.hash(plain_password)
+            await on_rehash(new_hash)
+        except Exception:
+            self.rehash_failures += 1
+            logger.exception("Background password rehash failed")
+            return
+        self.rehashed += 1
+
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "rehash_failures": self.rehash_failures,
+            "pending_rehashes": len(self._background),
+            "avg_wait_ms": round(self.wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+
+password_hasher = PasswordHasher(
+    pwd_context, max_workers=settings.PASSWORD_HASH_WORKERS, max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.hash(password)
+
+async def verify_password_async(
+    plain_password: str,
+    hashed_password: str,
+    on_rehash: Optional[Callable[[str], Awaitable[None]]] = None,
+) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password, on_rehash=on_rehash)
+
 def create_access_token(data: dict, expires_delta: int = 30):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=expires_delta)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    # Kept for existing callers; tokens are issued and verified in auth/jwt_handler.py
+    return create_jwt_token(data, expires_minutes=expires_delta)
@@ -0,0 +1,194 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from threading import Lock
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+from pymongo import monitoring
+
+# Commands issued by the current request; None outside of a request
+_request_queries: ContextVar[Optional[List[dict]]] = ContextVar("request_queries", default=None)
+
+# Commands whose filter can be re-run through a find explain
+EXPLAINABLE = {"find", "count", "distinct"}
+_QUERY_FIELDS = ("filter", "sort", "limit", "pipeline", "query", "q", "updates", "deletes")
+
+# Path and query parameters that are credentials (signed download links, API keys)
+REDACTED_PARAMS = frozenset({"token", "password", "secret", "signature", "sig", "api_key", "access_token"})
+REDACTED = "[redacted]"
+
+
+def _jsonable(value):
+    return json.loads(json.dumps(value, default=str))
+
+
+class QueryRecorder(monitoring.CommandListener):
+    """Attaches each Mongo command to the request that issued it.
+
+    Motor runs pymongo on executor threads but copies the caller's context,
+    so the request's query list is visible here.
+    """
+
+    def __init__(self):
+        self._pending: Dict[Tuple[object, int], dict] = {}
+        self._lock = Lock()
+
+    def started(self, event):
+        queries = _request_queries.get()
+        if queries is None:
+            return
+        command = event.command
+        target = command.get(event.command_name)
+        entry = {
+            "command": event.command_name,
+            "collection": target if isinstance(target, str) else command.get("collection"),
+            **{k: command[k] for k in _QUERY_FIELDS if k in command},
+        }
+        queries.append(entry)
+        with self._lock:
+            self._pending[(event.connection_id, event.request_id)] = entry
+
+    def _finish(self, event, failed: bool = False):
+        with self._lock:
+            entry = self._pending.pop((event.connection_id, event.request_id), None)
+        if entry is not None:
+            entry["duration_ms"] = round(event.duration_micros / 1000, 3)
+            if failed:
+                entry["failed"] = True
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+class SlowOpLog:
+    """Keeps recent slow requests in memory and optionally in a rotating JSONL file."""
+
+    def __init__(self, logger: logging.Logger, path: str = "", max_bytes: int = 10_000_000, backups: int = 5, keep: int = 200):
+        self.logger = logger
+        self.recent: deque = deque(maxlen=keep)
+        self._file_logger = None
+        if path:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._file_logger = logging.getLogger(f"{logger.name}.jsonl")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.addHandler(handler)
+
+    def record(self, entry: dict) -> None:
+        entry = _jsonable(entry)
+        self.recent.append(entry)
+        self.logger.warning(
+            "Slow request %s %s took %.1f ms (%d queries) params=%s",
+            entry["method"], entry["route"], entry["duration_ms"], len(entry["queries"]), entry["params"],
+        )
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(entry, separators=(",", ":")))
+
+    def entries(self, limit: int = 50) -> List[dict]:
+        return list(self.recent)[-limit:][::-1]
+
+
+class SlowRequestMiddleware:
+    """Logs requests slower than ``threshold`` seconds with the queries they issued.
+
+    Each explainable query is explained after the response has been sent,
+    so the extra round trips never add to the slow request itself.
+    """
+
+    def __init__(
+        self,
+        app,
+        log: SlowOpLog,
+        threshold: float,
+        explain: Optional[Callable[[dict], Awaitable[dict]]] = None,
+        redact: Iterable[str] = REDACTED_PARAMS,
+    ):
+        self.app = app
+        self.log = log
+        self.threshold = threshold
+        self.explain = explain
+        self.redact = frozenset(redact)
+        # The loop keeps only weak references to tasks; hold each one until it finishes
+        self._finishing: set = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        queries: List[dict] = []
+        token = _request_queries.set(queries)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_queries.reset(token)
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.threshold:
+                path, params = self._params(scope)
+                entry = {
+                    "at": datetime.now(timezone.utc).isoformat(),
+                    "method": scope["method"],
+                    "route": getattr(scope.get("route"), "path", None) or path,
+                    "path": path,
+                    "params": params,
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 1),
+                    "queries": queries,
+                }
+                task = asyncio.get_running_loop().create_task(self._finish(entry))
+                self._finishing.add(task)
+                task.add_done_callback(self._finishing.discard)
+
+    def _params(self, scope) -> Tuple[str, dict]:
+        """The request's ``path`` and ``params`` with credential values replaced."""
+        path = scope["path"]
+        params = {
+            **scope.get("path_params", {}),
+            **dict(parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)),
+        }
+        for name, value in params.items():
+            if name.lower() not in self.redact:
+                continue
+            if name in scope.get("path_params", {}) and value:
+                path = path.replace(str(value), REDACTED)
+            params[name] = REDACTED
+        return path, params
+
+    async def _finish(self, entry: dict) -> None:
+        # Explain's own commands must not be attributed to any request
+        _request_queries.set(None)
+        if self.explain is not None:
+            for i, query in enumerate(entry["queries"]):
+                if query["command"] not in EXPLAINABLE or query.get("failed"):
+                    continue
+                try:
+                    query["explain"] = await self.explain(
+                        {
+                            "name": f"{entry['route']}#{i}",
+                            "collection": query["collection"],
+                            "filter": query.get("filter", query.get("query", {})),
+                            "sort": query.get("sort"),
+                            "limit": query.get("limit"),
+                        }
+                    )
+                except Exception as exc:
+                    query["explain"] = {"error": str(exc)}
+        self.log.record(entry)
@@ -0,0 +1,308 @@
+"""Memory-mapped catalog snapshot shared by every worker on a host.
+
+The snapshot is one file holding the categories and every product as
+pre-encoded JSON (the same bytes the fast response path sends), plus
+fixed-width lookup tables:
+
+    magic | header | header JSON | records | ids | category lists | data
+
+- records: ``<QI`` (offset, length) per product, in PRODUCT_SORT order
+- ids: ``<64sI`` (id, record position) sorted by id, searched with bisection
+- category lists: ``<I`` record positions per category, in PRODUCT_SORT order
+
+Workers map the file read-only, so the page cache holds one copy for all of
+them and a worker's own footprint is the mapping plus the small header. A
+rebuild writes a new file next to the old one and ``os.replace``s it; readers
+that still hold the old mapping keep a valid view until they reopen.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.backend.core.responses import dumps
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"ENPXCAT1"
+# catalog version, catalog updated_at and built at (epoch s), product count, header JSON length
+HEADER = struct.Struct("<QddII")
+RECORD = struct.Struct("<QI")
+ID_ENTRY = struct.Struct("<64sI")
+POSITION = struct.Struct("<I")
+MAX_ID_BYTES = 64
+
+# (catalog version, catalog updated_at epoch seconds). The timestamp tells apart
+# equal version numbers from different databases, e.g. after a reset.
+Stamp = Tuple[int, float]
+
+
+class CatalogSnapshot:
+    """Read-only view of a snapshot file; every lookup reads straight from the mapping."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a catalog snapshot")
+        self.path = path
+        self.version, self.updated_at, self.built_at, self.count, meta_length = HEADER.unpack_from(self._map, len(MAGIC))
+        start = len(MAGIC) + HEADER.size
+        meta = json.loads(self._map[start:start + meta_length])
+        self._categories = meta["categories"]
+        self._category_lists: Dict[str, List[int]] = meta["category_lists"]
+        self._records = meta["records"]
+        self._ids = meta["ids"]
+        self.size = len(self._map)
+
+    @property
+    def stamp(self) -> Stamp:
+        return self.version, self.updated_at
+
+    @staticmethod
+    def read_stamp(path: str) -> Optional[Stamp]:
+        """Stamp recorded in the file at ``path``, without mapping it."""
+        try:
+            with open(path, "rb") as fh:
+                head = fh.read(len(MAGIC) + HEADER.size)
+        except FileNotFoundError:
+            return None
+        if len(head) < len(MAGIC) + HEADER.size or head[: len(MAGIC)] != MAGIC:
+            return None
+        version, updated_at = HEADER.unpack_from(head, len(MAGIC))[:2]
+        return version, updated_at
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _record(self, position: int) -> bytes:
+        offset, length = RECORD.unpack_from(self._map, self._records + position * RECORD.size)
+        return self._map[offset:offset + length]
+
+    def _position(self, product_id: str) -> Optional[int]:
+        key = product_id.encode()
+        if len(key) > MAX_ID_BYTES:
+            return None
+        key = key.ljust(MAX_ID_BYTES, b"\0")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry, position = ID_ENTRY.unpack_from(self._map, self._ids + mid * ID_ENTRY.size)
+            if entry < key:
+                lo = mid + 1
+            elif entry > key:
+                hi = mid
+            else:
+                return position
+        return None
+
+    def categories_json(self) -> bytes:
+        offset, length = self._categories
+        return self._map[offset:offset + length]
+
+    def product_json(self, product_id: str) -> Optional[bytes]:
+        position = self._position(product_id)
+        return self._record(position) if position is not None else None
+
+    def products_json(self, product_ids: Iterable[str]) -> bytes:
+        """JSON array of the given products, in the given order, skipping unknown ids."""
+        found = (self.product_json(pid) for pid in product_ids)
+        return b"[" + b",".join(doc for doc in found if doc is not None) + b"]"
+
+    def list_json(self, category: Optional[str] = None, limit: int = 50) -> bytes:
+        """Newest ``limit`` products (optionally of one category) as a JSON array."""
+        if category:
+            offset, count = self._category_lists.get(category, (0, 0))
+            positions = (
+                POSITION.unpack_from(self._map, offset + i * POSITION.size)[0] for i in range(min(count, limit))
+            )
+        else:
+            positions = range(min(self.count, limit))
+        return b"[" + b",".join(self._record(p) for p in positions) + b"]"
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "version": self.version,
+            "catalog_updated_at": self.updated_at,
+            "built_at": self.built_at,
+            "products": self.count,
+            "bytes": self.size,
+        }
+
+
+def write_snapshot(path: str, stamp: Stamp, categories: List[dict], products: List[dict]) -> None:
+    """Write a snapshot of ``products`` (already in PRODUCT_SORT order) and swap it in atomically."""
+    encoded = [dumps(doc) for doc in products]
+    ids = []
+    for position, doc in enumerate(products):
+        key = doc["id"].encode()
+        if len(key) > MAX_ID_BYTES:
+            raise ValueError(f"Product id longer than {MAX_ID_BYTES} bytes: {doc['id']!r}")
+        ids.append((key.ljust(MAX_ID_BYTES, b"\0"), position))
+    ids.sort()
+    by_category: Dict[str, List[int]] = {}
+    for position, doc in enumerate(products):
+        by_category.setdefault(doc.get("category_slug") or "", []).append(position)
+
+    categories_json = dumps(categories)
+
+    # Offsets depend on the header JSON length, which depends on the offsets; the
+    # header is therefore padded to a fixed size once its largest form is known
+    def layout(meta_length: int) -> Tuple[dict, int]:
+        cursor = len(MAGIC) + HEADER.size + meta_length
+        meta = {"records": cursor}
+        cursor += RECORD.size * len(products)
+        meta["ids"] = cursor
+        cursor += ID_ENTRY.size * len(products)
+        meta["category_lists"] = {}
+        for category, positions in by_category.items():
+            meta["category_lists"][category] = [cursor, len(positions)]
+            cursor += POSITION.size * len(positions)
+        meta["categories"] = [cursor, len(categories_json)]
+        cursor += len(categories_json)
+        return meta, cursor
+
+    meta_length = len(json.dumps(layout(0)[0])) + 64
+    meta, data_start = layout(meta_length)
+    meta_bytes = json.dumps(meta).encode().ljust(meta_length)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".catalog-", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(MAGIC)
+            fh.write(HEADER.pack(stamp[0], stamp[1], time.time(), len(products), meta_length))
+            fh.write(meta_bytes)
+            offset = data_start
+            for doc in encoded:
+                fh.write(RECORD.pack(offset, len(doc)))
+                offset += len(doc)
+            for key, position in ids:
+                fh.write(ID_ENTRY.pack(key, position))
+            for positions in by_category.values():
+                fh.write(b"".join(POSITION.pack(p) for p in positions))
+            fh.write(categories_json)
+            for doc in encoded:
+                fh.write(doc)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class SnapshotStore:
+    """Keeps this worker's mapping in step with the catalog version.
+
+    ``refresh(stamp)`` maps the shared file when it matches (or is newer than)
+    that stamp and otherwise rebuilds it from ``load``. An exclusive file lock
+    makes one worker build while the others wait and then map its result.
+    Calls made during a refresh are coalesced into one more at the newest stamp.
+    """
+
+    def __init__(self, path: str, load: Callable[[], Awaitable[Tuple[List[dict], AsyncIterator[dict]]]]):
+        self.path = path
+        self._load = load
+        self.current: Optional[CatalogSnapshot] = None
+        self._wanted: Optional[Stamp] = None
+        self._refreshing: Optional[asyncio.Task] = None
+        # The loop keeps only weak references to tasks; hold requested refreshes until they finish
+        self._background: set = set()
+        self.builds = 0
+        self.reloads = 0
+        self.failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def fresh(self, stamp: Stamp) -> Optional[CatalogSnapshot]:
+        """The mapped snapshot if it reflects the catalog at ``stamp``."""
+        current = self.current
+        return current if current is not None and current.stamp == stamp else None
+
+    def open_existing(self) -> None:
+        """Map whatever snapshot is on disk (any version), e.g. at startup."""
+        if self.enabled and CatalogSnapshot.read_stamp(self.path) is not None:
+            self._swap(CatalogSnapshot(self.path))
+
+    def request(self, stamp: Stamp) -> None:
+        """Schedule a refresh without waiting for it (used on catalog writes)."""
+        if self.enabled:
+            task = asyncio.get_running_loop().create_task(self.refresh(stamp))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def refresh(self, stamp: Stamp) -> None:
+        if not self.enabled:
+            return
+        if self._wanted is None or stamp[0] >= self._wanted[0]:
+            self._wanted = stamp
+        if self._refreshing is None:
+            self._refreshing = asyncio.get_running_loop().create_task(self._refresh_loop())
+        # Shielded: one caller going away must not cancel the refresh for the others
+        await asyncio.shield(self._refreshing)
+
+    async def _refresh_loop(self) -> None:
+        try:
+            while True:
+                target = self._wanted
+                try:
+                    await self._refresh_once(target)
+                except Exception:
+                    self.failures += 1
+                    logger.exception("Catalog snapshot refresh to version %d failed", target[0])
+                    return
+                if self._wanted == target:
+                    return
+        finally:
+            self._refreshing = None
+
+    @staticmethod
+    def _usable(on_disk: Optional[Stamp], target: Stamp) -> bool:
+        # A newer version comes from another worker that is ahead of this one
+        return on_disk is not None and (on_disk == target or on_disk[0] > target[0])
+
+    async def _refresh_once(self, target: Stamp) -> None:
+        if self.current is not None and self._usable(self.current.stamp, target):
+            return
+        lock = await asyncio.to_thread(self._lock)
+        try:
+            if self._usable(CatalogSnapshot.read_stamp(self.path), target):
+                self.reloads += 1
+            else:
+                categories, products = await self._load()
+                docs = [doc async for doc in products]
+                await asyncio.to_thread(write_snapshot, self.path, target, categories, docs)
+                self.builds += 1
+                logger.info("Catalog snapshot version %d written with %d products", target[0], len(docs))
+            self._swap(CatalogSnapshot(self.path))
+        finally:
+            os.close(lock)
+
+    def _lock(self) -> int:
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        return fd
+
+    def _swap(self, snapshot: CatalogSnapshot) -> None:
+        # The previous mapping is unmapped once no request references it
+        self.current = snapshot
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "snapshot": self.current.stats() if self.current is not None else None,
+            "builds": self.builds,
+            "reloads": self.reloads,
+            "failures": self.failures,
+        }
@@ -1,14 +1,72 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from app.backend.core.config import settings
 
-DATABASE_URL = "sqlite:///./app/backend/db/products.db"
+DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Async drivers for the sync URLs this project uses
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg", "mysql": "mysql+aiomysql"}
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    if "+" in parsed.drivername:
+        return url
+    return parsed.set(drivername=ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = settings.ASYNC_DATABASE_URL or async_database_url(DATABASE_URL)
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _enable_sqlite_wal(engine) -> None:
+    # WAL lets readers proceed while a writer holds the file; NORMAL sync is safe under WAL
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(settings.SQL_POOL_TIMEOUT * 1000)}")
+        cursor.close()
+
+def _connect_args(url: str) -> dict:
+    if _is_sqlite(url):
+        # sqlite3 keeps this many prepared statements per connection
+        return {"check_same_thread": False, "cached_statements": settings.SQL_STATEMENT_CACHE_SIZE}
+    if make_url(url).get_driver_name() == "asyncpg":
+        return {"prepared_statement_cache_size": settings.SQL_STATEMENT_CACHE_SIZE}
+    return {}
+
+def _pool_args(url: str) -> dict:
+    if _is_sqlite(url) and make_url(url).database in (None, "", ":memory:"):
+        # In-memory databases live in a single connection; SQLAlchemy picks a static pool
+        return {}
+    return {
+        "pool_size": settings.SQL_POOL_SIZE,
+        "max_overflow": settings.SQL_MAX_OVERFLOW,
+        "pool_timeout": settings.SQL_POOL_TIMEOUT,
+        "pool_pre_ping": not _is_sqlite(url),
+    }
+
+engine = create_engine(DATABASE_URL, connect_args=_connect_args(DATABASE_URL), **_pool_args(DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=_connect_args(ASYNC_DATABASE_URL),
+    # Compiled SQL is cached per statement shape, so repeated queries skip compilation
+    query_cache_size=settings.SQL_COMPILED_CACHE_SIZE,
+    **_pool_args(ASYNC_DATABASE_URL),
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
+if _is_sqlite(DATABASE_URL):
+    _enable_sqlite_wal(engine)
+if _is_sqlite(ASYNC_DATABASE_URL):
+    _enable_sqlite_wal(async_engine.sync_engine)
+
 Base = declarative_base()
 
 # Dependency
@@ -18,3 +76,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
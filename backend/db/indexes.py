@@ -0,0 +1,191 @@
+"""Mongo index manifest for the storefront collections.
+
+``ensure_indexes`` is applied on startup; ``check_indexes`` reports missing
+indexes and explains the hot queries. Both are also available from the
+command line::
+
+    python -m app.backend.db.indexes apply
+    python -m app.backend.db.indexes check
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INDEX_MANIFEST: Dict[str, List[IndexModel]] = {
+    "products": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("created_at", DESCENDING), ("id", DESCENDING)], name="created_at_id"),
+        IndexModel(
+            [("category_slug", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="category_slug_created_at_id",
+        ),
+    ],
+    "categories": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("slug", ASCENDING)], name="slug_unique", unique=True),
+    ],
+    "orders": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("email", ASCENDING), ("created_at", DESCENDING)], name="email_created_at"),
+    ],
+    "checkout_sessions": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("order_id", ASCENDING)], name="order_id"),
+    ],
+    "sales_rollups": [
+        IndexModel(
+            [("day", ASCENDING), ("category", ASCENDING), ("delivery_method", ASCENDING), ("status", ASCENDING)],
+            name="rollup_key_unique",
+            unique=True,
+        ),
+    ],
+    "inventory": [
+        IndexModel([("product_id", ASCENDING), ("shard", ASCENDING)], name="product_id_shard_unique", unique=True),
+    ],
+    "reservations": [
+        IndexModel([("order_id", ASCENDING)], name="order_id_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at"),
+    ],
+    "download_counts": [
+        IndexModel([("order_id", ASCENDING), ("product_id", ASCENDING)], name="order_id_product_id_unique", unique=True),
+    ],
+    "token_revocations": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "idempotency_keys": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+
+async def ensure_indexes(db) -> None:
+    """Create every index in the manifest; already-existing ones are a no-op."""
+    for collection, models in INDEX_MANIFEST.items():
+        try:
+            await db[collection].create_indexes(models)
+        except OperationFailure as exc:
+            # Usually an index with the same keys but different options already exists
+            logger.warning("Could not apply indexes on %s: %s", collection, exc)
+
+
+async def missing_indexes(db) -> Dict[str, List[str]]:
+    missing: Dict[str, List[str]] = {}
+    for collection, models in INDEX_MANIFEST.items():
+        existing = await db[collection].index_information()
+        existing_keys = {tuple(tuple(k) for k in info["key"]) for info in existing.values()}
+        for model in models:
+            spec = model.document
+            if tuple(spec["key"].items()) not in existing_keys:
+                missing.setdefault(collection, []).append(spec["name"])
+    return missing
+
+
+async def _hot_queries(db) -> List[dict]:
+    """The lookups server.py issues on every request, with realistic values."""
+    product = await db.products.find_one({}, {"_id": 0, "id": 1, "category_slug": 1}) or {}
+    order = await db.orders.find_one({}, {"_id": 0, "id": 1}) or {}
+    product_id = product.get("id", "")
+    return [
+        {"name": "get_product", "collection": "products", "filter": {"id": product_id}, "limit": 1},
+        {
+            "name": "list_products",
+            "collection": "products",
+            "filter": {},
+            "sort": {"created_at": -1, "id": -1},
+            "limit": 50,
+        },
+        {
+            "name": "list_products_by_category",
+            "collection": "products",
+            "filter": {"category_slug": product.get("category_slug", "digital")},
+            "sort": {"created_at": -1, "id": -1},
+            "limit": 50,
+        },
+        {"name": "create_order_products", "collection": "products", "filter": {"id": {"$in": [product_id]}}},
+        {"name": "get_order", "collection": "orders", "filter": {"id": order.get("id", "")}, "limit": 1},
+        {
+            "name": "checkout_session_by_order",
+            "collection": "checkout_sessions",
+            "filter": {"order_id": order.get("id", "")},
+            "limit": 1,
+        },
+    ]
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    stages = []
+    while plan:
+        stages.append(plan.get("stage"))
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+async def explain_query(db, query: dict) -> dict:
+    find = {"find": query["collection"], "filter": query["filter"]}
+    if query.get("sort"):
+        find["sort"] = query["sort"]
+    if query.get("limit"):
+        find["limit"] = query["limit"]
+    result = await db.command({"explain": find, "verbosity": "executionStats"})
+    stats = result.get("executionStats", {})
+    returned = stats.get("nReturned", 0)
+    examined = stats.get("totalDocsExamined", 0)
+    stages = _plan_stages(result.get("queryPlanner", {}).get("winningPlan", {}))
+    return {
+        "name": query["name"],
+        "collection": query["collection"],
+        "stages": stages,
+        "uses_index": "IXSCAN" in stages or "IDHACK" in stages,
+        "keys_examined": stats.get("totalKeysExamined", 0),
+        "docs_examined": examined,
+        "returned": returned,
+        "scanned_ratio": round(examined / returned, 2) if returned else float(examined),
+        "millis": stats.get("executionTimeMillis"),
+    }
+
+
+async def check_indexes(db) -> dict:
+    """Report missing manifest indexes and explain output for the hot queries."""
+    report = {"missing": await missing_indexes(db), "queries": []}
+    for query in await _hot_queries(db):
+        try:
+            report["queries"].append(await explain_query(db, query))
+        except OperationFailure as exc:
+            report["queries"].append({"name": query["name"], "error": str(exc)})
+    return report
+
+
+def main():
+    import typer
+
+    from app.backend.db.mongo import connect_from_env
+
+    cli = typer.Typer(help="Apply or verify the Mongo index manifest.")
+
+    @cli.command()
+    def apply(mongo_url: Optional[str] = None, db_name: Optional[str] = None):
+        client, db = connect_from_env(mongo_url, db_name)
+        asyncio.run(ensure_indexes(db))
+        client.close()
+        typer.echo("Indexes applied")
+
+    @cli.command()
+    def check(mongo_url: Optional[str] = None, db_name: Optional[str] = None):
+        client, db = connect_from_env(mongo_url, db_name)
+        report = asyncio.run(check_indexes(db))
+        client.close()
+        typer.echo(json.dumps(report, indent=2))
+        if report["missing"]:
+            raise typer.Exit(code=1)
+
+    cli()
+
+
+if __name__ == "__main__":
+    main()
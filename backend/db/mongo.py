@@ -0,0 +1,63 @@
+import os
+from pathlib import Path
+from typing import Optional, Sequence
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+
+from app.backend.core.config import settings
+
+ROOT_DIR = Path(__file__).parent.parent
+
+READ_PREFERENCES = {
+    "primary": Primary,
+    "primarypreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondarypreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+def read_preference(name: str, max_staleness: int = -1):
+    """Read preference from its mode name (``secondaryPreferred`` etc.)."""
+    try:
+        mode = READ_PREFERENCES[name.replace("_", "").lower()]
+    except KeyError:
+        raise ValueError(f"Unknown read preference {name!r}; expected one of {', '.join(READ_PREFERENCES)}")
+    if mode is Primary:
+        return Primary()
+    return mode(max_staleness=max_staleness)
+
+
+def client_options() -> dict:
+    """Pool, timeout and compression options for every Motor client, from settings."""
+    options = {
+        # tz_aware: created_at is stored as a native BSON date and read back as an aware UTC datetime
+        "tz_aware": True,
+        # Sockets are opened on first use instead of at construction
+        "connect": False,
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": settings.MONGO_MAX_IDLE_TIME_MS or None,
+        "waitQueueTimeoutMS": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+        "connectTimeoutMS": settings.MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    }
+    compressors = [c.strip() for c in settings.MONGO_COMPRESSORS.split(",") if c.strip()]
+    if compressors:
+        options["compressors"] = compressors
+    return options
+
+
+def create_client(mongo_url: Optional[str] = None, event_listeners: Sequence = ()) -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(
+        mongo_url or os.environ['MONGO_URL'], event_listeners=list(event_listeners), **client_options()
+    )
+
+
+def connect_from_env(mongo_url: Optional[str] = None, db_name: Optional[str] = None):
+    """Client and database for command-line tools, configured like server.py."""
+    load_dotenv(ROOT_DIR / '.env')
+    client = create_client(mongo_url)
+    return client, client[db_name or os.environ['DB_NAME']]
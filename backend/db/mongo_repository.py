@@ -0,0 +1,217 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymongo import DeleteMany, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.backend.core.config import settings
+from app.backend.db.indexes import ensure_indexes
+from app.backend.db.mongo import read_preference
+from app.backend.db.repository import ROLLUP_COUNTERS, ROLLUP_KEY, Position, Repository
+from app.backend.utils.pagination import PRODUCT_SORT, keyset_filter
+
+NO_ID = {"_id": 0}
+
+# _id of the single catalog_meta document
+VERSION_ID = "catalog"
+
+
+class MongoRepository(Repository):
+    """Motor backend. Writes always go to the primary; catalog and order reads
+    use their own read preferences (MONGO_CATALOG_/MONGO_ORDERS_READ_PREFERENCE).
+    """
+
+    name = "mongo"
+
+    def __init__(self, db, catalog_read_preference=None, orders_read_preference=None):
+        self.db = db
+        catalog = catalog_read_preference or read_preference(
+            settings.MONGO_CATALOG_READ_PREFERENCE, settings.MONGO_CATALOG_MAX_STALENESS_S
+        )
+        orders = orders_read_preference or read_preference(settings.MONGO_ORDERS_READ_PREFERENCE)
+        self.categories = db.get_collection("categories", read_preference=catalog)
+        self.products = db.get_collection("products", read_preference=catalog)
+        self.orders = db.get_collection("orders", read_preference=orders)
+
+    async def init(self) -> None:
+        await ensure_indexes(self.db)
+
+    async def close(self) -> None:
+        self.db.client.close()
+
+    # ---------- Categories ----------
+    async def list_categories(self, limit: int = 100) -> List[dict]:
+        return await self.categories.find({}, NO_ID).to_list(limit)
+
+    async def count_categories(self) -> int:
+        return await self.categories.count_documents({})
+
+    async def insert_categories(self, docs: List[dict]) -> None:
+        # insert_many adds _id to the dicts it is given
+        await self.db.categories.insert_many([dict(d) for d in docs])
+
+    # ---------- Products ----------
+    async def products_by_id(self, ids: Sequence[str]) -> Dict[str, dict]:
+        docs = await self.products.find({"id": {"$in": list(ids)}}, NO_ID).to_list(None)
+        return {d["id"]: d for d in docs}
+
+    async def list_products(self, category: Optional[str] = None, limit: int = 50) -> List[dict]:
+        query = {"category_slug": category} if category else {}
+        return await self.products.find(query, NO_ID).sort(PRODUCT_SORT).limit(limit).to_list(limit)
+
+    async def product_page(self, category: Optional[str], after: Optional[Position], limit: int) -> List[dict]:
+        query = keyset_filter(after) if after else {}
+        if category:
+            query["category_slug"] = category
+        return await self.products.find(query, NO_ID).sort(PRODUCT_SORT).limit(limit).to_list(limit)
+
+    async def iter_products(self, category: Optional[str] = None, fields: Optional[Sequence[str]] = None):
+        query = {"category_slug": category} if category else {}
+        projection = {**NO_ID, **{f: 1 for f in fields}} if fields else NO_ID
+        async for doc in self.products.find(query, projection).sort(PRODUCT_SORT).batch_size(500):
+            yield doc
+
+    async def count_products(self) -> int:
+        return await self.products.count_documents({})
+
+    async def insert_products(self, docs: List[dict]) -> None:
+        await self.db.products.insert_many([dict(d) for d in docs])
+
+    @staticmethod
+    def _upsert_product(doc: dict) -> UpdateOne:
+        fields = {k: v for k, v in doc.items() if k != "created_at"}
+        return UpdateOne({"id": doc["id"]}, {"$set": fields, "$setOnInsert": {"created_at": doc["created_at"]}}, upsert=True)
+
+    async def write_products(self, batch: List[Tuple[dict, bool]]) -> Dict[int, str]:
+        ops = [self._upsert_product(doc) if upsert else InsertOne(dict(doc)) for doc, upsert in batch]
+        try:
+            await self.db.products.bulk_write(ops, ordered=False)
+        except BulkWriteError as exc:
+            return {err["index"]: err.get("errmsg", "write failed") for err in exc.details.get("writeErrors", [])}
+        return {}
+
+    # ---------- Orders ----------
+    async def insert_order(self, doc: dict) -> None:
+        await self.db.orders.insert_one(dict(doc))
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        return await self.orders.find_one({"id": order_id}, NO_ID)
+
+    async def orders_for_email(self, email: str, limit: int) -> List[dict]:
+        return await self.orders.find({"email": email}, NO_ID).sort("created_at", -1).limit(limit).to_list(limit)
+
+    async def set_order_status(self, order_id: str, status: str, expected: Optional[str] = None) -> bool:
+        query = {"id": order_id} if expected is None else {"id": order_id, "status": expected}
+        result = await self.db.orders.update_one(query, {"$set": {"status": status}})
+        return result.matched_count == 1
+
+    async def iter_orders(self):
+        # Backfills read the primary: a lagging secondary would drop recent orders
+        async for doc in self.db.orders.find({}, NO_ID).sort("created_at", 1).batch_size(1000):
+            yield doc
+
+    # ---------- Checkout sessions ----------
+    async def insert_checkout_session(self, doc: dict) -> None:
+        await self.db.checkout_sessions.insert_one(dict(doc))
+
+    async def delete_checkout_session(self, session_id: str) -> None:
+        await self.db.checkout_sessions.delete_one({"id": session_id})
+
+    # ---------- Sales rollups ----------
+    async def add_rollups(self, rows: List[dict]) -> None:
+        if not rows:
+            return
+        ops = [
+            UpdateOne(
+                {k: row[k] for k in ROLLUP_KEY},
+                {"$inc": {c: row.get(c, 0) for c in ROLLUP_COUNTERS}},
+                upsert=True,
+            )
+            for row in rows
+        ]
+        await self.db.sales_rollups.bulk_write(ops, ordered=False)
+
+    async def rollups(self, start: str, end: str) -> List[dict]:
+        return await self.db.sales_rollups.find({"day": {"$gte": start, "$lte": end}}, NO_ID).to_list(None)
+
+    async def replace_rollups(self, rows: List[dict]) -> None:
+        await self.db.sales_rollups.delete_many({})
+        if rows:
+            await self.db.sales_rollups.insert_many([dict(r) for r in rows])
+
+    # ---------- Inventory ----------
+    # One document per (product_id, shard): concurrent reservations on different
+    # shards of a hot product update different documents and never conflict
+    async def set_inventory(self, product_id: str, shards: List[int]) -> None:
+        ops = [DeleteMany({"product_id": product_id, "shard": {"$gte": len(shards)}})]
+        ops += [
+            UpdateOne({"product_id": product_id, "shard": shard}, {"$set": {"available": available}}, upsert=True)
+            for shard, available in enumerate(shards)
+        ]
+        await self.db.inventory.bulk_write(ops, ordered=True)
+
+    async def inventory(self, product_ids: Sequence[str]) -> Dict[str, List[int]]:
+        # Primary reads: shard choice should not be steered by a lagging secondary
+        docs = await self.db.inventory.find({"product_id": {"$in": list(product_ids)}}, NO_ID).to_list(None)
+        result: Dict[str, Dict[int, int]] = {}
+        for doc in docs:
+            result.setdefault(doc["product_id"], {})[doc["shard"]] = doc["available"]
+        return {pid: [shards.get(i, 0) for i in range(max(shards) + 1)] for pid, shards in result.items()}
+
+    async def take_stock(self, product_id: str, shard: int, quantity: int) -> bool:
+        result = await self.db.inventory.update_one(
+            {"product_id": product_id, "shard": shard, "available": {"$gte": quantity}},
+            {"$inc": {"available": -quantity}},
+        )
+        return result.modified_count == 1
+
+    async def return_stock(self, product_id: str, shard: int, quantity: int) -> None:
+        result = await self.db.inventory.update_one(
+            {"product_id": product_id, "shard": shard}, {"$inc": {"available": quantity}}
+        )
+        if result.matched_count == 0 and shard != 0:
+            # The shard was removed by resharding since the stock was taken
+            await self.db.inventory.update_one({"product_id": product_id, "shard": 0}, {"$inc": {"available": quantity}})
+
+    async def insert_reservation(self, doc: dict) -> None:
+        await self.db.reservations.insert_one(dict(doc))
+
+    async def keep_reservation(self, order_id: str) -> None:
+        # A null expiry never matches $lt, so the sweep skips it
+        await self.db.reservations.update_one({"order_id": order_id}, {"$set": {"expires_at": None}})
+
+    async def claim_reservation(self, order_id: str) -> Optional[dict]:
+        return await self.db.reservations.find_one_and_delete({"order_id": order_id}, projection=NO_ID)
+
+    async def expired_reservations(self, before: datetime, limit: int) -> List[dict]:
+        query = {"expires_at": {"$lt": before}}
+        return await self.db.reservations.find(query, NO_ID).sort("expires_at", 1).limit(limit).to_list(limit)
+
+    # ---------- Downloads ----------
+    async def add_download_bytes(self, order_id: str, product_id: str, nbytes: int) -> int:
+        # Two first requests can race to upsert the same key; the loser retries as a plain update
+        for attempt in range(2):
+            try:
+                doc = await self.db.download_counts.find_one_and_update(
+                    {"order_id": order_id, "product_id": product_id},
+                    {"$inc": {"bytes": nbytes}},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER,
+                )
+                return doc["bytes"]
+            except DuplicateKeyError:
+                if attempt:
+                    raise
+
+    # ---------- Catalog version ----------
+    async def catalog_version(self) -> Optional[dict]:
+        return await self.db.catalog_meta.find_one({"_id": VERSION_ID}, NO_ID)
+
+    async def bump_catalog_version(self, now: datetime) -> dict:
+        return await self.db.catalog_meta.find_one_and_update(
+            {"_id": VERSION_ID},
+            {"$inc": {"version": 1}, "$set": {"updated_at": now}},
+            projection=NO_ID,
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
@@ -0,0 +1,375 @@
+"""Storage interface for products, categories, orders, checkout sessions, sales
+rollups, inventory and the catalog version.
+
+server.py talks to one ``Repository`` chosen by ``STORAGE_BACKEND``:
+
+- ``mongo``: Motor (db/mongo_repository.py), the production backend
+- ``sql``: async SQLAlchemy on DATABASE_URL (db/sql_repository.py)
+- ``memory``: dicts in this process, for load-testing the API layer without a database
+
+Documents go in and come out as plain dicts shaped like the API models, with
+``created_at`` as an aware UTC datetime. Caching, batching and search sit
+above this layer and work the same for every backend.
+"""
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# (created_at, id) of the last row already returned by a keyset page
+Position = Tuple[datetime, str]
+
+BACKENDS = ("mongo", "sql", "memory")
+
+# A sales rollup row is identified by its key fields and carries additive counters
+ROLLUP_KEY = ("day", "category", "delivery_method", "status")
+ROLLUP_COUNTERS = ("orders", "units", "revenue_cents")
+
+
+def utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+class Repository:
+    """Operations the API needs; every backend implements all of them."""
+
+    name = ""
+
+    async def init(self) -> None:
+        """Create indexes/tables. Called once on startup."""
+
+    async def close(self) -> None:
+        pass
+
+    # ---------- Categories ----------
+    async def list_categories(self, limit: int = 100) -> List[dict]:
+        raise NotImplementedError
+
+    async def count_categories(self) -> int:
+        raise NotImplementedError
+
+    async def insert_categories(self, docs: List[dict]) -> None:
+        raise NotImplementedError
+
+    # ---------- Products ----------
+    async def products_by_id(self, ids: Sequence[str]) -> Dict[str, dict]:
+        raise NotImplementedError
+
+    async def list_products(self, category: Optional[str] = None, limit: int = 50) -> List[dict]:
+        """Newest first."""
+        raise NotImplementedError
+
+    async def product_page(self, category: Optional[str], after: Optional[Position], limit: int) -> List[dict]:
+        """Up to ``limit`` products following ``after`` in PRODUCT_SORT order."""
+        raise NotImplementedError
+
+    def iter_products(self, category: Optional[str] = None, fields: Optional[Sequence[str]] = None) -> AsyncIterator[dict]:
+        """All products in PRODUCT_SORT order, streamed; ``fields`` limits the keys returned."""
+        raise NotImplementedError
+
+    async def count_products(self) -> int:
+        raise NotImplementedError
+
+    async def insert_products(self, docs: List[dict]) -> None:
+        raise NotImplementedError
+
+    async def write_products(self, batch: List[Tuple[dict, bool]]) -> Dict[int, str]:
+        """Insert, or upsert by id when the flag is set; returns errors by batch index.
+
+        An upsert of an existing product keeps its stored ``created_at``, so
+        re-imported products keep their place in PRODUCT_SORT order.
+        """
+        raise NotImplementedError
+
+    # ---------- Orders ----------
+    async def insert_order(self, doc: dict) -> None:
+        raise NotImplementedError
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def orders_for_email(self, email: str, limit: int) -> List[dict]:
+        """Newest first."""
+        raise NotImplementedError
+
+    async def set_order_status(self, order_id: str, status: str, expected: Optional[str] = None) -> bool:
+        """Set the status, only if it currently is ``expected`` when given; True if the order changed."""
+        raise NotImplementedError
+
+    def iter_orders(self) -> AsyncIterator[dict]:
+        """All orders, oldest first, streamed."""
+        raise NotImplementedError
+
+    # ---------- Checkout sessions ----------
+    async def insert_checkout_session(self, doc: dict) -> None:
+        raise NotImplementedError
+
+    async def delete_checkout_session(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    # ---------- Sales rollups ----------
+    async def add_rollups(self, rows: List[dict]) -> None:
+        """Add each row's ROLLUP_COUNTERS to the rollup with the same ROLLUP_KEY, creating it if needed."""
+        raise NotImplementedError
+
+    async def rollups(self, start: str, end: str) -> List[dict]:
+        """Rollups for days ``start`` to ``end`` inclusive (``YYYY-MM-DD``)."""
+        raise NotImplementedError
+
+    async def replace_rollups(self, rows: List[dict]) -> None:
+        """Swap every stored rollup for ``rows`` (used by backfills)."""
+        raise NotImplementedError
+
+    # ---------- Inventory ----------
+    async def set_inventory(self, product_id: str, shards: List[int]) -> None:
+        """Replace a product's stock with one counter per shard."""
+        raise NotImplementedError
+
+    async def inventory(self, product_ids: Sequence[str]) -> Dict[str, List[int]]:
+        """Available units per shard for the tracked products among ``product_ids``."""
+        raise NotImplementedError
+
+    async def take_stock(self, product_id: str, shard: int, quantity: int) -> bool:
+        """Atomically take ``quantity`` units from one shard if it has them; False otherwise."""
+        raise NotImplementedError
+
+    async def return_stock(self, product_id: str, shard: int, quantity: int) -> None:
+        """Add ``quantity`` back to a shard, or to shard 0 if resharding removed it."""
+        raise NotImplementedError
+
+    async def insert_reservation(self, doc: dict) -> None:
+        """Record the stock taken for an order: ``order_id``, ``items`` and ``expires_at``."""
+        raise NotImplementedError
+
+    async def keep_reservation(self, order_id: str) -> None:
+        """Clear a reservation's expiry: the order was paid, so only a cancel releases it now."""
+        raise NotImplementedError
+
+    async def claim_reservation(self, order_id: str) -> Optional[dict]:
+        """Remove and return an order's reservation; only one caller ever gets it."""
+        raise NotImplementedError
+
+    async def expired_reservations(self, before: datetime, limit: int) -> List[dict]:
+        raise NotImplementedError
+
+    # ---------- Downloads ----------
+    async def add_download_bytes(self, order_id: str, product_id: str, nbytes: int) -> int:
+        """Atomically add ``nbytes`` (may be negative) to an order item's bytes sent; returns the new total."""
+        raise NotImplementedError
+
+    # ---------- Catalog version ----------
+    async def catalog_version(self) -> Optional[dict]:
+        """The stored ``version`` and ``updated_at``; None until the first bump."""
+        raise NotImplementedError
+
+    async def bump_catalog_version(self, now: datetime) -> dict:
+        """Atomically add one to the version and set ``updated_at`` to ``now``; returns the new record."""
+        raise NotImplementedError
+
+
+def _project(doc: dict, fields: Optional[Sequence[str]]) -> dict:
+    if fields is None:
+        return dict(doc)
+    return {k: doc[k] for k in fields if k in doc}
+
+
+class MemoryRepository(Repository):
+    """Everything in process. Products are kept sorted by (created_at, id) so
+    listings and keyset pages are bisections rather than scans.
+
+    Returned documents are shallow copies; callers may not mutate nested values.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self.categories: Dict[str, dict] = {}
+        self.products: Dict[str, dict] = {}
+        self.orders: Dict[str, dict] = {}
+        self.checkout_sessions: Dict[str, dict] = {}
+        self.sales_rollups: Dict[tuple, dict] = {}
+        self.inventory_shards: Dict[str, List[int]] = {}
+        self.reservations: Dict[str, dict] = {}
+        self.download_bytes: Dict[Tuple[str, str], int] = {}
+        self.catalog_meta: Optional[dict] = None
+        # Ascending (created_at, id); reversed iteration gives PRODUCT_SORT order
+        self._product_keys: List[Position] = []
+
+    @staticmethod
+    def _key(doc: dict) -> Position:
+        return utc(doc["created_at"]), doc["id"]
+
+    async def list_categories(self, limit: int = 100) -> List[dict]:
+        return [dict(c) for c in list(self.categories.values())[:limit]]
+
+    async def count_categories(self) -> int:
+        return len(self.categories)
+
+    async def insert_categories(self, docs: List[dict]) -> None:
+        for doc in docs:
+            self.categories[doc["id"]] = dict(doc)
+
+    def _put_product(self, doc: dict) -> None:
+        previous = self.products.get(doc["id"])
+        if previous is not None:
+            keys = self._product_keys
+            del keys[bisect_left(keys, self._key(previous))]
+            doc = {**doc, "created_at": previous["created_at"]}
+        self.products[doc["id"]] = dict(doc)
+        insort(self._product_keys, self._key(doc))
+
+    def _descending(self, before: Optional[Position] = None) -> Iterable[dict]:
+        keys = self._product_keys
+        end = bisect_left(keys, before) if before is not None else len(keys)
+        for i in range(end - 1, -1, -1):
+            yield self.products[keys[i][1]]
+
+    def _select(self, category: Optional[str], before: Optional[Position], limit: Optional[int]) -> List[dict]:
+        out = []
+        for doc in self._descending(before):
+            if category and doc.get("category_slug") != category:
+                continue
+            out.append(dict(doc))
+            if limit is not None and len(out) >= limit:
+                break
+        return out
+
+    async def products_by_id(self, ids: Sequence[str]) -> Dict[str, dict]:
+        return {pid: dict(self.products[pid]) for pid in ids if pid in self.products}
+
+    async def list_products(self, category: Optional[str] = None, limit: int = 50) -> List[dict]:
+        return self._select(category, None, limit)
+
+    async def product_page(self, category: Optional[str], after: Optional[Position], limit: int) -> List[dict]:
+        return self._select(category, (utc(after[0]), after[1]) if after else None, limit)
+
+    async def iter_products(self, category: Optional[str] = None, fields: Optional[Sequence[str]] = None):
+        for doc in self._select(category, None, None):
+            yield _project(doc, fields)
+
+    async def count_products(self) -> int:
+        return len(self.products)
+
+    async def insert_products(self, docs: List[dict]) -> None:
+        for doc in docs:
+            if doc["id"] in self.products:
+                raise ValueError(f"Duplicate product id {doc['id']}")
+        for doc in docs:
+            self._put_product(doc)
+
+    async def write_products(self, batch: List[Tuple[dict, bool]]) -> Dict[int, str]:
+        errors = {}
+        for index, (doc, upsert) in enumerate(batch):
+            if not upsert and doc["id"] in self.products:
+                errors[index] = f"duplicate product id {doc['id']}"
+                continue
+            self._put_product(doc)
+        return errors
+
+    async def insert_order(self, doc: dict) -> None:
+        self.orders[doc["id"]] = dict(doc)
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        doc = self.orders.get(order_id)
+        return dict(doc) if doc is not None else None
+
+    async def orders_for_email(self, email: str, limit: int) -> List[dict]:
+        docs = [d for d in self.orders.values() if d.get("email") == email]
+        docs.sort(key=lambda d: utc(d["created_at"]), reverse=True)
+        return [dict(d) for d in docs[:limit]]
+
+    async def set_order_status(self, order_id: str, status: str, expected: Optional[str] = None) -> bool:
+        doc = self.orders.get(order_id)
+        if doc is None or (expected is not None and doc["status"] != expected):
+            return False
+        self.orders[order_id] = {**doc, "status": status}
+        return True
+
+    async def iter_orders(self):
+        for doc in sorted(self.orders.values(), key=lambda d: utc(d["created_at"])):
+            yield dict(doc)
+
+    async def insert_checkout_session(self, doc: dict) -> None:
+        self.checkout_sessions[doc["id"]] = dict(doc)
+
+    async def delete_checkout_session(self, session_id: str) -> None:
+        self.checkout_sessions.pop(session_id, None)
+
+    async def add_rollups(self, rows: List[dict]) -> None:
+        for row in rows:
+            key = tuple(row[k] for k in ROLLUP_KEY)
+            current = self.sales_rollups.setdefault(key, {**dict(zip(ROLLUP_KEY, key)), **dict.fromkeys(ROLLUP_COUNTERS, 0)})
+            for counter in ROLLUP_COUNTERS:
+                current[counter] += row.get(counter, 0)
+
+    async def rollups(self, start: str, end: str) -> List[dict]:
+        return [dict(r) for r in self.sales_rollups.values() if start <= r["day"] <= end]
+
+    async def replace_rollups(self, rows: List[dict]) -> None:
+        self.sales_rollups = {}
+        await self.add_rollups(rows)
+
+    async def set_inventory(self, product_id: str, shards: List[int]) -> None:
+        self.inventory_shards[product_id] = list(shards)
+
+    async def inventory(self, product_ids: Sequence[str]) -> Dict[str, List[int]]:
+        return {pid: list(self.inventory_shards[pid]) for pid in product_ids if pid in self.inventory_shards}
+
+    async def take_stock(self, product_id: str, shard: int, quantity: int) -> bool:
+        # No await between the check and the decrement, so this is atomic on the event loop
+        shards = self.inventory_shards.get(product_id)
+        if shards is None or shard >= len(shards) or shards[shard] < quantity:
+            return False
+        shards[shard] -= quantity
+        return True
+
+    async def return_stock(self, product_id: str, shard: int, quantity: int) -> None:
+        shards = self.inventory_shards.get(product_id)
+        if shards is not None:
+            shards[shard if shard < len(shards) else 0] += quantity
+
+    async def insert_reservation(self, doc: dict) -> None:
+        self.reservations[doc["order_id"]] = dict(doc)
+
+    async def keep_reservation(self, order_id: str) -> None:
+        if order_id in self.reservations:
+            self.reservations[order_id]["expires_at"] = None
+
+    async def claim_reservation(self, order_id: str) -> Optional[dict]:
+        return self.reservations.pop(order_id, None)
+
+    async def expired_reservations(self, before: datetime, limit: int) -> List[dict]:
+        expired = sorted(
+            (r for r in self.reservations.values() if r["expires_at"] is not None and utc(r["expires_at"]) < before),
+            key=lambda r: utc(r["expires_at"]),
+        )
+        return [dict(r) for r in expired[:limit]]
+
+    async def add_download_bytes(self, order_id: str, product_id: str, nbytes: int) -> int:
+        total = self.download_bytes.get((order_id, product_id), 0) + nbytes
+        self.download_bytes[(order_id, product_id)] = total
+        return total
+
+    async def catalog_version(self) -> Optional[dict]:
+        return dict(self.catalog_meta) if self.catalog_meta is not None else None
+
+    async def bump_catalog_version(self, now: datetime) -> dict:
+        version = self.catalog_meta["version"] + 1 if self.catalog_meta is not None else 1
+        self.catalog_meta = {"version": version, "updated_at": now}
+        return dict(self.catalog_meta)
+
+
+def create_repository(backend: str, db=None) -> Repository:
+    """Repository for ``backend``; ``db`` is the Motor database used by ``mongo``."""
+    if backend == "mongo":
+        from app.backend.db.mongo_repository import MongoRepository
+
+        return MongoRepository(db)
+    if backend == "sql":
+        from app.backend.db.sql_repository import SQLRepository
+
+        return SQLRepository()
+    if backend == "memory":
+        return MemoryRepository()
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; expected one of {', '.join(BACKENDS)}")
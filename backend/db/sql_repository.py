@@ -0,0 +1,468 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    and_,
+    bindparam,
+    func,
+    or_,
+    select,
+)
+from sqlalchemy.exc import IntegrityError
+
+from app.backend.core.responses import dumps
+from app.backend.db.repository import ROLLUP_COUNTERS, ROLLUP_KEY, Position, Repository, _project, utc
+
+# Separate from db/connection.py's Base: the legacy integer-id ``products`` table
+# used by routes/product_routes.py lives in the same database.
+metadata = MetaData()
+
+# Columns hold what is filtered or sorted on; ``doc`` holds the full API document
+categories = Table(
+    "categories",
+    metadata,
+    Column("id", String(64), primary_key=True),
+    Column("slug", String(64), index=True),
+    Column("doc", Text, nullable=False),
+)
+
+catalog_products = Table(
+    "catalog_products",
+    metadata,
+    Column("id", String(64), primary_key=True),
+    Column("category_slug", String(32)),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("doc", Text, nullable=False),
+    Index("catalog_products_created_at_id", "created_at", "id"),
+    Index("catalog_products_category_created_at_id", "category_slug", "created_at", "id"),
+)
+
+orders = Table(
+    "orders",
+    metadata,
+    Column("id", String(64), primary_key=True),
+    Column("email", String(320), nullable=False),
+    Column("status", String(32), nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("doc", Text, nullable=False),
+    Index("orders_email_created_at", "email", "created_at"),
+)
+
+checkout_sessions = Table(
+    "checkout_sessions",
+    metadata,
+    Column("id", String(64), primary_key=True),
+    Column("order_id", String(64), index=True),
+    Column("doc", Text, nullable=False),
+)
+
+sales_rollups = Table(
+    "sales_rollups",
+    metadata,
+    Column("day", String(10), primary_key=True),
+    Column("category", String(32), primary_key=True),
+    Column("delivery_method", String(32), primary_key=True),
+    Column("status", String(32), primary_key=True),
+    Column("orders", BigInteger, nullable=False, default=0),
+    Column("units", BigInteger, nullable=False, default=0),
+    Column("revenue_cents", BigInteger, nullable=False, default=0),
+)
+
+# One row per (product, shard); reservations spread over the shards of hot products
+inventory = Table(
+    "inventory",
+    metadata,
+    Column("product_id", String(64), primary_key=True),
+    Column("shard", Integer, primary_key=True),
+    Column("available", BigInteger, nullable=False),
+)
+
+reservations = Table(
+    "reservations",
+    metadata,
+    Column("order_id", String(64), primary_key=True),
+    # NULL once the order is paid: the sweep never expires it
+    Column("expires_at", DateTime(timezone=True), index=True),
+    Column("doc", Text, nullable=False),
+)
+
+# Bytes sent per order item, shared by every worker for the download limit
+download_counts = Table(
+    "download_counts",
+    metadata,
+    Column("order_id", String(64), primary_key=True),
+    Column("product_id", String(64), primary_key=True),
+    Column("bytes", BigInteger, nullable=False),
+)
+
+# One row: the catalog version every worker builds validators and caches from
+catalog_meta = Table(
+    "catalog_meta",
+    metadata,
+    Column("id", String(32), primary_key=True),
+    Column("version", BigInteger, nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+)
+VERSION_ID = "catalog"
+
+# Counters are added in the database so concurrent writers never lose an increment
+ADD_ROLLUP = (
+    sales_rollups.update()
+    .where(and_(*(sales_rollups.c[k] == bindparam(f"key_{k}") for k in ROLLUP_KEY)))
+    .values({c: sales_rollups.c[c] + bindparam(c) for c in ROLLUP_COUNTERS})
+)
+
+PRODUCT_ORDER = (catalog_products.c.created_at.desc(), catalog_products.c.id.desc())
+PRODUCTS_BY_ID = select(catalog_products).where(catalog_products.c.id.in_(bindparam("ids", expanding=True)))
+ORDER_BY_ID = select(orders).where(orders.c.id == bindparam("order_id"))
+TAKE_STOCK = (
+    inventory.update()
+    .where(
+        inventory.c.product_id == bindparam("pid"),
+        inventory.c.shard == bindparam("sid"),
+        inventory.c.available >= bindparam("quantity"),
+    )
+    .values(available=inventory.c.available - bindparam("quantity"))
+)
+
+
+def _encode(doc: dict) -> str:
+    return dumps(doc).decode()
+
+
+def _product(row) -> dict:
+    doc = orjson.loads(row.doc)
+    doc["created_at"] = utc(row.created_at)
+    return doc
+
+
+def _order(row) -> dict:
+    doc = orjson.loads(row.doc)
+    doc["created_at"] = utc(row.created_at)
+    doc["status"] = row.status
+    return doc
+
+
+def _product_row(doc: dict) -> dict:
+    return {
+        "id": doc["id"],
+        "category_slug": doc.get("category_slug"),
+        "created_at": utc(doc["created_at"]),
+        "doc": _encode(doc),
+    }
+
+
+class SQLRepository(Repository):
+    """Async SQLAlchemy backend on the engine from db/connection.py."""
+
+    name = "sql"
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from app.backend.db.connection import async_engine as engine
+        self.engine = engine
+
+    async def init(self) -> None:
+        async with self.engine.begin() as conn:
+            await conn.run_sync(metadata.create_all)
+
+    async def close(self) -> None:
+        await self.engine.dispose()
+
+    # ---------- Categories ----------
+    async def list_categories(self, limit: int = 100) -> List[dict]:
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(select(categories.c.doc).limit(limit))
+            return [orjson.loads(r.doc) for r in rows]
+
+    async def count_categories(self) -> int:
+        async with self.engine.connect() as conn:
+            return await conn.scalar(select(func.count()).select_from(categories))
+
+    async def insert_categories(self, docs: List[dict]) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(categories.insert(), [{"id": d["id"], "slug": d["slug"], "doc": _encode(d)} for d in docs])
+
+    # ---------- Products ----------
+    async def products_by_id(self, ids: Sequence[str]) -> Dict[str, dict]:
+        if not ids:
+            return {}
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(PRODUCTS_BY_ID, {"ids": list(ids)})
+            return {r.id: _product(r) for r in rows}
+
+    def _products_query(self, category: Optional[str], after: Optional[Position] = None):
+        query = select(catalog_products).order_by(*PRODUCT_ORDER)
+        if category:
+            query = query.where(catalog_products.c.category_slug == category)
+        if after:
+            created_at, last_id = utc(after[0]), after[1]
+            query = query.where(
+                or_(
+                    catalog_products.c.created_at < created_at,
+                    and_(catalog_products.c.created_at == created_at, catalog_products.c.id < last_id),
+                )
+            )
+        return query
+
+    async def list_products(self, category: Optional[str] = None, limit: int = 50) -> List[dict]:
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(self._products_query(category).limit(limit))
+            return [_product(r) for r in rows]
+
+    async def product_page(self, category: Optional[str], after: Optional[Position], limit: int) -> List[dict]:
+        async with self.engine.connect() as conn:
+            rows = await conn.execute(self._products_query(category, after).limit(limit))
+            return [_product(r) for r in rows]
+
+    async def iter_products(self, category: Optional[str] = None, fields: Optional[Sequence[str]] = None):
+        async with self.engine.connect() as conn:
+            result = await conn.stream(self._products_query(category).execution_options(yield_per=500))
+            async for row in result:
+                yield _project(_product(row), fields)
+
+    async def count_products(self) -> int:
+        async with self.engine.connect() as conn:
+            return await conn.scalar(select(func.count()).select_from(catalog_products))
+
+    async def insert_products(self, docs: List[dict]) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(catalog_products.insert(), [_product_row(d) for d in docs])
+
+    async def write_products(self, batch: List[Tuple[dict, bool]]) -> Dict[int, str]:
+        # Upserts are split into insert/update after one lookup of the ids that
+        # already exist, which works the same on every SQL dialect
+        errors: Dict[int, str] = {}
+        inserts, updates = [], []
+        async with self.engine.begin() as conn:
+            ids = [doc["id"] for doc, _ in batch]
+            existing = set((await conn.execute(select(catalog_products.c.id).where(catalog_products.c.id.in_(ids)))).scalars())
+            for index, (doc, upsert) in enumerate(batch):
+                row = _product_row(doc)
+                if doc["id"] not in existing:
+                    existing.add(doc["id"])
+                    inserts.append(row)
+                elif upsert:
+                    updates.append({"row_id": row["id"], "category_slug": row["category_slug"], "doc": row["doc"]})
+                else:
+                    errors[index] = f"duplicate product id {doc['id']}"
+            if inserts:
+                await conn.execute(catalog_products.insert(), inserts)
+            if updates:
+                await conn.execute(
+                    catalog_products.update()
+                    .where(catalog_products.c.id == bindparam("row_id"))
+                    # created_at stays as stored; _product() reads it from the column
+                    .values(category_slug=bindparam("category_slug"), doc=bindparam("doc")),
+                    updates,
+                )
+        return errors
+
+    # ---------- Orders ----------
+    async def insert_order(self, doc: dict) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                orders.insert(),
+                {
+                    "id": doc["id"],
+                    "email": doc["email"],
+                    "status": doc["status"],
+                    "created_at": utc(doc["created_at"]),
+                    "doc": _encode(doc),
+                },
+            )
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        async with self.engine.connect() as conn:
+            row = (await conn.execute(ORDER_BY_ID, {"order_id": order_id})).first()
+            return _order(row) if row is not None else None
+
+    async def orders_for_email(self, email: str, limit: int) -> List[dict]:
+        query = select(orders).where(orders.c.email == email).order_by(orders.c.created_at.desc()).limit(limit)
+        async with self.engine.connect() as conn:
+            return [_order(r) for r in await conn.execute(query)]
+
+    async def set_order_status(self, order_id: str, status: str, expected: Optional[str] = None) -> bool:
+        # The status column is authoritative; _order() overlays it on the stored doc
+        query = orders.update().where(orders.c.id == order_id).values(status=status)
+        if expected is not None:
+            query = query.where(orders.c.status == expected)
+        async with self.engine.begin() as conn:
+            return (await conn.execute(query)).rowcount == 1
+
+    async def iter_orders(self):
+        async with self.engine.connect() as conn:
+            result = await conn.stream(select(orders).order_by(orders.c.created_at).execution_options(yield_per=1000))
+            async for row in result:
+                yield _order(row)
+
+    # ---------- Checkout sessions ----------
+    async def insert_checkout_session(self, doc: dict) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                checkout_sessions.insert(), {"id": doc["id"], "order_id": doc["order_id"], "doc": _encode(doc)}
+            )
+
+    async def delete_checkout_session(self, session_id: str) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(checkout_sessions.delete().where(checkout_sessions.c.id == session_id))
+
+    # ---------- Sales rollups ----------
+    async def add_rollups(self, rows: List[dict]) -> None:
+        # Update-then-insert works on every dialect; an insert that loses a race with
+        # another writer's insert is retried once, when the update will find the row
+        for attempt in range(2):
+            try:
+                async with self.engine.begin() as conn:
+                    for row in rows:
+                        params = {**{f"key_{k}": row[k] for k in ROLLUP_KEY}, **{c: row.get(c, 0) for c in ROLLUP_COUNTERS}}
+                        if (await conn.execute(ADD_ROLLUP, params)).rowcount == 0:
+                            await conn.execute(
+                                sales_rollups.insert(),
+                                {**{k: row[k] for k in ROLLUP_KEY}, **{c: row.get(c, 0) for c in ROLLUP_COUNTERS}},
+                            )
+                return
+            except IntegrityError:
+                if attempt:
+                    raise
+
+    async def rollups(self, start: str, end: str) -> List[dict]:
+        query = select(sales_rollups).where(sales_rollups.c.day.between(start, end))
+        async with self.engine.connect() as conn:
+            return [dict(r._mapping) for r in await conn.execute(query)]
+
+    async def replace_rollups(self, rows: List[dict]) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(sales_rollups.delete())
+            if rows:
+                await conn.execute(sales_rollups.insert(), [{k: r[k] for k in ROLLUP_KEY + ROLLUP_COUNTERS} for r in rows])
+
+    # ---------- Inventory ----------
+    async def set_inventory(self, product_id: str, shards: List[int]) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(inventory.delete().where(inventory.c.product_id == product_id))
+            await conn.execute(
+                inventory.insert(),
+                [{"product_id": product_id, "shard": shard, "available": n} for shard, n in enumerate(shards)],
+            )
+
+    async def inventory(self, product_ids: Sequence[str]) -> Dict[str, List[int]]:
+        query = (
+            select(inventory)
+            .where(inventory.c.product_id.in_(list(product_ids)))
+            .order_by(inventory.c.product_id, inventory.c.shard)
+        )
+        result: Dict[str, List[int]] = {}
+        async with self.engine.connect() as conn:
+            for row in await conn.execute(query):
+                result.setdefault(row.product_id, []).append(row.available)
+        return result
+
+    async def take_stock(self, product_id: str, shard: int, quantity: int) -> bool:
+        # Conditional decrement: the WHERE clause is re-checked under the row lock
+        async with self.engine.begin() as conn:
+            result = await conn.execute(TAKE_STOCK, {"pid": product_id, "sid": shard, "quantity": quantity})
+            return result.rowcount == 1
+
+    async def return_stock(self, product_id: str, shard: int, quantity: int) -> None:
+        def give_back(to: int):
+            return (
+                inventory.update()
+                .where(inventory.c.product_id == product_id, inventory.c.shard == to)
+                .values(available=inventory.c.available + quantity)
+            )
+
+        async with self.engine.begin() as conn:
+            if (await conn.execute(give_back(shard))).rowcount == 0 and shard != 0:
+                # The shard was removed by resharding since the stock was taken
+                await conn.execute(give_back(0))
+
+    async def insert_reservation(self, doc: dict) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                reservations.insert(),
+                {"order_id": doc["order_id"], "expires_at": utc(doc["expires_at"]), "doc": _encode(doc)},
+            )
+
+    async def keep_reservation(self, order_id: str) -> None:
+        async with self.engine.begin() as conn:
+            await conn.execute(
+                reservations.update().where(reservations.c.order_id == order_id).values(expires_at=None)
+            )
+
+    async def claim_reservation(self, order_id: str) -> Optional[dict]:
+        # Whoever deletes the row owns the reservation; everyone else sees rowcount 0
+        async with self.engine.begin() as conn:
+            row = (await conn.execute(select(reservations.c.doc).where(reservations.c.order_id == order_id))).first()
+            if row is None:
+                return None
+            deleted = await conn.execute(reservations.delete().where(reservations.c.order_id == order_id))
+            return orjson.loads(row.doc) if deleted.rowcount == 1 else None
+
+    async def expired_reservations(self, before: datetime, limit: int) -> List[dict]:
+        query = (
+            select(reservations.c.doc)
+            .where(reservations.c.expires_at < before)
+            .order_by(reservations.c.expires_at)
+            .limit(limit)
+        )
+        async with self.engine.connect() as conn:
+            return [orjson.loads(r.doc) for r in await conn.execute(query)]
+
+    # ---------- Downloads ----------
+    async def add_download_bytes(self, order_id: str, product_id: str, nbytes: int) -> int:
+        key = and_(download_counts.c.order_id == order_id, download_counts.c.product_id == product_id)
+        # Update-then-insert, retried once when another worker inserts the row first (as add_rollups)
+        for attempt in range(2):
+            try:
+                async with self.engine.begin() as conn:
+                    updated = await conn.execute(
+                        download_counts.update().where(key).values(bytes=download_counts.c.bytes + nbytes)
+                    )
+                    if updated.rowcount == 0:
+                        await conn.execute(
+                            download_counts.insert(), {"order_id": order_id, "product_id": product_id, "bytes": nbytes}
+                        )
+                        return nbytes
+                    return (await conn.execute(select(download_counts.c.bytes).where(key))).scalar_one()
+            except IntegrityError:
+                if attempt:
+                    raise
+
+    # ---------- Catalog version ----------
+    async def catalog_version(self) -> Optional[dict]:
+        async with self.engine.connect() as conn:
+            return await self._catalog_version(conn)
+
+    @staticmethod
+    async def _catalog_version(conn) -> Optional[dict]:
+        row = (await conn.execute(select(catalog_meta).where(catalog_meta.c.id == VERSION_ID))).first()
+        return {"version": row.version, "updated_at": utc(row.updated_at)} if row is not None else None
+
+    async def bump_catalog_version(self, now: datetime) -> dict:
+        # Update-then-insert, retried once when another worker inserts the row first (as add_rollups).
+        # The record is read back so every worker sees the timestamp as the database stored it.
+        for attempt in range(2):
+            try:
+                async with self.engine.begin() as conn:
+                    updated = await conn.execute(
+                        catalog_meta.update()
+                        .where(catalog_meta.c.id == VERSION_ID)
+                        .values(version=catalog_meta.c.version + 1, updated_at=now)
+                    )
+                    if updated.rowcount == 0:
+                        await conn.execute(catalog_meta.insert(), {"id": VERSION_ID, "version": 1, "updated_at": now})
+                    return await self._catalog_version(conn)
+            except IntegrityError:
+                if attempt:
+                    raise
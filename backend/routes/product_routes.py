@@ -1,35 +1,39 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.backend.db.connection import get_db
+from sqlalchemy import bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.backend.db.connection import get_async_db
 from app.backend.models.product_model import Product
 from app.backend.schemas.product_schema import ProductCreate, ProductResponse
 
 router = APIRouter()
 
+# Built once so every request hits the same compiled-statement cache entry
+LIST_PRODUCTS = select(Product).order_by(Product.id)
+GET_PRODUCT = select(Product).where(Product.id == bindparam("product_id"))
+
 @router.get("/", response_model=list[ProductResponse])
-def get_products(db: Session = Depends(get_db)):
-    return db.query(Product).all()
+async def get_products(db: AsyncSession = Depends(get_async_db)):
+    return (await db.scalars(LIST_PRODUCTS)).all()
 
 @router.get("/{product_id}", response_model=ProductResponse)
-def get_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    product = (await db.scalars(GET_PRODUCT, {"product_id": product_id})).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
 @router.post("/", response_model=ProductResponse)
-def create_product(product: ProductCreate, db: Session = Depends(get_db)):
-    new_product = Product(**product.dict())
+async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_async_db)):
+    new_product = Product(**product.model_dump())
     db.add(new_product)
-    db.commit()
-    db.refresh(new_product)
+    await db.commit()
     return new_product
 
 @router.delete("/{product_id}")
-def delete_product(product_id: int, db: Session = Depends(get_db)):
-    product = db.query(Product).filter(Product.id == product_id).first()
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
+    product = (await db.scalars(GET_PRODUCT, {"product_id": product_id})).first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
-    db.delete(product)
-    db.commit()
+    await db.delete(product)
+    await db.commit()
     return {"message": "Product deleted successfully"}
@@ -1,22 +1,153 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, Depends, File, Header, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import json
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Literal
+from typing import Awaitable, Callable, List, Optional, Literal
 import uuid
-from datetime import datetime, timezone
+from urllib.parse import quote
+import orjson
+from datetime import date, datetime, timedelta, timezone
+from app.backend.auth.jwt_handler import get_current_claims, require_admin, token_cache
+from app.backend.core.analytics import PLACED_STATUSES, backfill, move_order, record_order, sales_summary
+from app.backend.core.cache import TTLCache
+from app.backend.core.catalog_version import CatalogVersion
+from app.backend.core.config import settings
+from app.backend.core.downloads import (
+    AssetStore,
+    DownloadLimiter,
+    FileRangeResponse,
+    InvalidLink,
+    LinkSigner,
+    RangeNotSatisfiable,
+    file_validators,
+    parse_range,
+)
+from app.backend.core.images import IMMUTABLE_CACHE_CONTROL, ImageStore, InvalidImage
+from app.backend.core.inventory import (
+    OutOfStock,
+    release,
+    release_order,
+    reservation_doc,
+    reserve,
+    set_stock,
+    watch_expiry,
+)
+from app.backend.core.idempotency import IdempotencyConflict, IdempotencyInProgress, IdempotencyStore, fingerprint
+from app.backend.core.loader import BatchLoader
+from app.backend.core.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    MetricsMiddleware,
+    MetricsRegistry,
+    MongoCommandMetrics,
+    MongoPoolMonitor,
+)
+from app.backend.core.pricing import (
+    PHYSICAL_CATEGORIES,
+    PriceTable,
+    PricingEngine,
+    PricingError,
+    delivery_rules,
+    from_cents,
+)
+from app.backend.core.products import Product, ProductCreate, product_doc_from_row, with_image
+from app.backend.core.responses import RawJSONResponse, conform, dumps, encode_documents
+from app.backend.core.search import SearchIndex
+from app.backend.core.security import password_hasher
+from app.backend.core.snapshot import CatalogSnapshot, SnapshotStore
+from app.backend.core.slowlog import QueryRecorder, SlowOpLog, SlowRequestMiddleware
+from app.backend.db.indexes import check_indexes, explain_query
+from app.backend.db.mongo import client_options, create_client
+from app.backend.db.repository import create_repository
+from app.backend.utils.bulk_import import import_products, iter_lines, parse_rows
+from app.backend.utils.pagination import cursor_position, encode_cursor
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Request and Mongo command metrics, exported at /api/metrics
+metrics = MetricsRegistry()
+
+# Connection pool state, exported at /api/admin/mongo-pool
+pool_monitor = MongoPoolMonitor(metrics)
+
+# MongoDB connection; only created when Mongo is the storage backend. Pool, timeout
+# and compression options come from settings (see db/mongo.py) and sockets open lazily.
+if settings.STORAGE_BACKEND == "mongo":
+    client = create_client(
+        os.environ['MONGO_URL'], event_listeners=[MongoCommandMetrics(metrics), QueryRecorder(), pool_monitor]
+    )
+    db = client[os.environ['DB_NAME']]
+else:
+    client = db = None
+
+# Products, categories, orders and checkout sessions (STORAGE_BACKEND: mongo, sql or memory)
+repository = create_repository(settings.STORAGE_BACKEND, db=db)
+
+# Catalog reads (list/detail) are served from here until the catalog changes
+catalog_cache = TTLCache(maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL)
+
+# Pre-encoded JSON of individual products, used by the fast response path
+encoded_products = TTLCache(maxsize=settings.CATALOG_CACHE_SIZE * 8, ttl=settings.CATALOG_CACHE_TTL)
+
+# Bumped on every catalog write; drives ETags and cross-worker cache invalidation
+catalog_version = CatalogVersion(repository)
+
+# Token revocations shared by all workers (in-process only without Mongo)
+token_cache.use_collection(db.token_revocations if db is not None else None)
+
+# Full-text index over title/description, rebuilt on startup and kept in sync on writes
+search_index = SearchIndex()
+
+async def fetch_products_by_id(ids: List[str]) -> dict:
+    return await repository.products_by_id(ids)
+
+# Every product-by-id read goes through here so concurrent lookups share one $in query
+product_loader = BatchLoader(
+    fetch_products_by_id,
+    max_batch_size=settings.PRODUCT_LOADER_MAX_BATCH,
+    window=settings.PRODUCT_LOADER_WINDOW_MS / 1000,
+)
+
+# Cart pricing: catalog prices cached per product until the catalog changes
+price_table = PriceTable(
+    product_loader.load_many, maxsize=settings.CATALOG_CACHE_SIZE * 8, ttl=settings.CATALOG_CACHE_TTL
+)
+pricing = PricingEngine(
+    price_table, delivery_rules(settings.DELIVERY_FEE_CENTS, settings.FREE_DELIVERY_OVER_CENTS)
+)
+
+async def load_catalog_snapshot():
+    # Snapshot records are sent as-is, so they get the response models' shape here
+    categories = [conform(doc, Category) for doc in await repository.list_categories(100)]
+    return categories, (conform(doc, Product) async for doc in repository.iter_products())
+
+# Pre-encoded catalog file memory-mapped by every worker (CATALOG_SNAPSHOT_PATH)
+catalog_snapshot = SnapshotStore(settings.CATALOG_SNAPSHOT_PATH, load_catalog_snapshot)
+
+# Uploaded product image originals and their resized derivatives (IMAGE_ROOT)
+image_store = ImageStore(
+    settings.IMAGE_ROOT,
+    widths=settings.IMAGE_WIDTHS,
+    formats=settings.IMAGE_FORMATS,
+    quality=settings.IMAGE_QUALITY,
+    max_workers=settings.IMAGE_WORKERS,
+)
+
+# Files sold as digital products, the signed links to them and per-order download counts
+download_assets = AssetStore(settings.DOWNLOAD_ROOT)
+download_links = LinkSigner(settings.SECRET_KEY, ttl=settings.DOWNLOAD_LINK_TTL)
+download_limiter = DownloadLimiter(settings.DOWNLOAD_LIMIT)
+
+# Responses of POSTs sent with an Idempotency-Key, replayed on retries
+idempotency = IdempotencyStore(
+    db.idempotency_keys if db is not None else None, ttl=settings.IDEMPOTENCY_TTL, lease=settings.IDEMPOTENCY_LEASE
+)
 
 # Create the main app without a prefix
 app = FastAPI()
@@ -24,6 +155,9 @@ app = FastAPI()
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Operational endpoints, mounted under /api/admin and restricted to admin tokens
+admin_router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin)])
+
 # ---------- Models ----------
 class Category(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -31,35 +165,40 @@ class Category(BaseModel):
     name: str
     slug: str
 
-class Product(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    title: str
-    description: str
-    price: float
-    currency: str = "USD"
-    category_slug: Literal["digital", "prints", "local"]
-    image_url: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+class ProductPage(BaseModel):
+    items: List[Product]
+    next_cursor: Optional[str] = None
 
-class ProductCreate(BaseModel):
-    title: str
-    description: str
-    price: float
-    currency: str = "USD"
-    category_slug: Literal["digital", "prints", "local"]
-    image_url: Optional[str] = None
+class ProductImage(BaseModel):
+    image_id: str
 
 class CartItem(BaseModel):
     product_id: str
     quantity: int = 1
 
+class OrderItem(CartItem):
+    # Catalog values at the time of the order; absent on orders placed before they were stored
+    title: Optional[str] = None
+    unit_price: Optional[float] = None
+    category_slug: Optional[str] = None
+
 class Address(BaseModel):
     line1: Optional[str] = None
     city: Optional[str] = None
     state: Optional[str] = None
     postal_code: Optional[str] = None
 
+OrderStatus = Literal["created", "pending_payment", "paid", "fulfilled", "cancelled"]
+
+# Allowed status changes; fulfilled and cancelled orders are final
+ORDER_TRANSITIONS = {
+    "created": {"pending_payment", "paid", "cancelled"},
+    "pending_payment": {"paid", "cancelled"},
+    "paid": {"fulfilled", "cancelled"},
+    "fulfilled": set(),
+    "cancelled": set(),
+}
+
 class Order(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -68,14 +207,34 @@ class Order(BaseModel):
     notes: Optional[str] = None
     delivery_method: Literal["pickup", "delivery", "digital"] = "digital"
     address: Optional[Address] = None
-    items: List[CartItem]
+    items: List[OrderItem]
     subtotal: float
     delivery_fee: float
     total: float
     currency: str = "USD"
-    status: Literal["created", "pending_payment", "paid", "fulfilled", "cancelled"] = "created"
+    status: OrderStatus = "created"
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class QuoteRequest(BaseModel):
+    delivery_method: Literal["pickup", "delivery", "digital"] = "digital"
+    items: List[CartItem]
+
+class QuoteLine(BaseModel):
+    product_id: str
+    title: str
+    quantity: int
+    unit_price: float
+    line_total: float
+    category_slug: str
+
+class Quote(BaseModel):
+    items: List[QuoteLine]
+    subtotal: float
+    delivery_fee: float
+    total: float
+    currency: str = "USD"
+    delivery_rule: Optional[str] = None
+
 class OrderCreate(BaseModel):
     email: str
     name: str
@@ -84,6 +243,13 @@ class OrderCreate(BaseModel):
     address: Optional[Address] = None
     items: List[CartItem]
 
+class OrderStatusUpdate(BaseModel):
+    status: OrderStatus
+
+class InventoryUpdate(BaseModel):
+    quantity: int = Field(ge=0)
+    shards: Optional[int] = Field(None, ge=1, le=64)
+
 class CheckoutSessionCreate(BaseModel):
     order_id: str
 
@@ -95,13 +261,117 @@ class CheckoutSession(BaseModel):
     checkout_url: str
     status: Literal["created", "completed"] = "created"
 
+class TokenRevoke(BaseModel):
+    token: Optional[str] = None
+    jti: Optional[str] = None
+
+class DownloadLink(BaseModel):
+    product_id: str
+    title: str
+    filename: str
+    url: str
+    expires_at: datetime
+
+class CheckoutResult(BaseModel):
+    order: Order
+    session: CheckoutSession
+
 # ---------- Utilities ----------
-async def serialize_datetime(doc: dict) -> dict:
-    out = {**doc}
-    for k, v in list(out.items()):
-        if isinstance(v, datetime):
-            out[k] = v.isoformat()
-    return out
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+async def catalog_changed(docs: List[dict]) -> None:
+    """Keep in-process catalog state in step with product writes."""
+    search_index.add_many(docs)
+    await catalog_version.bump()
+    catalog_cache.clear()
+    encoded_products.clear()
+    price_table.clear()
+    catalog_snapshot.request(catalog_version.stamp)
+
+async def remote_catalog_changed(version: int) -> None:
+    """Another worker changed the catalog: drop local state built from the old one."""
+    logger.info("Catalog version %d written by another worker; refreshing", version)
+    catalog_cache.clear()
+    encoded_products.clear()
+    price_table.clear()
+    catalog_snapshot.request(catalog_version.stamp)
+    await build_search_index()
+
+async def catalog_validators(request: Request, response: Response) -> None:
+    """ETag/Last-Modified for catalog reads; repeat visits get a 304 without touching Mongo."""
+    etag = catalog_version.etag(f"{request.url.path}?{request.url.query}")
+    headers = {
+        "ETag": etag,
+        "Last-Modified": catalog_version.last_modified,
+        "Cache-Control": f"public, max-age={settings.CATALOG_MAX_AGE}, must-revalidate",
+    }
+    if catalog_version.not_modified(etag, request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+def product_json(doc: dict) -> bytes:
+    encoded = encoded_products.get(doc["id"])
+    if encoded is None:
+        encoded = dumps(conform(doc, Product))
+        encoded_products.set(doc["id"], encoded)
+    return encoded
+
+def catalog_response(value, response: Response):
+    """Fast path: stored catalog documents are sent as-is, skipping response_model."""
+    if not settings.FAST_JSON_RESPONSES:
+        return value
+    # A returned Response does not inherit headers set on the injected one
+    headers = dict(response.headers)
+    if isinstance(value, list):
+        return RawJSONResponse(encode_documents(value, product_json), headers=headers)
+    return RawJSONResponse(product_json(value), headers=headers)
+
+def snapshot_response(body: bytes, response: Response):
+    if settings.FAST_JSON_RESPONSES:
+        return RawJSONResponse(body, headers=dict(response.headers))
+    return orjson.loads(body)
+
+def fresh_snapshot() -> Optional[CatalogSnapshot]:
+    return catalog_snapshot.fresh(catalog_version.stamp)
+
+def stale_snapshot_response(response: Response, render: Callable[[CatalogSnapshot], Optional[bytes]]):
+    """Last snapshot of any version, for when the store cannot be reached; None if there is none."""
+    snapshot = catalog_snapshot.current
+    body = render(snapshot) if snapshot is not None else None
+    if body is None:
+        return None
+    logger.warning("Catalog store unavailable; serving snapshot version %d", snapshot.version, exc_info=True)
+    response.headers["Warning"] = '110 - "Response is Stale"'
+    response.headers["Cache-Control"] = "no-store"
+    # catalog_validators described the current version, which this body is not
+    del response.headers["ETag"]
+    del response.headers["Last-Modified"]
+    return snapshot_response(body, response)
+
+def page_response(page: dict, response: Response):
+    if not settings.FAST_JSON_RESPONSES:
+        return page
+    items = encode_documents(page["items"], product_json)
+    body = b'{"items":%s,"next_cursor":%s}' % (items, dumps(page["next_cursor"]))
+    return RawJSONResponse(body, headers=dict(response.headers))
+
+async def idempotent(scope: str, key: Optional[str], payload: BaseModel, handler: Callable[[], Awaitable[BaseModel]]):
+    """Run ``handler`` once per Idempotency-Key; retries get the stored response."""
+    if not key:
+        return await handler()
+
+    async def run():
+        return (await handler()).model_dump(mode="json")
+
+    try:
+        return await idempotency.run(scope, key, fingerprint(payload.model_dump(mode="json")), run)
+    except IdempotencyConflict as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except IdempotencyInProgress as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
 
 async def remove_mongo_id(doc: dict) -> dict:
     if not doc:
@@ -114,109 +384,560 @@ async def remove_mongo_id(doc: dict) -> dict:
 async def root():
     return {"message": "Hello World"}
 
-@api_router.get("/categories", response_model=List[Category])
-async def list_categories():
-    cats = await db.categories.find({}, {"_id": 0}).to_list(100)
-    return cats
-
-@api_router.get("/products", response_model=List[Product])
-async def list_products(category: Optional[str] = None, q: Optional[str] = None, limit: int = 50):
-    query = {}
-    if category:
-        query["category_slug"] = category
-    if q:
-        query["title"] = {"$regex": q, "$options": "i"}
-    products = await db.products.find(query, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(limit)
-    # Convert created_at back to datetime
-    for p in products:
-        if isinstance(p.get("created_at"), str):
-            p["created_at"] = datetime.fromisoformat(p["created_at"])  # type: ignore
-    return products
-
-@api_router.get("/products/{product_id}", response_model=Product)
-async def get_product(product_id: str):
-    doc = await db.products.find_one({"id": product_id}, {"_id": 0})
+@api_router.get("/categories", response_model=List[Category], dependencies=[Depends(catalog_validators)])
+async def list_categories(response: Response):
+    snapshot = fresh_snapshot()
+    if snapshot is not None:
+        return snapshot_response(snapshot.categories_json(), response)
+    try:
+        return await repository.list_categories(100)
+    except Exception:
+        # Any backend failure; the snapshot is only a fallback, so re-raise without one
+        stale = stale_snapshot_response(response, CatalogSnapshot.categories_json)
+        if stale is None:
+            raise
+        return stale
+
+@api_router.get("/products", response_model=List[Product], dependencies=[Depends(catalog_validators)])
+async def list_products(response: Response, category: Optional[str] = None, q: Optional[str] = None, limit: int = 50):
+    snapshot = fresh_snapshot()
+    if snapshot is not None and not q:
+        return snapshot_response(snapshot.list_json(category, limit), response)
+    cache_key = ("list", category, q, limit)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return catalog_response(cached, response)
+    # Ranked ids come from the in-process index; the store only resolves them by id
+    ids = search_index.search(q, category=category, limit=limit) if q else None
+    if ids is not None and snapshot is not None:
+        return snapshot_response(snapshot.products_json(ids), response)
+    try:
+        if ids is not None:
+            found = await product_loader.load_many(ids)
+            products = [found[pid] for pid in ids if found[pid] is not None]
+        else:
+            products = await repository.list_products(category, limit)
+    except Exception:
+        stale = stale_snapshot_response(
+            response, lambda s: s.products_json(ids) if ids is not None else s.list_json(category, limit)
+        )
+        if stale is None:
+            raise
+        return stale
+    catalog_cache.set(cache_key, products)
+    return catalog_response(products, response)
+
+@api_router.get("/products/page", response_model=ProductPage, dependencies=[Depends(catalog_validators)])
+async def list_products_page(
+    response: Response,
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+):
+    cache_key = ("page", category, cursor, limit)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return page_response(cached, response)
+    try:
+        after = cursor_position(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Fetch one extra row to know whether another page exists
+    docs = await repository.product_page(category, after, limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    page = {"items": docs[:limit], "next_cursor": next_cursor}
+    catalog_cache.set(cache_key, page)
+    return page_response(page, response)
+
+@api_router.get("/products/export")
+async def export_products(category: Optional[str] = None):
+    # NDJSON feed streamed straight off the cursor; memory stays flat for any catalog size
+    async def rows():
+        async for doc in repository.iter_products(category):
+            yield json.dumps(doc, default=json_default) + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+@api_router.get("/products/{product_id}", response_model=Product, dependencies=[Depends(catalog_validators)])
+async def get_product(product_id: str, response: Response):
+    snapshot = fresh_snapshot()
+    if snapshot is not None:
+        body = snapshot.product_json(product_id)
+        if body is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return snapshot_response(body, response)
+    cache_key = ("product", product_id)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return catalog_response(cached, response)
+    try:
+        doc = await product_loader.load(product_id)
+    except Exception:
+        stale = stale_snapshot_response(response, lambda s: s.product_json(product_id))
+        if stale is None:
+            raise
+        return stale
     if not doc:
         raise HTTPException(status_code=404, detail="Product not found")
-    if isinstance(doc.get("created_at"), str):
-        doc["created_at"] = datetime.fromisoformat(doc["created_at"])  # type: ignore
-    return doc  # type: ignore
+    catalog_cache.set(cache_key, doc)
+    return catalog_response(doc, response)
 
 @api_router.post("/products", response_model=Product)
 async def create_product(input: ProductCreate):
     # Simple admin-less creation; keep for seeding/demo
-    product = Product(**input.model_dump())
-    doc = await serialize_datetime(product.model_dump())
-    await db.products.insert_one(doc)
+    try:
+        product = Product(**with_image(input.model_dump(), image_store))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    doc = product.model_dump()
+    await repository.insert_products([doc])
+    await catalog_changed([doc])
     return product
 
-@api_router.post("/orders", response_model=Order)
-async def create_order(input: OrderCreate):
-    if not input.items:
-        raise HTTPException(status_code=400, detail="Cart is empty")
-
-    # Fetch products
-    product_ids = [i.product_id for i in input.items]
-    db_products = await db.products.find({"id": {"$in": product_ids}}, {"_id": 0}).to_list(100)
-    prod_map = {p["id"]: p for p in db_products}
-    # Validate all exist
-    for item in input.items:
-        if item.product_id not in prod_map:
-            raise HTTPException(status_code=400, detail=f"Invalid product: {item.product_id}")
-
-    # Compute subtotal
-    subtotal = 0.0
-    contains_physical = False
-    for item in input.items:
-        p = prod_map[item.product_id]
-        subtotal += float(p["price"]) * item.quantity
-        if p["category_slug"] in ["prints", "local"]:
-            contains_physical = True
-
-    # Delivery fee flat if delivery selected and physical items
-    delivery_fee = 0.0
-    if input.delivery_method == "delivery" and contains_physical:
-        delivery_fee = 7.0
-
-    total = round(subtotal + delivery_fee, 2)
-
-    order = Order(
+@admin_router.put("/products/{product_id}/image", response_model=Product)
+async def set_product_image(product_id: str, input: ProductImage):
+    doc = (await repository.products_by_id([product_id])).get(product_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="Product not found")
+    try:
+        doc = Product(**with_image({**doc, "image_id": input.image_id, "image_url": None}, image_store)).model_dump()
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    await repository.write_products([(doc, True)])
+    await catalog_changed([doc])
+    return doc
+
+@admin_router.put("/products/{product_id}/asset")
+async def upload_product_asset(product_id: str, request: Request, filename: str = Query(..., min_length=1)):
+    # Streamed to disk as it arrives; multi-hundred-MB packs are never held in memory
+    product = await product_loader.load(product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if product["category_slug"] != "digital":
+        raise HTTPException(status_code=400, detail="Only digital products have downloadable files")
+    try:
+        return await download_assets.save(product_id, filename, request.stream())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@admin_router.post("/products/import")
+async def import_products_stream(
+    request: Request,
+    format: Optional[Literal["ndjson", "csv"]] = None,
+    batch_size: int = Query(500, ge=1, le=5000),
+):
+    # Admin only: rows carrying an existing id overwrite that product.
+    # Body is consumed incrementally; only one batch of documents is held at a time
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    rows = parse_rows(iter_lines(request.stream(), settings.IMPORT_MAX_LINE_BYTES), fmt)
+    report = await import_products(
+        repository,
+        rows,
+        lambda row: product_doc_from_row(row, image_store),
+        batch_size=batch_size,
+        on_batch=catalog_changed,
+    )
+    return report.as_dict()
+
+async def quote_cart(items: List[CartItem], delivery_method: str):
+    try:
+        return await pricing.quote(items, delivery_method)
+    except PricingError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+async def price_order(input: OrderCreate) -> Order:
+    """Validate the cart against the catalog and build a priced (unsaved) order."""
+    quote = await quote_cart(input.items, input.delivery_method)
+    # Items keep the catalog values they were sold at, so reports never re-join products
+    items = [
+        OrderItem(
+            product_id=line.product_id,
+            quantity=line.quantity,
+            title=line.title,
+            unit_price=from_cents(line.unit_price_cents),
+            category_slug=line.category_slug,
+        )
+        for line in quote.lines
+    ]
+    return Order(
         email=input.email,
         name=input.name,
         notes=input.notes,
         delivery_method=input.delivery_method,
         address=input.address,
-        items=input.items,
-        subtotal=round(subtotal, 2),
-        delivery_fee=delivery_fee,
-        total=total,
+        items=items,
+        subtotal=from_cents(quote.subtotal_cents),
+        delivery_fee=from_cents(quote.delivery_fee_cents),
+        total=from_cents(quote.total_cents),
+        currency=quote.currency,
     )
-    doc = await serialize_datetime(order.model_dump())
-    await db.orders.insert_one(doc)
-    return order
+
+async def transition_order(order: dict, status: str) -> bool:
+    """Move ``order`` to ``status`` unless another request changed it first; rollups and stock follow."""
+    if not await repository.set_order_status(order["id"], status, expected=order["status"]):
+        return False
+    await move_order(repository, order, status, product_loader.load_many)
+    if status == "cancelled":
+        await release_order(repository, order["id"])
+    elif status == "paid":
+        # The stock stays taken; the reservation is kept, without an expiry, so a refund can return it
+        await repository.keep_reservation(order["id"])
+    elif status == "fulfilled":
+        await repository.claim_reservation(order["id"])
+    return True
+
+async def reserve_stock(order: Order) -> bool:
+    """Take stock for the order's tracked items and record the reservation; 409 when short."""
+    try:
+        allocations = await reserve(repository, [(item.product_id, item.quantity) for item in order.items])
+    except OutOfStock as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if not allocations:
+        return False
+    try:
+        await repository.insert_reservation(reservation_doc(order.id, allocations, settings.RESERVATION_TTL))
+    except Exception:
+        await release(repository, allocations)
+        raise
+    return True
+
+async def insert_reserved_order(order: Order, doc: dict) -> None:
+    """Reserve stock, then store the order; the stock goes back if the insert fails."""
+    reserved = await reserve_stock(order)
+    try:
+        await repository.insert_order(doc)
+    except Exception:
+        if reserved:
+            await release_order(repository, order.id)
+        raise
+
+async def expire_reservation(order_id: str) -> None:
+    """Settle a reservation past its expiry: cancel the unpaid order, which returns its stock."""
+    order = await repository.get_order(order_id)
+    if order is None:
+        # The order insert never happened (or the order was purged)
+        await release_order(repository, order_id)
+    elif order["status"] in ("created", "pending_payment"):
+        if not await transition_order(order, "cancelled"):
+            logger.info("Order %s changed while expiring its reservation; retrying next sweep", order_id)
+    elif order["status"] == "cancelled":
+        await release_order(repository, order_id)
+    elif order["status"] == "paid":
+        # Paid while this sweep was running
+        await repository.keep_reservation(order_id)
+    else:
+        await repository.claim_reservation(order_id)
+
+def new_checkout_session(order_id: str) -> CheckoutSession:
+    # Mocked checkout session (no external provider yet)
+    return CheckoutSession(order_id=order_id, checkout_url=f"https://example.com/checkout/mock/{order_id}")
+
+@api_router.post("/quote", response_model=Quote)
+async def price_quote(input: QuoteRequest):
+    """Price a cart without storing anything; the same engine prices real orders."""
+    result = await quote_cart(input.items, input.delivery_method)
+    return Quote(
+        items=[
+            QuoteLine(
+                product_id=line.product_id,
+                title=line.title,
+                quantity=line.quantity,
+                unit_price=from_cents(line.unit_price_cents),
+                line_total=from_cents(line.total_cents),
+                category_slug=line.category_slug,
+            )
+            for line in result.lines
+        ],
+        subtotal=from_cents(result.subtotal_cents),
+        delivery_fee=from_cents(result.delivery_fee_cents),
+        total=from_cents(result.total_cents),
+        currency=result.currency,
+        delivery_rule=result.applied_rule,
+    )
+
+@api_router.post("/orders", response_model=Order)
+async def create_order(input: OrderCreate, idempotency_key: Optional[str] = Header(None)):
+    async def run():
+        order = await price_order(input)
+        doc = order.model_dump()
+        await insert_reserved_order(order, doc)
+        await record_order(repository, doc)
+        return order
+
+    return await idempotent("orders", idempotency_key, input, run)
+
+@api_router.get("/orders", response_model=List[Order])
+async def order_history(claims: dict = Depends(get_current_claims), limit: int = Query(20, ge=1, le=100)):
+    email = claims.get("email") or claims.get("sub")
+    if not email:
+        raise HTTPException(status_code=403, detail="Token has no email")
+    return await repository.orders_for_email(email, limit)
 
 @api_router.get("/orders/{order_id}", response_model=Order)
 async def get_order(order_id: str):
-    doc = await db.orders.find_one({"id": order_id}, {"_id": 0})
+    doc = await repository.get_order(order_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Order not found")
-    # Cast timestamps
-    for k in ["created_at"]:
-        if isinstance(doc.get(k), str):
-            doc[k] = datetime.fromisoformat(doc[k])
+    if settings.FAST_JSON_RESPONSES:
+        return RawJSONResponse(dumps(conform(doc, Order)))
     return doc  # type: ignore
 
+@api_router.post("/orders/{order_id}/downloads", response_model=List[DownloadLink])
+async def order_downloads(order_id: str):
+    """Short-lived links to the digital items of a paid order."""
+    order = await repository.get_order(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order["status"] not in ("paid", "fulfilled"):
+        raise HTTPException(status_code=409, detail="Downloads are available once the order is paid")
+    products = await product_loader.load_many(item["product_id"] for item in order["items"])
+    links = []
+    for product in products.values():
+        path = download_assets.path(product["id"]) if product and product["category_slug"] == "digital" else None
+        if path is None:
+            continue
+        token, expires = download_links.sign(order_id, product["id"])
+        links.append(
+            DownloadLink(
+                product_id=product["id"],
+                title=product["title"],
+                filename=path.name,
+                url=f"/api/downloads/{token}",
+                expires_at=datetime.fromtimestamp(expires, timezone.utc),
+            )
+        )
+    return links
+
+def content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted == filename:
+        return f'attachment; filename="{filename}"'
+    return f"attachment; filename*=utf-8''{quoted}"
+
+@api_router.api_route("/downloads/{token}", methods=["GET", "HEAD"])
+async def download(token: str, request: Request):
+    # The signature proves the order was paid when the link was issued: no order lookup here
+    try:
+        order_id, product_id = download_links.verify(token)
+    except InvalidLink as exc:
+        raise HTTPException(status_code=403, detail=str(exc))
+    path = download_assets.path(product_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="File not found")
+    stat = await asyncio.to_thread(os.stat, path)
+    headers = {
+        **file_validators(stat),
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": content_disposition(path.name),
+        "Cache-Control": "private, no-transform",
+    }
+    if_range = request.headers.get("if-range")
+    try:
+        byte_range = None
+        if not if_range or if_range in (headers["ETag"], headers["Last-Modified"]):
+            byte_range = parse_range(request.headers.get("range"), stat.st_size)
+    except RangeNotSatisfiable as exc:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{exc.size}"})
+    # Every body is charged by its size, so a resumed transfer costs only the bytes it resends
+    if request.method == "GET":
+        nbytes = stat.st_size if byte_range is None else byte_range[1] - byte_range[0] + 1
+        if not await download_limiter.acquire(repository, order_id, product_id, nbytes, stat.st_size):
+            raise HTTPException(status_code=429, detail="Download limit reached for this order")
+    if settings.DOWNLOAD_ACCEL_PREFIX:
+        # nginx serves the file, ranges included, straight from the page cache with sendfile
+        location = settings.DOWNLOAD_ACCEL_PREFIX.rstrip("/") + "/" + quote(f"{product_id}/{path.name}")
+        return Response(headers={**headers, "X-Accel-Redirect": location})
+    if byte_range is None:
+        return FileRangeResponse(path, 0, stat.st_size, headers=headers, chunk_size=settings.DOWNLOAD_CHUNK_SIZE)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    return FileRangeResponse(
+        path, start, end - start + 1, status_code=206, headers=headers, chunk_size=settings.DOWNLOAD_CHUNK_SIZE
+    )
+
 @api_router.post("/checkout/session", response_model=CheckoutSession)
-async def create_checkout_session(input: CheckoutSessionCreate):
-    # Mocked checkout session (no external provider yet)
-    existing = await db.orders.find_one({"id": input.order_id})
-    if not existing:
+async def create_checkout_session(input: CheckoutSessionCreate, idempotency_key: Optional[str] = Header(None)):
+    async def run():
+        existing = await repository.get_order(input.order_id)
+        if not existing:
+            raise HTTPException(status_code=404, detail="Order not found")
+        session = new_checkout_session(input.order_id)
+        await repository.insert_checkout_session(session.model_dump())
+        # Also set order status -> pending_payment (orders already further along keep theirs)
+        if existing["status"] == "created":
+            await transition_order(existing, "pending_payment")
+        return session
+
+    return await idempotent("checkout_session", idempotency_key, input, run)
+
+@api_router.post("/checkout", response_model=CheckoutResult)
+async def checkout(input: OrderCreate, idempotency_key: Optional[str] = Header(None)):
+    """Price the cart, store the order and open its checkout session in one call."""
+    async def run():
+        order = await price_order(input)
+        order.status = "pending_payment"
+        session = new_checkout_session(order.id)
+        # The session goes first so an order is never visible without one. A session
+        # whose order insert fails is unreachable (its id was never returned); drop it anyway.
+        await repository.insert_checkout_session(session.model_dump())
+        doc = order.model_dump()
+        try:
+            await insert_reserved_order(order, doc)
+        except Exception:
+            await repository.delete_checkout_session(session.id)
+            raise
+        await record_order(repository, doc)
+        return CheckoutResult(order=order, session=session)
+
+    return await idempotent("checkout", idempotency_key, input, run)
+
+@api_router.get("/images/{image_id}/{width}-q{quality}.{fmt}")
+async def get_image(image_id: str, width: int, quality: int, fmt: str):
+    # URLs are content-addressed, so every response may be cached for good. Only the
+    # configured quality is rendered; an old quality's URL must not get other bytes
+    if quality != image_store.quality:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = await image_store.derivative(image_id, width, fmt)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(
+        path,
+        media_type=f"image/{fmt}",
+        headers={"Cache-Control": IMMUTABLE_CACHE_CONTROL, "ETag": f'"{image_id}-{width}-q{image_store.quality}.{fmt}"'},
+    )
+
+@admin_router.post("/images")
+async def upload_image(file: UploadFile = File(...)):
+    data = await file.read(settings.IMAGE_MAX_UPLOAD_BYTES + 1)
+    if len(data) > settings.IMAGE_MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Images are limited to {settings.IMAGE_MAX_UPLOAD_BYTES} bytes")
+    try:
+        return await image_store.add_original(data)
+    except InvalidImage as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@api_router.get("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+@admin_router.get("/cache")
+async def cache_stats():
+    return catalog_cache.stats()
+
+@admin_router.get("/pricing")
+async def pricing_stats():
+    return {"price_table": price_table.stats(), "delivery_rules": [rule.name for rule in pricing.rules]}
+
+@admin_router.get("/loader")
+async def loader_stats():
+    return product_loader.stats()
+
+@admin_router.get("/idempotency")
+async def idempotency_stats():
+    return idempotency.stats()
+
+@admin_router.get("/slow-ops")
+async def slow_operations(limit: int = Query(50, ge=1, le=500)):
+    return slow_ops.entries(limit)
+
+@admin_router.get("/password-hashing")
+async def password_hashing_stats():
+    return password_hasher.stats()
+
+@admin_router.get("/mongo-pool")
+async def mongo_pool_stats():
+    if db is None:
+        raise HTTPException(status_code=404, detail=f"No Mongo client with the {repository.name} backend")
+    options = client_options()
+    return {
+        "options": {k: options[k] for k in ("maxPoolSize", "minPoolSize", "waitQueueTimeoutMS", "maxIdleTimeMS")},
+        "compressors": options.get("compressors", []),
+        "read_preferences": {
+            "catalog": repository.products.read_preference.mongos_mode,
+            "orders": repository.orders.read_preference.mongos_mode,
+        },
+        "pools": pool_monitor.stats(),
+    }
+
+@admin_router.get("/snapshot")
+async def snapshot_stats():
+    return {**catalog_snapshot.stats(), "catalog_version": catalog_version.value}
+
+@admin_router.post("/orders/{order_id}/status", response_model=Order)
+async def set_order_status(order_id: str, input: OrderStatusUpdate):
+    order = await repository.get_order(order_id)
+    if not order:
         raise HTTPException(status_code=404, detail="Order not found")
-    session = CheckoutSession(order_id=input.order_id, checkout_url=f"https://example.com/checkout/mock/{input.order_id}")
-    await db.checkout_sessions.insert_one(session.model_dump())
-    # Also set order status -> pending_payment
-    await db.orders.update_one({"id": input.order_id}, {"$set": {"status": "pending_payment"}})
-    return session
+    if input.status == order["status"]:
+        return order
+    if input.status not in ORDER_TRANSITIONS[order["status"]]:
+        raise HTTPException(status_code=409, detail=f"Cannot change a {order['status']} order to {input.status}")
+    if not await transition_order(order, input.status):
+        raise HTTPException(status_code=409, detail="Order status changed concurrently; retry")
+    return {**order, "status": input.status}
+
+@admin_router.put("/inventory/{product_id}")
+async def update_inventory(product_id: str, input: InventoryUpdate):
+    """Set the units available for new orders; more shards spread the writes of a hot product."""
+    product = (await product_loader.load_many([product_id])).get(product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    if product["category_slug"] not in PHYSICAL_CATEGORIES:
+        raise HTTPException(status_code=400, detail="Only physical products have stock")
+    # Without an explicit shard count, keep the product's current one
+    current = (await repository.inventory([product_id])).get(product_id, [])
+    shards = input.shards or len(current) or settings.INVENTORY_DEFAULT_SHARDS
+    counts = await set_stock(repository, product_id, input.quantity, shards)
+    return {"product_id": product_id, "available": sum(counts), "shards": counts}
+
+@admin_router.get("/inventory/{product_id}")
+async def get_inventory(product_id: str):
+    counts = (await repository.inventory([product_id])).get(product_id)
+    if counts is None:
+        raise HTTPException(status_code=404, detail="Stock is not tracked for this product")
+    return {"product_id": product_id, "available": sum(counts), "shards": counts}
+
+@admin_router.get("/analytics/sales")
+async def sales_report(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    status: Optional[List[OrderStatus]] = Query(None),
+):
+    """Dashboard figures from the rollups; defaults to the last 30 days of placed orders."""
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=29)
+    if start > end or (end - start).days > 366:
+        raise HTTPException(status_code=400, detail="Use a range of at most 367 days with start <= end")
+    return await sales_summary(repository, start, end, status or PLACED_STATUSES)
+
+@admin_router.post("/analytics/backfill")
+async def backfill_sales(batch_size: int = Query(5000, ge=100, le=100000)):
+    return await backfill(repository, batch_size)
+
+@admin_router.get("/images")
+async def image_stats():
+    return image_store.stats()
+
+@admin_router.get("/downloads")
+async def download_stats():
+    return download_limiter.stats()
+
+@admin_router.get("/auth")
+async def auth_stats():
+    return token_cache.stats()
+
+@admin_router.post("/tokens/revoke")
+async def revoke_token(input: TokenRevoke):
+    if not input.token and not input.jti:
+        raise HTTPException(status_code=400, detail="Provide a token or a jti")
+    await token_cache.revoke(token=input.token, jti=input.jti)
+    return {"revoked": True}
+
+@admin_router.get("/indexes")
+async def index_report():
+    if db is None:
+        raise HTTPException(status_code=404, detail=f"Indexes are managed by the {repository.name} backend")
+    return await check_indexes(db)
 
 # ---------- Seed ----------
 SAMPLE_IMAGES = [
@@ -235,9 +956,9 @@ async def seed_data():
         {"id": str(uuid.uuid4()), "name": "Prints", "slug": "prints"},
         {"id": str(uuid.uuid4()), "name": "Local Orders", "slug": "local"},
     ]
-    existing = await db.categories.count_documents({})
+    existing = await repository.count_categories()
     if existing == 0:
-        await db.categories.insert_many(cats)
+        await repository.insert_categories(cats)
 
     # Products
     sample_products = [
@@ -305,15 +1026,23 @@ async def seed_data():
             "image_url": SAMPLE_IMAGES[3],
         },
     ]
-    prod_count = await db.products.count_documents({})
+    prod_count = await repository.count_products()
     if prod_count == 0:
-        docs = []
-        for sp in sample_products:
-            p = Product(**sp)
-            docs.append(await serialize_datetime(p.model_dump()))
-        await db.products.insert_many(docs)
+        docs = [Product(**sp).model_dump() for sp in sample_products]
+        await repository.insert_products(docs)
+        await catalog_changed(docs)
+
+async def build_search_index():
+    global search_index
+    # Build aside and swap so searches never see a half-filled index
+    index = SearchIndex()
+    async for doc in repository.iter_products(fields=("id", "title", "description", "category_slug")):
+        index.add(doc)
+    search_index = index
+    logger.info("Search index built with %d products", len(index))
 
 # Include the router in the main app
+api_router.include_router(admin_router)
 app.include_router(api_router)
 
 app.add_middleware(
@@ -330,10 +1059,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+slow_ops = SlowOpLog(
+    logger.getChild("slow"),
+    path=settings.SLOW_LOG_FILE,
+    max_bytes=settings.SLOW_LOG_MAX_BYTES,
+    backups=settings.SLOW_LOG_BACKUPS,
+)
+app.add_middleware(
+    SlowRequestMiddleware,
+    log=slow_ops,
+    threshold=settings.SLOW_REQUEST_MS / 1000,
+    explain=(lambda query: explain_query(db, query)) if settings.SLOW_LOG_EXPLAIN and db is not None else None,
+)
+
+# Added last so it is outermost and times everything, including CORS handling and slow-op logging
+app.add_middleware(MetricsMiddleware, registry=metrics)
+
 @app.on_event("startup")
 async def on_startup():
+    catalog_snapshot.open_existing()
+    await repository.init()
+    await catalog_version.init()
+    await token_cache.load()
     await seed_data()
+    await build_search_index()
+    await catalog_snapshot.refresh(catalog_version.stamp)
+    app.state.catalog_watch = asyncio.create_task(
+        catalog_version.watch(settings.CATALOG_VERSION_REFRESH, remote_catalog_changed)
+    )
+    app.state.revocation_watch = asyncio.create_task(token_cache.watch(settings.TOKEN_REVOCATION_REFRESH))
+    app.state.reservation_sweep = asyncio.create_task(
+        watch_expiry(repository, settings.RESERVATION_SWEEP_INTERVAL, expire_reservation)
+    )
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    app.state.catalog_watch.cancel()
+    app.state.revocation_watch.cancel()
+    app.state.reservation_sweep.cancel()
+    await repository.close()
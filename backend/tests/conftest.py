@@ -0,0 +1,6 @@
+import os
+
+# Route tests import server.py, which opens a Mongo client at import time for the default backend
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test")
@@ -0,0 +1,64 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+from app.backend.core.analytics import backfill, move_order, record_order, sales_summary, with_item_prices
+from app.backend.db.repository import MemoryRepository
+
+PRODUCTS = [
+    {"id": "d1", "price": 12.5, "category_slug": "digital", "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+    {"id": "p1", "price": 30.0, "category_slug": "prints", "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)},
+]
+
+def order(order_id, day, items, total, delivery_method="digital", status="created"):
+    return {
+        "id": order_id,
+        "created_at": datetime(2024, 3, day, 15, tzinfo=timezone.utc),
+        "delivery_method": delivery_method,
+        "status": status,
+        "items": items,
+        "total": total,
+    }
+
+def test_incremental_rollups_match_backfill():
+    async def run():
+        repo = MemoryRepository()
+        await repo.insert_products(PRODUCTS)
+
+        async def load(ids):
+            return await repo.products_by_id(list(ids))
+
+        orders = [
+            order("o1", 1, [{"product_id": "d1", "quantity": 2, "unit_price": 12.5, "category_slug": "digital"}], 25.0),
+            order(
+                "o2", 1,
+                [
+                    {"product_id": "d1", "quantity": 1, "unit_price": 10.0, "category_slug": "digital"},
+                    {"product_id": "p1", "quantity": 1, "unit_price": 30.0, "category_slug": "prints"},
+                ],
+                47.0, delivery_method="delivery",
+            ),
+            # Stored before items carried their price: both paths fall back to the catalog
+            order("o3", 2, [{"product_id": "p1", "quantity": 3}], 90.0),
+        ]
+        for doc in orders[:2]:
+            await repo.insert_order(doc)
+            await record_order(repo, doc)
+        await repo.insert_order(orders[2])
+        await record_order(repo, await with_item_prices(orders[2], load))
+        for doc, status in ((orders[2], "paid"), (orders[1], "cancelled")):
+            await move_order(repo, doc, status, load)
+            await repo.set_order_status(doc["id"], status)
+
+        incremental = await sales_summary(repo, date(2024, 3, 1), date(2024, 3, 2))
+        assert incremental["totals"] == {"orders": 2, "units": 5, "revenue": 115.0, "average_order_value": 57.5}
+        assert incremental["by_category"]["prints"] == {"orders": 1, "units": 3, "revenue": 90.0, "average_order_value": 90.0}
+        assert "delivery" not in incremental["by_delivery_method"]
+        assert [d["orders"] for d in incremental["by_day"]] == [1, 1]
+        cancelled = await sales_summary(repo, date(2024, 3, 1), date(2024, 3, 2), ["cancelled"])
+        assert cancelled["totals"]["revenue"] == 47.0
+
+        assert await backfill(repo, batch_size=2) == {"orders": 3, "rollups": 7}
+        assert await sales_summary(repo, date(2024, 3, 1), date(2024, 3, 2)) == incremental
+        assert await sales_summary(repo, date(2024, 3, 1), date(2024, 3, 2), ["cancelled"]) == cancelled
+
+    asyncio.run(run())
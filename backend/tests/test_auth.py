@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from app.backend.auth.jwt_handler import TokenCache, create_jwt_token, verify_jwt_token
+
+def test_verified_claims_are_cached():
+    cache = TokenCache()
+    token = create_jwt_token({"sub": "a@example.com", "role": "admin"})
+    assert verify_jwt_token(token, cache)["sub"] == "a@example.com"
+    assert verify_jwt_token(token, cache)["role"] == "admin"
+    assert cache.stats()["hits"] == 1
+
+def test_revoked_token_is_refused():
+    cache = TokenCache()
+    token = create_jwt_token({"sub": "b@example.com"})
+    claims = verify_jwt_token(token, cache)
+    asyncio.run(cache.revoke(jti=claims["jti"]))
+    with pytest.raises(HTTPException) as exc:
+        verify_jwt_token(token, cache)
+    assert exc.value.status_code == 401
+
+def test_revocations_reach_other_workers():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    collection = mongomock_motor.AsyncMongoMockClient()["test"]["token_revocations"]
+    revoking, other = TokenCache(collection=collection), TokenCache(collection=collection)
+    token = create_jwt_token({"sub": "c@example.com"})
+    verify_jwt_token(token, other)
+
+    async def run():
+        await revoking.revoke(token=token)
+        assert await other.load() == 1
+
+    asyncio.run(run())
+    with pytest.raises(HTTPException):
+        verify_jwt_token(token, other)
+
+def test_token_revocation_lasts_until_the_token_expires():
+    cache = TokenCache()
+    token = create_jwt_token({"sub": "d@example.com"}, expires_minutes=3 * 24 * 60)
+    claims = verify_jwt_token(token, cache)
+    asyncio.run(cache.revoke(token=token, jti=claims["jti"]))
+    assert set(cache._revoked.values()) == {claims["exp"]}
+
+def test_expired_claims_are_not_cached():
+    cache = TokenCache()
+    cache.put("t", {"sub": "x", "exp": 0})
+    assert cache.get("t") is None
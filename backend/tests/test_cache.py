@@ -0,0 +1,28 @@
+import time
+from app.backend.core.cache import TTLCache
+
+def test_lru_eviction():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_expiry_and_counters():
+    cache = TTLCache(maxsize=10, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+
+def test_clear_invalidates():
+    cache = TTLCache()
+    cache.set(("product", "x"), {"id": "x"})
+    cache.clear()
+    assert cache.get(("product", "x")) is None
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,54 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.backend.core.catalog_version import CatalogVersion
+from app.backend.db.repository import MemoryRepository
+
+
+def test_new_store_at_the_same_version_gets_a_new_etag():
+    async def run():
+        first, second = CatalogVersion(MemoryRepository()), CatalogVersion(MemoryRepository())
+        await first.bump()
+        await asyncio.sleep(0.001)
+        await second.bump()
+        # Two processes (or a reset database) both counting from 1
+        assert first.value == second.value == 1
+        assert first.etag("/api/products?") != second.etag("/api/products?")
+
+    asyncio.run(run())
+
+
+def test_reset_store_is_picked_up():
+    async def run():
+        repo = MemoryRepository()
+        version = CatalogVersion(repo)
+        for _ in range(3):
+            await version.bump()
+        repo.catalog_meta = {"version": 1, "updated_at": datetime.now(timezone.utc) + timedelta(seconds=1)}
+        assert await version.load() and version.value == 1
+
+    asyncio.run(run())
+
+
+def test_not_modified():
+    version = CatalogVersion(MemoryRepository())
+    etag = version.etag("/api/products?")
+    assert version.not_modified(etag, f'W/{etag}, "other"', None)
+    assert not version.not_modified(etag, '"other"', version.last_modified)
+    assert version.not_modified(etag, None, version.last_modified)
+    assert not version.not_modified(etag, None, "not a date")
+
+
+def test_init_persists_a_version_every_worker_shares():
+    async def run():
+        repo = MemoryRepository()
+        first = CatalogVersion(repo)
+        await first.init()
+        await asyncio.sleep(0.001)
+        second = CatalogVersion(repo)
+        await second.init()
+        # A store that was never bumped (e.g. a seeded deployment) gets one stored stamp
+        assert first.value == second.value == 1
+        assert first.etag("/api/products?") == second.etag("/api/products?")
+
+    asyncio.run(run())
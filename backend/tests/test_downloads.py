@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from app.backend.core.downloads import DownloadLimiter, InvalidLink, LinkSigner, RangeNotSatisfiable, parse_range
+from app.backend.db.repository import MemoryRepository
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=-500", 100) == (0, 99)
+    assert parse_range("bytes=50-500", 100) == (50, 99)
+    # Malformed and multi-range headers fall back to the whole file
+    assert parse_range("bytes=9-0", 100) is None
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range("items=0-1", 100) is None
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=100-", 100)
+    with pytest.raises(RangeNotSatisfiable):
+        parse_range("bytes=-0", 100)
+
+def test_signed_links_expire_and_reject_tampering():
+    signer = LinkSigner("secret", ttl=60)
+    token, expires = signer.sign("order-1", "product-1", now=1000)
+    assert expires == 1060
+    assert signer.verify(token, now=1059) == ("order-1", "product-1")
+    with pytest.raises(InvalidLink):
+        signer.verify(token, now=1061)
+    other, _ = signer.sign("order-2", "product-1", now=1000)
+    with pytest.raises(InvalidLink):
+        signer.verify(other.split(".")[0] + "." + token.split(".")[1], now=1000)
+    with pytest.raises(InvalidLink):
+        LinkSigner("other-secret").verify(token, now=1000)
+
+def test_limiter_charges_every_range_against_a_shared_allowance():
+    repo = MemoryRepository()
+    limiter = DownloadLimiter(limit=2)
+
+    async def run():
+        # A 100-byte file may be sent twice: whole, or as any mix of ranges
+        assert await limiter.acquire(repo, "o1", "p1", 100, 100)
+        assert await limiter.acquire(repo, "o1", "p1", 99, 100)
+        assert not await limiter.acquire(repo, "o1", "p1", 99, 100)
+        # The refused request is refunded, so a small resume still fits
+        assert await limiter.acquire(repo, "o1", "p1", 1, 100)
+        assert await limiter.acquire(repo, "o1", "p2", 100, 100) and await limiter.acquire(repo, "o2", "p1", 100, 100)
+        # Another worker's limiter sees the same totals
+        assert not await DownloadLimiter(limit=2).acquire(repo, "o1", "p1", 1, 100)
+        assert limiter.stats()["refused"] == 1
+
+    asyncio.run(run())
@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from app.backend.core.idempotency import IdempotencyConflict, IdempotencyInProgress, IdempotencyStore
+
+def test_concurrent_duplicates_run_handler_once():
+    store = IdempotencyStore()
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": "order-1"}
+
+    async def run():
+        return await asyncio.gather(*(store.run("orders", "k1", "h", handler) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls == [1]
+    assert results == [{"id": "order-1"}] * 5
+    assert asyncio.run(store.run("orders", "k1", "h", handler)) == {"id": "order-1"}
+    assert calls == [1]
+
+def test_key_reuse_with_other_body_is_rejected():
+    store = IdempotencyStore()
+
+    async def handler():
+        return {"ok": True}
+
+    asyncio.run(store.run("orders", "k1", "h1", handler))
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(store.run("orders", "k1", "h2", handler))
+
+def test_failures_are_not_remembered():
+    store = IdempotencyStore()
+    attempts = []
+
+    async def handler():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("boom")
+        return {"ok": True}
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(store.run("orders", "k1", "h", handler))
+    assert asyncio.run(store.run("orders", "k1", "h", handler)) == {"ok": True}
+
+def test_slow_handler_keeps_its_claim_past_the_wait_timeout():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    collection = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]["idempotency_keys"]
+    # Two workers sharing the collection; the handler outlives the lease, so only renewal keeps its claim
+    first = IdempotencyStore(collection, wait_timeout=0.15, lease=0.06, poll_interval=0.01)
+    second = IdempotencyStore(collection, wait_timeout=0.15, lease=0.06, poll_interval=0.01)
+    calls = []
+
+    async def handler():
+        calls.append(1)
+        await asyncio.sleep(0.2)
+        return {"id": "order-1"}
+
+    async def run():
+        slow = asyncio.create_task(first.run("orders", "k1", "h", handler))
+        await asyncio.sleep(0.01)
+        with pytest.raises(IdempotencyInProgress):
+            await second.run("orders", "k1", "h", handler)
+        assert await slow == {"id": "order-1"}
+        assert await second.run("orders", "k1", "h", handler) == {"id": "order-1"}
+
+    asyncio.run(run())
+    assert calls == [1]
@@ -0,0 +1,38 @@
+import asyncio
+import io
+
+import pytest
+from PIL import Image
+
+from app.backend.core.images import ImageStore, InvalidImage
+
+def jpeg(width, height):
+    out = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 40, 40)).save(out, "JPEG")
+    return out.getvalue()
+
+def test_derivatives_are_content_addressed_and_cached(tmp_path):
+    store = ImageStore(str(tmp_path), widths=(320, 640, 1600), formats=("webp", "jpeg"))
+
+    async def run():
+        info = await store.add_original(jpeg(1000, 500), warm=False)
+        assert info["width"] == 1000 and info["format"] == "JPEG"
+        # Widths above the original are not offered
+        assert [(v["width"], v["height"], v["type"]) for v in info["variants"]] == [
+            (320, 160, "image/webp"), (640, 320, "image/webp"), (320, 160, "image/jpeg"), (640, 320, "image/jpeg"),
+        ]
+        paths = await asyncio.gather(*(store.derivative(info["id"], 640, "webp") for _ in range(5)))
+        assert len(set(paths)) == 1 and store.rendered == 1
+        with Image.open(paths[0]) as img:
+            assert img.format == "WEBP" and img.size == (640, 320)
+        assert await store.derivative(info["id"], 640, "webp") == paths[0] and store.hits == 1
+        assert await store.derivative(info["id"], 1600, "jpeg") is None
+        assert await store.derivative("0" * 64, 320, "jpeg") is None
+        assert (await store.add_original(jpeg(1000, 500), warm=False))["id"] == info["id"]
+
+    asyncio.run(run())
+
+def test_rejects_non_images(tmp_path):
+    store = ImageStore(str(tmp_path))
+    with pytest.raises(InvalidImage):
+        asyncio.run(store.add_original(b"not an image"))
@@ -0,0 +1,77 @@
+import asyncio
+import random
+from datetime import timedelta
+
+import pytest
+
+from app.backend.core.inventory import OutOfStock, release_order, reservation_doc, reserve, set_stock
+from app.backend.db.repository import MemoryRepository
+
+
+def test_concurrent_reservations_never_oversell():
+    repo = MemoryRepository()
+
+    async def run():
+        assert await set_stock(repo, "print", 10, shards=4) == [3, 3, 2, 2]
+        rng = random.Random(1)
+
+        async def buy():
+            try:
+                return await reserve(repo, [("print", 3)], rng)
+            except OutOfStock:
+                return None
+
+        results = await asyncio.gather(*(buy() for _ in range(6)))
+        sold = sum(a["quantity"] for r in results if r for a in r)
+        # Three orders fit; the last unit cannot cover a fourth (it is split across shards if need be)
+        assert sold == 9 and sum(r is None for r in results) == 3
+        assert sum((await repo.inventory(["print"]))["print"]) == 1
+
+    asyncio.run(run())
+
+
+def test_reserve_is_all_or_nothing_and_skips_untracked():
+    repo = MemoryRepository()
+
+    async def run():
+        await set_stock(repo, "a", 5)
+        await set_stock(repo, "b", 1)
+        with pytest.raises(OutOfStock):
+            await reserve(repo, [("a", 2), ("digital", 100), ("b", 1), ("b", 1)])
+        assert await repo.inventory(["a", "b", "digital"]) == {"a": [5], "b": [1]}
+        assert await reserve(repo, [("digital", 100)]) == []
+
+    asyncio.run(run())
+
+
+def test_stock_is_released_once():
+    repo = MemoryRepository()
+
+    async def run():
+        await set_stock(repo, "a", 4, shards=2)
+        allocations = await reserve(repo, [("a", 3)])
+        doc = reservation_doc("order-1", allocations, ttl=60)
+        await repo.insert_reservation(doc)
+        assert await repo.expired_reservations(doc["created_at"], 10) == []
+        assert [r["order_id"] for r in await repo.expired_reservations(doc["expires_at"] + timedelta(seconds=1), 10)] == [
+            "order-1"
+        ]
+        # A cancel racing the expiry sweep returns the stock only once
+        assert sorted(await asyncio.gather(release_order(repo, "order-1"), release_order(repo, "order-1"))) == [False, True]
+        assert sum((await repo.inventory(["a"]))["a"]) == 4
+
+    asyncio.run(run())
+
+
+def test_stock_from_removed_shards_is_not_lost():
+    repo = MemoryRepository()
+
+    async def run():
+        await set_stock(repo, "a", 8, shards=4)
+        allocations = await reserve(repo, [("a", 2)], random.Random(3))
+        await repo.insert_reservation(reservation_doc("order-1", allocations, ttl=60))
+        await set_stock(repo, "a", 6, shards=1)
+        assert await release_order(repo, "order-1")
+        assert await repo.inventory(["a"]) == {"a": [8]}
+
+    asyncio.run(run())
@@ -0,0 +1,30 @@
+import asyncio
+from app.backend.core.loader import BatchLoader
+
+def make_loader(calls):
+    async def fetch(keys):
+        calls.append(sorted(keys))
+        await asyncio.sleep(0)
+        return {k: {"id": k} for k in keys if k != "missing"}
+    return BatchLoader(fetch)
+
+def test_concurrent_loads_share_one_batch():
+    calls = []
+    loader = make_loader(calls)
+
+    async def run():
+        return await asyncio.gather(loader.load("a"), loader.load("b"), loader.load("a"), loader.load("missing"))
+
+    results = asyncio.run(run())
+    assert calls == [["a", "b", "missing"]]
+    assert results == [{"id": "a"}, {"id": "b"}, {"id": "a"}, None]
+    stats = loader.stats()
+    assert stats["batches"] == 1
+    assert stats["coalesced"] == 1
+
+def test_load_many_dedups_keys():
+    calls = []
+    loader = make_loader(calls)
+    found = asyncio.run(loader.load_many(["x", "y", "x"]))
+    assert found == {"x": {"id": "x"}, "y": {"id": "y"}}
+    assert calls == [["x", "y"]]
@@ -0,0 +1,70 @@
+from datetime import timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pymongo import monitoring
+from app.backend.core.metrics import MetricsMiddleware, MetricsRegistry, MongoCommandMetrics, MongoPoolMonitor
+
+ADDRESS = ("db.local", 27017)
+
+def test_pool_monitor_tracks_checkouts_and_waits():
+    registry = MetricsRegistry()
+    monitor = MongoPoolMonitor(registry)
+    monitor.pool_created(monitoring.PoolCreatedEvent(ADDRESS, {}))
+    monitor.connection_created(monitoring.ConnectionCreatedEvent(ADDRESS, 1))
+    monitor.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    monitor.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 1))
+    monitor.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    monitor.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(ADDRESS, "timeout"))
+
+    [pool] = monitor.stats()
+    assert pool["address"] == "db.local:27017"
+    assert (pool["open"], pool["checked_out"], pool["waiting"], pool["checkouts"]) == (1, 1, 0, 1)
+    assert pool["checkout_failures"] == {"timeout": 1}
+    assert 'mongo_pool_checkout_wait_seconds_count{address="db.local:27017"} 1' in registry.render()
+
+    monitor.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+    assert monitor.stats()[0]["checked_out"] == 0
+
+def test_requests_are_labelled_by_route_template():
+    registry = MetricsRegistry()
+    app = FastAPI()
+
+    @app.get("/api/products/{product_id}")
+    async def product(product_id: str):
+        return {"id": product_id}
+
+    app.add_middleware(MetricsMiddleware, registry=registry)
+    client = TestClient(app)
+    for product_id in ("p1", "p2", "p3"):
+        assert client.get(f"/api/products/{product_id}").status_code == 200
+    assert client.get("/nowhere").status_code == 404
+
+    text = registry.render()
+    assert 'http_requests_total{route="/api/products/{product_id}",method="GET",status="200"} 3' in text
+    assert 'http_requests_total{route="<unmatched>",method="GET",status="404"} 1' in text
+    assert 'http_request_duration_seconds_count{route="/api/products/{product_id}",method="GET"} 3' in text
+    assert 'http_request_duration_seconds_bucket{route="/api/products/{product_id}",method="GET",le="+Inf"} 3' in text
+    assert "p1" not in text
+
+def test_command_listener_labels_collection_and_command():
+    registry = MetricsRegistry()
+    listener = MongoCommandMetrics(registry)
+    started = [
+        ({"find": "products", "filter": {}}, 1),
+        ({"getMore": 42, "collection": "orders"}, 2),
+        ({"insert": "orders", "documents": []}, 3),
+    ]
+    for command, request_id in started:
+        listener.started(monitoring.CommandStartedEvent(command, "test", request_id, ADDRESS, None))
+    listener.succeeded(monitoring.CommandSucceededEvent(timedelta(milliseconds=2), {}, "find", 1, ADDRESS, None))
+    listener.succeeded(monitoring.CommandSucceededEvent(timedelta(milliseconds=30), {}, "getMore", 2, ADDRESS, None))
+    listener.failed(monitoring.CommandFailedEvent(timedelta(milliseconds=5), {}, "insert", 3, ADDRESS, None))
+
+    text = registry.render()
+    assert 'mongo_command_duration_seconds_bucket{collection="products",command="find",le="0.0025"} 1' in text
+    assert 'mongo_command_duration_seconds_bucket{collection="orders",command="getMore",le="0.025"} 0' in text
+    assert 'mongo_command_duration_seconds_count{collection="orders",command="getMore"} 1' in text
+    assert 'mongo_command_duration_seconds_count{collection="orders",command="insert"} 1' in text
+    assert 'mongo_command_failures_total{collection="orders",command="insert"} 1' in text
+    assert listener._pending == {}
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+import pytest
+
+from app.backend.utils.migrate_dates import migrate_field
+
+
+class InterruptedDB:
+    """Passes through to ``db`` but fails the ``fail_at``-th bulk write, like a dropped connection."""
+
+    def __init__(self, db, fail_at):
+        self._db = db
+        self.writes = 0
+        self.fail_at = fail_at
+
+    def __getattr__(self, name):
+        return getattr(self._db, name)
+
+    def __getitem__(self, name):
+        collection = self._db[name]
+        bulk_write = collection.bulk_write
+
+        async def interrupted(ops, **kwargs):
+            self.writes += 1
+            if self.writes == self.fail_at:
+                raise ConnectionError("connection lost")
+            return await bulk_write(ops, **kwargs)
+
+        collection.bulk_write = interrupted
+        return collection
+
+
+def test_interrupted_migration_resumes_from_its_checkpoint(caplog):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    db = mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"]
+    native = datetime(2024, 1, 3, tzinfo=timezone.utc)
+    docs = [
+        {"_id": "p0", "created_at": "2024-01-01T10:00:00+00:00"},
+        {"_id": "p1", "created_at": "2024-01-02T10:00:00"},
+        {"_id": "p2", "created_at": "2024-01-02T11:00:00+00:00"},
+        {"_id": "p3", "created_at": native},
+        {"_id": "p4", "created_at": "yesterday"},
+        {"_id": "p5", "created_at": "2024-01-05T10:00:00+00:00"},
+    ]
+
+    async def run():
+        await db.products.insert_many(docs)
+        # Batches of two string values: [p0, p1], [p2, p4], [p5]; the second write fails
+        with pytest.raises(ConnectionError):
+            await migrate_field(InterruptedDB(db, fail_at=2), "products", "created_at", batch_size=2)
+        assert (await db.migrations.find_one({"_id": "dates:products.created_at"}))["last_id"] == "p1"
+        assert (await db.products.find_one({"_id": "p2"}))["created_at"] == "2024-01-02T11:00:00+00:00"
+
+        with caplog.at_level(logging.WARNING, logger="app.backend.utils.migrate_dates"):
+            result = await migrate_field(db, "products", "created_at", batch_size=2)
+        assert (result["converted"], result["skipped"]) == (2, 1)
+        stored = {doc["_id"]: doc["created_at"] async for doc in db.products.find()}
+        assert stored["p0"] == datetime(2024, 1, 1, 10, tzinfo=timezone.utc)
+        assert stored["p1"] == datetime(2024, 1, 2, 10, tzinfo=timezone.utc)
+        assert stored["p2"] == datetime(2024, 1, 2, 11, tzinfo=timezone.utc)
+        assert stored["p3"] == native and stored["p5"] == datetime(2024, 1, 5, 10, tzinfo=timezone.utc)
+        # The unparseable value is left as it was and named in the log
+        assert stored["p4"] == "yesterday"
+        assert "p4" in caplog.text and "'yesterday'" in caplog.text
+
+        # Nothing left past the checkpoint
+        assert (await migrate_field(db, "products", "created_at", batch_size=2))["converted"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.backend.core.pricing import PriceTable, PricingEngine, PricingError, delivery_rules, to_cents
+
+CATALOG = {
+    "d1": {"title": "Kit", "price": 19.99, "category_slug": "digital"},
+    "p1": {"title": "Print", "price": 0.1, "category_slug": "prints"},
+}
+
+def item(product_id, quantity=1):
+    return SimpleNamespace(product_id=product_id, quantity=quantity)
+
+def engine(calls, **rules):
+    async def load_many(ids):
+        ids = list(ids)
+        calls.append(ids)
+        return {i: CATALOG.get(i) for i in ids}
+
+    return PricingEngine(PriceTable(load_many), delivery_rules(**rules))
+
+def test_to_cents_avoids_float_error():
+    assert to_cents(19.99) == 1999
+    assert to_cents(0.1) * 3 == 30
+    assert to_cents("7") == 700
+
+def test_quote_uses_cached_prices_and_delivery_rules():
+    calls = []
+    pricing = engine(calls, flat_fee_cents=700, free_over_cents=5000)
+
+    async def run():
+        quote = await pricing.quote([item("d1", 3), item("p1", 3), item("d1")], "delivery")
+        assert quote.subtotal_cents == 4 * 1999 + 30 and quote.delivery_fee_cents == 0
+        assert quote.applied_rule == "free_delivery_over"
+        quote = await pricing.quote([item("p1")], "delivery")
+        assert (quote.delivery_fee_cents, quote.total_cents) == (700, 710)
+        assert (await pricing.quote([item("p1")], "pickup")).delivery_fee_cents == 0
+        assert (await pricing.quote([item("d1")], "delivery")).delivery_fee_cents == 0
+        # One batched lookup for the first cart's misses; later carts hit the table
+        assert calls == [["d1", "p1"]]
+        with pytest.raises(PricingError):
+            await pricing.quote([item("nope")], "digital")
+        with pytest.raises(PricingError):
+            await pricing.quote([], "digital")
+        pricing.prices.clear()
+        await pricing.quote([item("d1")], "digital")
+        assert calls[-1] == ["d1"]
+
+    asyncio.run(run())
@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.backend.db.connection import Base, get_async_db
+from app.backend.routes import product_routes
+
+
+@pytest.fixture
+def client(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'products.db'}")
+    sessions = async_sessionmaker(engine, expire_on_commit=False, autoflush=False)
+
+    async def create_tables():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    async def get_test_db():
+        async with sessions() as db:
+            yield db
+
+    asyncio.run(create_tables())
+    app = FastAPI()
+    app.include_router(product_routes.router, prefix="/products")
+    app.dependency_overrides[get_async_db] = get_test_db
+    with TestClient(app) as client:
+        yield client
+    asyncio.run(engine.dispose())
+
+
+def test_create_list_and_get(client):
+    assert client.get("/products/").json() == []
+    created = [
+        client.post("/products/", json={"name": name, "description": "d", "price": price}).json()
+        for name, price in (("Poster", 12.5), ("Mug", 8.0))
+    ]
+    assert created[0] == {"id": created[0]["id"], "name": "Poster", "description": "d", "price": 12.5}
+    assert [p["name"] for p in client.get("/products/").json()] == ["Poster", "Mug"]
+    assert client.get(f"/products/{created[1]['id']}").json() == created[1]
+
+
+def test_missing_products_are_404(client):
+    assert client.get("/products/999").status_code == 404
+    response = client.delete("/products/999")
+    assert response.status_code == 404 and response.json()["detail"] == "Product not found"
+
+
+def test_delete_removes_the_product(client):
+    product = client.post("/products/", json={"name": "Poster", "price": 12.5}).json()
+    response = client.delete(f"/products/{product['id']}")
+    assert response.status_code == 200 and response.json() == {"message": "Product deleted successfully"}
+    assert client.get(f"/products/{product['id']}").status_code == 404
+    assert client.get("/products/").json() == []
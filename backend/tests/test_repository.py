@@ -0,0 +1,177 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+
+from app.backend.core.catalog_version import CatalogVersion
+from app.backend.db.repository import MemoryRepository, create_repository
+
+
+def make_products(count):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    # Four products per created_at (two per category), as a bulk import leaves them
+    return [
+        {"id": f"p{i:02d}", "title": f"P{i}", "category_slug": ("digital", "prints")[i % 2], "created_at": start + timedelta(minutes=i // 4)}
+        for i in range(count)
+    ]
+
+
+def make_order(order_id, status="created"):
+    return {
+        "id": order_id,
+        "email": "a@example.com",
+        "status": status,
+        "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc),
+        "items": [{"product_id": "p01", "quantity": 1}],
+        "total": 10.0,
+    }
+
+
+@pytest.fixture(params=["memory", "sql", "mongo"])
+def new_repo(request, tmp_path):
+    """Factory for an empty repository of each backend; every backend must pass the same tests."""
+    if request.param == "memory":
+        return MemoryRepository
+    if request.param == "sql":
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        from app.backend.db.sql_repository import SQLRepository
+
+        return lambda: SQLRepository(create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'repo.db'}"))
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    from app.backend.db.mongo_repository import MongoRepository
+
+    return lambda: MongoRepository(mongomock_motor.AsyncMongoMockClient(tz_aware=True)["test"])
+
+
+def run_with(new_repo, check):
+    async def run():
+        repo = new_repo()
+        await repo.init()
+        try:
+            await check(repo)
+        finally:
+            await repo.close()
+
+    asyncio.run(run())
+
+
+def test_pages_follow_product_sort(new_repo):
+    async def check(repo):
+        await repo.insert_products(make_products(10))
+        expected = [p["id"] for p in sorted(make_products(10), key=lambda p: (p["created_at"], p["id"]), reverse=True)]
+        seen, after = [], None
+        while True:
+            page = await repo.product_page(None, after, 3)
+            if not page:
+                break
+            seen += [p["id"] for p in page]
+            after = (page[-1]["created_at"], page[-1]["id"])
+        assert seen == expected
+        # Ties on created_at are broken by id, as in pages and the snapshot
+        assert [p["id"] for p in await repo.list_products(None, 10)] == expected
+        assert [p["id"] for p in await repo.list_products("prints", 3)] == [i for i in expected if int(i[1:]) % 2][:3]
+
+    run_with(new_repo, check)
+
+
+def test_write_products_reports_duplicates(new_repo):
+    async def check(repo):
+        products = make_products(2)
+        await repo.insert_products(products)
+        errors = await repo.write_products([(products[0], False), ({**products[1], "title": "new"}, True)])
+        assert list(errors) == [0]
+        assert (await repo.products_by_id(["p01"]))["p01"]["title"] == "new"
+        assert await repo.count_products() == 2
+
+    run_with(new_repo, check)
+
+
+def test_upsert_keeps_created_at(new_repo):
+    async def check(repo):
+        products = make_products(4)
+        await repo.insert_products(products)
+        order = [p["id"] for p in await repo.list_products(None, 10)]
+        reimported = {**products[0], "title": "again", "created_at": datetime.now(timezone.utc)}
+        assert await repo.write_products([(reimported, True)]) == {}
+        stored = (await repo.products_by_id(["p00"]))["p00"]
+        assert stored["title"] == "again" and stored["created_at"] == products[0]["created_at"]
+        assert [p["id"] for p in await repo.list_products(None, 10)] == order
+
+    run_with(new_repo, check)
+
+
+def test_order_status_is_compare_and_set(new_repo):
+    async def check(repo):
+        await repo.insert_order(make_order("o1"))
+        assert await repo.set_order_status("o1", "pending_payment", expected="created")
+        assert not await repo.set_order_status("o1", "cancelled", expected="created")
+        assert (await repo.get_order("o1"))["status"] == "pending_payment"
+        assert not await repo.set_order_status("missing", "paid")
+
+    run_with(new_repo, check)
+
+
+def test_rollups_add_up(new_repo):
+    async def check(repo):
+        key = {"day": "2024-01-01", "category": "all", "delivery_method": "digital", "status": "paid"}
+        await repo.add_rollups([{**key, "orders": 1, "units": 2, "revenue_cents": 500}])
+        await repo.add_rollups([{**key, "orders": 1, "units": 1, "revenue_cents": 250}, {**key, "day": "2024-01-03", "orders": 1}])
+        [row] = await repo.rollups("2024-01-01", "2024-01-02")
+        assert {k: row[k] for k in ("orders", "units", "revenue_cents")} == {"orders": 2, "units": 3, "revenue_cents": 750}
+
+    run_with(new_repo, check)
+
+
+def test_take_stock_never_goes_negative(new_repo):
+    async def check(repo):
+        await repo.set_inventory("p01", [2, 1])
+        assert await repo.take_stock("p01", 0, 2)
+        assert not await repo.take_stock("p01", 0, 1)
+        assert await repo.take_stock("p01", 1, 1)
+        assert not await repo.take_stock("untracked", 0, 1)
+        await repo.return_stock("p01", 0, 1)
+        assert await repo.inventory(["p01", "untracked"]) == {"p01": [1, 0]}
+
+    run_with(new_repo, check)
+
+
+def test_reservations_are_claimed_once(new_repo):
+    async def check(repo):
+        now = datetime.now(timezone.utc)
+        items = [{"product_id": "p01", "shard": 0, "quantity": 2}]
+        await repo.insert_reservation({"order_id": "o1", "items": items, "expires_at": now - timedelta(seconds=1)})
+        await repo.insert_reservation({"order_id": "o2", "items": items, "expires_at": now - timedelta(seconds=1)})
+        await repo.keep_reservation("o2")
+        assert [r["order_id"] for r in await repo.expired_reservations(now, 10)] == ["o1"]
+        assert (await repo.claim_reservation("o1"))["items"] == items
+        assert await repo.claim_reservation("o1") is None
+        assert await repo.expired_reservations(now, 10) == []
+
+    run_with(new_repo, check)
+
+
+def test_download_bytes_accumulate(new_repo):
+    async def check(repo):
+        assert await repo.add_download_bytes("o1", "p1", 100) == 100
+        assert await repo.add_download_bytes("o1", "p1", 50) == 150
+        assert await repo.add_download_bytes("o1", "p1", -50) == 100
+        assert await repo.add_download_bytes("o2", "p1", 10) == 10
+
+    run_with(new_repo, check)
+
+
+def test_catalog_version_is_shared(new_repo):
+    async def check(repo):
+        writer, reader = CatalogVersion(repo), CatalogVersion(repo)
+        assert await repo.catalog_version() is None
+        assert await writer.bump() == 1 and await writer.bump() == 2
+        assert await reader.load() and reader.stamp == writer.stamp
+        assert reader.etag("/api/products?") == writer.etag("/api/products?")
+        assert not await reader.load()
+
+    run_with(new_repo, check)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="redis"):
+        create_repository("redis")
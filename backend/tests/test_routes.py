@@ -0,0 +1,250 @@
+import base64
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.backend import server
+from app.backend.auth.jwt_handler import create_jwt_token
+from app.backend.core.downloads import AssetStore
+from app.backend.core.images import ImageStore
+from app.backend.core.snapshot import SnapshotStore
+
+ADMIN = {"Authorization": "Bearer " + create_jwt_token({"sub": "admin@example.com", "role": "admin"})}
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(server, "download_assets", AssetStore(str(tmp_path)))
+    with TestClient(server.app) as client:
+        yield client
+
+
+async def one_chunk(data):
+    yield data
+
+
+def paid_download(client, filename):
+    product = next(p for p in client.get("/api/products").json() if p["category_slug"] == "digital")
+    client.portal.call(server.download_assets.save, product["id"], filename, one_chunk(b"0123456789"))
+    order = client.post(
+        "/api/orders",
+        json={"email": "a@example.com", "name": "A", "items": [{"product_id": product["id"], "quantity": 1}]},
+    ).json()
+    assert client.post(f"/api/admin/orders/{order['id']}/status", json={"status": "paid"}, headers=ADMIN).status_code == 200
+    [link] = client.post(f"/api/orders/{order['id']}/downloads").json()
+    return product, link
+
+
+def test_download_headers_name_the_file(client, monkeypatch):
+    _, link = paid_download(client, "pack.zip")
+    response = client.get(link["url"])
+    assert response.status_code == 200 and response.content == b"0123456789"
+    assert response.headers["content-disposition"] == 'attachment; filename="pack.zip"'
+
+    _, link = paid_download(client, "café pack.zip")
+    assert client.get(link["url"]).headers["content-disposition"] == "attachment; filename*=utf-8''caf%C3%A9%20pack.zip"
+
+    monkeypatch.setattr(server.settings, "DOWNLOAD_ACCEL_PREFIX", "/protected/")
+    product, link = paid_download(client, "pack.zip")
+    assert client.get(link["url"]).headers["x-accel-redirect"] == f"/protected/{product['id']}/pack.zip"
+
+
+def test_product_import_is_admin_only(client):
+    product = client.get("/api/products").json()[0]
+    row = json.dumps({**product, "price": 0.01})
+    customer = {"Authorization": "Bearer " + create_jwt_token({"sub": "a@example.com"})}
+    assert client.post("/api/admin/products/import", content=row).status_code == 403
+    assert client.post("/api/admin/products/import", content=row, headers=customer).status_code == 403
+    assert client.get(f"/api/products/{product['id']}").json()["price"] == product["price"]
+
+    response = client.post("/api/admin/products/import", content=row, headers=ADMIN)
+    assert response.status_code == 200 and response.json()["upserted"] == 1
+    assert client.get(f"/api/products/{product['id']}").json()["price"] == 0.01
+
+
+def test_catalog_reads_revalidate_until_the_catalog_changes(client):
+    first = client.get("/api/products")
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["last-modified"]
+    repeat = client.get("/api/products", headers={"If-None-Match": etag})
+    assert repeat.status_code == 304 and repeat.headers["etag"] == etag and not repeat.content
+    # Each representation has its own tag
+    assert client.get("/api/products?limit=1").headers["etag"] != etag
+
+    created = client.post(
+        "/api/products", json={"title": "New", "description": "d", "price": 1.0, "category_slug": "digital"}
+    ).json()
+    changed = client.get("/api/products", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert changed.json()[0]["id"] == created["id"]
+
+
+def test_cancelling_a_paid_order_returns_its_stock(client):
+    product = next(p for p in client.get("/api/products").json() if p["category_slug"] == "prints")
+    stock = f"/api/admin/inventory/{product['id']}"
+    assert client.put(stock, json={"quantity": 5, "shards": 2}, headers=ADMIN).status_code == 200
+    order = client.post(
+        "/api/orders",
+        json={"email": "a@example.com", "name": "A", "items": [{"product_id": product["id"], "quantity": 3}]},
+    ).json()
+    status = f"/api/admin/orders/{order['id']}/status"
+    assert client.post(status, json={"status": "paid"}, headers=ADMIN).status_code == 200
+    assert client.get(stock, headers=ADMIN).json()["available"] == 2
+    assert client.post(status, json={"status": "cancelled"}, headers=ADMIN).status_code == 200
+    assert client.get(stock, headers=ADMIN).json()["available"] == 5
+
+
+def test_ranges_count_toward_the_download_limit(client, monkeypatch):
+    monkeypatch.setattr(server.download_limiter, "limit", 1)
+    _, link = paid_download(client, "pack.zip")
+    assert client.get(link["url"]).status_code == 200
+    # Skipping byte 0 does not get the file sent again for free
+    assert client.get(link["url"], headers={"Range": "bytes=1-"}).status_code == 429
+
+
+def test_stale_snapshot_carries_no_validators(tmp_path, monkeypatch):
+    snapshots = SnapshotStore(str(tmp_path / "catalog.snap"), server.load_catalog_snapshot)
+    monkeypatch.setattr(server, "catalog_snapshot", snapshots)
+    with TestClient(server.app) as client:
+        client.portal.call(server.catalog_version.bump)
+
+        async def unavailable(limit):
+            raise ConnectionError("store down")
+
+        monkeypatch.setattr(server.repository, "list_categories", unavailable)
+        response = client.get("/api/categories")
+    assert response.status_code == 200 and response.json()
+    assert response.headers["warning"] == '110 - "Response is Stale"'
+    assert "etag" not in response.headers and "last-modified" not in response.headers
+
+
+def test_slow_ops_lists_newest_first(client):
+    for path in ("/api/products", "/api/orders"):
+        server.slow_ops.record(
+            {"method": "GET", "route": path, "path": path, "params": {}, "duration_ms": 750.0, "queries": []}
+        )
+    assert client.get("/api/admin/slow-ops").status_code == 403
+    response = client.get("/api/admin/slow-ops?limit=2", headers=ADMIN)
+    assert response.status_code == 200
+    assert [entry["route"] for entry in response.json()] == ["/api/orders", "/api/products"]
+
+
+def checkout_items(client):
+    product = next(p for p in client.get("/api/products").json() if p["category_slug"] == "digital")
+    return {"email": "a@example.com", "name": "A", "items": [{"product_id": product["id"], "quantity": 1}]}
+
+
+def test_checkout_stores_a_pending_order_with_its_session(client):
+    response = client.post("/api/checkout", json=checkout_items(client))
+    assert response.status_code == 200
+    order, session = response.json()["order"], response.json()["session"]
+    assert order["status"] == "pending_payment" and session["order_id"] == order["id"]
+    stored = client.portal.call(server.repository.get_order, order["id"])
+    assert stored["status"] == "pending_payment" and stored["total"] == order["total"]
+    assert server.repository.checkout_sessions[session["id"]]["order_id"] == order["id"]
+
+
+def test_checkout_drops_the_session_when_the_order_insert_fails(client, monkeypatch):
+    async def unavailable(doc):
+        raise ConnectionError("store down")
+
+    opened = []
+    insert_session = server.repository.insert_checkout_session
+
+    async def track(doc):
+        opened.append(doc["id"])
+        await insert_session(doc)
+
+    monkeypatch.setattr(server.repository, "insert_order", unavailable)
+    monkeypatch.setattr(server.repository, "insert_checkout_session", track)
+    with pytest.raises(ConnectionError):
+        client.post("/api/checkout", json=checkout_items(client))
+    [session_id] = opened
+    assert session_id not in server.repository.checkout_sessions
+
+
+def test_image_urls_carry_their_quality(client, tmp_path, monkeypatch):
+    images = ImageStore(str(tmp_path / "images"), widths=(320,), formats=("jpeg",), quality=70)
+    monkeypatch.setattr(server, "image_store", images)
+    out = io.BytesIO()
+    Image.new("RGB", (640, 320)).save(out, "JPEG")
+    [variant] = client.portal.call(server.image_store.add_original, out.getvalue(), False)["variants"]
+    assert variant["url"].endswith("/320-q70.jpeg")
+    response = client.get(variant["url"])
+    assert response.status_code == 200 and response.headers["cache-control"].endswith("immutable")
+
+    # After a quality change the old URL is gone rather than serving different bytes
+    monkeypatch.setattr(server.image_store, "quality", 85)
+    assert client.get(variant["url"]).status_code == 404
+    assert client.get(variant["url"].replace("-q70", "-q85")).status_code == 200
+
+
+def test_fast_json_matches_the_model_path_on_legacy_documents(client, monkeypatch):
+    created_at = datetime(2023, 5, 1, 12, 30, tzinfo=timezone.utc)
+    # Written before image variants, per-item prices and extra bookkeeping keys were stored
+    product = {
+        "id": "legacy-product", "title": "Old print", "description": "d", "price": 12.5,
+        "category_slug": "prints", "image_url": "https://example.com/a.jpg", "created_at": created_at, "legacy": 1,
+    }
+    order = {
+        "id": "legacy-order", "email": "a@example.com", "name": "A",
+        "items": [{"product_id": "legacy-product", "quantity": 2}], "subtotal": 25.0, "delivery_fee": 0.0, "total": 25.0, "status": "paid", "created_at": created_at,
+    }
+    client.portal.call(server.repository.insert_products, [product])
+    client.portal.call(server.repository.insert_order, order)
+
+    def both(path):
+        monkeypatch.setattr(server.settings, "FAST_JSON_RESPONSES", False)
+        model = client.get(path).json()
+        server.catalog_cache.clear()
+        monkeypatch.setattr(server.settings, "FAST_JSON_RESPONSES", True)
+        return model, client.get(path).json()
+
+    model, fast = both("/api/products/legacy-product")
+    assert fast == model and model["image_variants"] == [] and "legacy" not in fast
+    model, fast = both("/api/orders/legacy-order")
+    assert fast == model and fast["items"][0]["unit_price"] is None and fast["address"] is None
+
+
+def test_product_pages_cover_the_catalog_once(client):
+    total = client.portal.call(server.repository.count_products)
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/products/page", params=params).json()
+        ids += [p["id"] for p in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(ids) == len(set(ids)) == total
+
+    prints = client.get("/api/products/page", params={"category": "prints", "limit": 200}).json()
+    assert prints["items"] and {p["category_slug"] for p in prints["items"]} == {"prints"}
+    assert prints["next_cursor"] is None
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        base64.urlsafe_b64encode(b'["yesterday","p1"]').decode(),
+        base64.urlsafe_b64encode(b'[1700000000,"p1"]').decode(),
+        base64.urlsafe_b64encode(b'{"created_at":"2024-01-01"}').decode(),
+    ],
+)
+def test_bad_page_cursor_is_400(client, cursor):
+    response = client.get("/api/products/page", params={"cursor": cursor})
+    assert response.status_code == 400 and response.json()["detail"] == "Invalid cursor"
+
+
+def test_export_streams_one_product_per_line(client):
+    response = client.get("/api/products/export", params={"category": "digital"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    page = client.get("/api/products/page", params={"category": "digital", "limit": 200}).json()
+    assert [row["id"] for row in rows] == [p["id"] for p in page["items"]]
+    assert {row["category_slug"] for row in rows} == {"digital"}
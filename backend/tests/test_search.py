@@ -0,0 +1,33 @@
+from app.backend.core.search import SearchIndex, tokenize
+
+PRODUCTS = [
+    {"id": "1", "title": "Geometric Poster Pack", "description": "Abstract poster designs in PNG", "category_slug": "digital"},
+    {"id": "2", "title": "A2 Geometric Print", "description": "High contrast composition", "category_slug": "prints"},
+    {"id": "3", "title": "Posters (Local)", "description": "Large-format posters printed locally", "category_slug": "local"},
+]
+
+def make_index():
+    index = SearchIndex()
+    index.add_many(PRODUCTS)
+    return index
+
+def test_tokenize_is_case_insensitive_and_ignores_regex_chars():
+    assert tokenize("Geo.*metric (A2)") == ["geo", "metric", "a2"]
+
+def test_search_matches_description_and_ranks_title_higher():
+    index = make_index()
+    assert index.search("abstract") == ["1"]
+    assert index.search("geometric")[0] in {"1", "2"}
+    assert set(index.search("geometric")) == {"1", "2"}
+
+def test_prefix_typo_and_category_filter():
+    index = make_index()
+    assert set(index.search("geom")) == {"1", "2"}
+    assert set(index.search("geometirc")) == {"1", "2"}
+    assert index.search("geometric", category="prints") == ["2"]
+
+def test_remove_drops_document():
+    index = make_index()
+    index.remove("2")
+    assert index.search("contrast") == []
+    assert set(index.search("geometric")) == {"1"}
@@ -0,0 +1,47 @@
+import asyncio
+from passlib.context import CryptContext
+from app.backend.core.security import PasswordHasher
+
+def test_hash_and_verify_off_loop():
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=4), max_workers=2)
+
+    async def run():
+        hashed = await hasher.hash("s3cret")
+        results = await asyncio.gather(*(hasher.verify("s3cret", hashed) for _ in range(4)), hasher.verify("nope", hashed))
+        return results
+
+    assert asyncio.run(run()) == [True, True, True, True, False]
+    stats = hasher.stats()
+    assert stats["completed"] == 6
+    assert stats["max_queued"] >= 1
+
+def test_outdated_hash_is_rehashed_in_background():
+    old = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=5))
+    stored = []
+
+    async def save(new_hash):
+        stored.append(new_hash)
+
+    async def run():
+        assert await hasher.verify("s3cret", old.hash("s3cret"), on_rehash=save)
+        await asyncio.gather(*hasher._background)
+
+    asyncio.run(run())
+    assert len(stored) == 1
+    assert "$05$" in stored[0]
+
+def test_failed_rehash_is_logged_and_counted(caplog):
+    old = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4)
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=5))
+
+    async def save(new_hash):
+        raise ConnectionError("store down")
+
+    async def run():
+        assert await hasher.verify("s3cret", old.hash("s3cret"), on_rehash=save)
+        await asyncio.gather(*hasher._background)
+
+    asyncio.run(run())
+    assert (hasher.stats()["rehashed"], hasher.stats()["rehash_failures"]) == (0, 1)
+    assert "Background password rehash failed" in caplog.text
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+from types import SimpleNamespace
+
+from app.backend.core.slowlog import QueryRecorder, SlowOpLog, SlowRequestMiddleware
+
+
+def slow_log(name):
+    return SlowOpLog(logging.getLogger(f"test.slowlog.{name}"))
+
+
+def find_event(request_id, **command):
+    return SimpleNamespace(
+        command_name="find",
+        command={"find": "products", **command},
+        connection_id=("db.local", 27017),
+        request_id=request_id,
+        duration_micros=2500,
+    )
+
+
+def run_request(middleware, path="/api/products/p1", query=b"", path_params=None, sent=None):
+    """Send one GET through ``middleware`` and wait for the slow-op entry to be written."""
+    sent = [] if sent is None else sent
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        scope = {"type": "http", "method": "GET", "path": path, "query_string": query}
+        if path_params is not None:
+            scope["path_params"] = path_params
+        await middleware(scope, receive, send)
+        await asyncio.gather(*middleware._finishing)
+
+    asyncio.run(run())
+    return sent
+
+
+def responding_app(recorder=None, filter=None):
+    async def app(scope, receive, send):
+        if recorder is not None:
+            # Motor runs pymongo on an executor thread with a copy of the request's context
+            def query():
+                recorder.started(find_event(1, filter=filter or {}))
+                recorder.succeeded(find_event(1))
+
+            await asyncio.to_thread(query)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app
+
+
+def test_only_requests_over_the_threshold_are_logged():
+    log = slow_log("threshold")
+    run_request(SlowRequestMiddleware(responding_app(), log, threshold=60))
+    assert log.entries() == []
+    run_request(SlowRequestMiddleware(responding_app(), log, threshold=0))
+    [entry] = log.entries()
+    assert (entry["method"], entry["path"], entry["status"]) == ("GET", "/api/products/p1", 200)
+
+
+def test_queries_are_attributed_to_their_request():
+    log, recorder = slow_log("queries"), QueryRecorder()
+    run_request(SlowRequestMiddleware(responding_app(recorder, {"id": "p1"}), log, threshold=0))
+    [query] = log.entries()[0]["queries"]
+    assert query == {"command": "find", "collection": "products", "filter": {"id": "p1"}, "duration_ms": 2.5}
+    # Outside a request nothing is recorded
+    recorder.started(find_event(2))
+    assert recorder._pending == {}
+
+
+def test_params_are_captured_with_credentials_redacted():
+    log = slow_log("params")
+    middleware = SlowRequestMiddleware(responding_app(), log, threshold=0)
+    run_request(
+        middleware, path="/api/downloads/secret-link", query=b"limit=5&api_key=k1", path_params={"token": "secret-link"}
+    )
+    entry = log.entries()[0]
+    assert entry["params"] == {"token": "[redacted]", "limit": "5", "api_key": "[redacted]"}
+    assert entry["path"] == "/api/downloads/[redacted]"
+    assert "secret-link" not in json.dumps(entry) and "k1" not in json.dumps(entry)
+
+
+def test_explain_runs_after_the_response_is_sent():
+    log, recorder = slow_log("explain"), QueryRecorder()
+    sent, explained = [], []
+
+    async def explain(query):
+        explained.append((query, [m["type"] for m in sent]))
+        return {"stage": "IXSCAN"}
+
+    middleware = SlowRequestMiddleware(responding_app(recorder, {"id": "p1"}), log, threshold=0, explain=explain)
+    run_request(middleware, sent=sent)
+    [(query, seen)] = explained
+    assert seen == ["http.response.start", "http.response.body"]
+    assert query["collection"] == "products" and query["filter"] == {"id": "p1"}
+    assert log.entries()[0]["queries"][0]["explain"] == {"stage": "IXSCAN"}
+
+
+def test_jsonl_file_rotates(tmp_path):
+    path = tmp_path / "slow.jsonl"
+    log = SlowOpLog(logging.getLogger("test.slowlog.rotation"), path=str(path), max_bytes=300, backups=2)
+    entry = {"method": "GET", "route": "/api/products", "duration_ms": 900.0, "queries": [], "params": {}}
+    for i in range(10):
+        log.record({**entry, "path": f"/api/products?page={i}"})
+    rotated = sorted(p.name for p in tmp_path.iterdir())
+    assert rotated == ["slow.jsonl", "slow.jsonl.1", "slow.jsonl.2"]
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert lines and lines[-1]["path"] == "/api/products?page=9"
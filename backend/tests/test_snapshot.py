@@ -0,0 +1,47 @@
+import asyncio
+import json
+from app.backend.core.snapshot import CatalogSnapshot, SnapshotStore, write_snapshot
+
+PRODUCTS = [
+    {"id": f"p{i}", "title": f"Product {i}", "category_slug": ("digital", "prints")[i % 2]} for i in range(5, 0, -1)
+]
+CATEGORIES = [{"id": "c1", "name": "Digital", "slug": "digital"}]
+
+def test_snapshot_round_trip(tmp_path):
+    path = str(tmp_path / "catalog.snap")
+    write_snapshot(path, (3, 1700000000.0), CATEGORIES, PRODUCTS)
+    snapshot = CatalogSnapshot(path)
+    assert snapshot.stamp == (3, 1700000000.0) and len(snapshot) == 5
+    assert json.loads(snapshot.categories_json()) == CATEGORIES
+    assert json.loads(snapshot.product_json("p2")) == PRODUCTS[3]
+    assert snapshot.product_json("missing") is None
+    assert [p["id"] for p in json.loads(snapshot.list_json(limit=2))] == ["p5", "p4"]
+    assert [p["id"] for p in json.loads(snapshot.list_json("prints", 10))] == ["p5", "p3", "p1"]
+    assert json.loads(snapshot.list_json("local")) == []
+    assert [p["id"] for p in json.loads(snapshot.products_json(["p1", "nope", "p4"]))] == ["p1", "p4"]
+
+def test_store_rebuilds_only_for_new_stamps(tmp_path):
+    loads = []
+
+    async def load():
+        loads.append(1)
+
+        async def products():
+            for doc in PRODUCTS:
+                yield doc
+
+        return CATEGORIES, products()
+
+    async def run():
+        store = SnapshotStore(str(tmp_path / "catalog.snap"), load)
+        await store.refresh((1, 10.0))
+        await store.refresh((1, 10.0))
+        assert store.fresh((1, 10.0)) is not None and len(loads) == 1
+        # A second worker maps the file the first one wrote
+        other = SnapshotStore(store.path, load)
+        await other.refresh((1, 10.0))
+        assert (other.reloads, len(loads)) == (1, 1)
+        await asyncio.gather(store.refresh((2, 20.0)), store.refresh((3, 30.0)))
+        assert store.current.stamp == (3, 30.0) and store.fresh((2, 20.0)) is None
+
+    asyncio.run(run())
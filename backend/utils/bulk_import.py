@@ -0,0 +1,316 @@
+"""Streaming product import from NDJSON or CSV.
+
+Rows are parsed and validated one at a time and written through the storage
+repository in bounded batches, so memory stays flat regardless of input size. Rows
+carrying an ``id`` are upserted (keeping the stored ``created_at``); the rest are
+inserted with a new id.
+
+    python -m app.backend.utils.bulk_import products.csv --format csv
+
+The command line writes to the STORAGE_BACKEND store, like the server, and bumps
+the catalog version after every batch; running workers see the new version on
+their next poll (CATALOG_VERSION_REFRESH) and drop their caches and snapshot.
+"""
+import asyncio
+import csv
+import json
+import time
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from app.backend.core.catalog_version import CatalogVersion
+
+MAX_REPORTED_ERRORS = 1000
+MAX_LINE_BYTES = 1024 * 1024
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+async def iter_lines(
+    chunks: AsyncIterator[bytes], max_line_bytes: int = MAX_LINE_BYTES
+) -> AsyncIterator[Union[str, ValueError]]:
+    """Split a streamed request body into text lines.
+
+    A line that is not UTF-8 or longer than ``max_line_bytes`` is yielded as a
+    ``ValueError`` so it is reported as a row error; the bytes of an overlong
+    line are dropped as they arrive rather than buffered.
+    """
+    buffer = b""
+    overlong = False
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if overlong:
+                overlong = False
+                yield ValueError(f"line longer than {max_line_bytes} bytes")
+            else:
+                yield _decode(line, max_line_bytes)
+        if len(buffer) > max_line_bytes:
+            overlong, buffer = True, b""
+    if overlong:
+        yield ValueError(f"line longer than {max_line_bytes} bytes")
+    elif buffer:
+        yield _decode(buffer, max_line_bytes)
+
+
+def _decode(line: bytes, max_line_bytes: int) -> Union[str, ValueError]:
+    if len(line) > max_line_bytes:
+        return ValueError(f"line longer than {max_line_bytes} bytes")
+    try:
+        return line.decode("utf-8").rstrip("\r")
+    except UnicodeDecodeError as exc:
+        return ValueError(f"invalid UTF-8 at byte {exc.start}")
+
+
+async def iter_file_lines(path: str, max_line_bytes: int = MAX_LINE_BYTES) -> AsyncIterator[Union[str, ValueError]]:
+    async def chunks() -> AsyncIterator[bytes]:
+        with open(path, "rb") as fh:
+            while chunk := fh.read(FILE_CHUNK_SIZE):
+                yield chunk
+
+    async for line in iter_lines(chunks(), max_line_bytes):
+        yield line
+
+
+class _LineFeed:
+    """Lines waiting for the csv reader; it is only asked for a row once the row is complete."""
+
+    def __init__(self):
+        self.lines: Deque[str] = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def parse_rows(lines: AsyncIterator[Union[str, ValueError]], fmt: str) -> AsyncIterator[Tuple[int, object]]:
+    """Yield ``(row_number, row)``; rows that fail to parse are yielded as the exception.
+
+    ``lines`` may carry a ``ValueError`` in place of a line that could not be
+    read; it becomes that row's error.
+    """
+    header: Optional[List[str]] = None
+    row_number = 0
+    # One reader for the whole stream so quoted cells may span lines
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    quotes = 0
+    first = True
+    async for line in lines:
+        if isinstance(line, ValueError):
+            # Whatever CSV row the line belonged to is lost with it
+            feed.lines.clear()
+            quotes = 0
+            first = False
+            row_number += 1
+            yield row_number, line
+            continue
+        if first:
+            # Excel and Notepad exports start with a UTF-8 byte order mark
+            line, first = line.lstrip("\ufeff"), False
+        if not feed.lines and not line.strip():
+            continue
+        if fmt == "csv":
+            feed.lines.append(line + "\n")
+            # An odd number of quote characters so far means a quoted cell is still open
+            quotes += line.count('"')
+            if quotes % 2:
+                continue
+            quotes = 0
+            try:
+                values = next(reader)
+            except csv.Error as exc:
+                feed.lines.clear()
+                row_number += 1
+                yield row_number, ValueError(str(exc))
+                continue
+            if header is None:
+                header = [h.strip() for h in values]
+                continue
+            row_number += 1
+            if len(values) != len(header):
+                yield row_number, ValueError(f"expected {len(header)} columns, got {len(values)}")
+                continue
+            # Empty CSV cells mean "not set" rather than an empty string
+            yield row_number, {k: v for k, v in zip(header, values) if v != ""}
+        else:
+            row_number += 1
+            try:
+                yield row_number, json.loads(line)
+            except ValueError as exc:
+                yield row_number, exc
+    if feed.lines:
+        yield row_number + 1, ValueError("unterminated quoted field at end of input")
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.upserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_error(self, row: int, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": error})
+
+    @property
+    def rows_per_second(self) -> float:
+        return round(self.rows / self.elapsed, 1) if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": self.rows_per_second,
+        }
+
+
+async def _flush(repository, batch: List[Tuple[int, dict, bool]], report: ImportReport, on_batch) -> None:
+    errors = await repository.write_products([(doc, upsert) for _, doc, upsert in batch])
+    failed_rows = set()
+    for index, message in sorted(errors.items()):
+        row = batch[index][0]
+        failed_rows.add(row)
+        report.add_error(row, message)
+    written = [doc for row, doc, _ in batch if row not in failed_rows]
+    for row, _, upsert in batch:
+        if row in failed_rows:
+            continue
+        if upsert:
+            report.upserted += 1
+        else:
+            report.inserted += 1
+    if on_batch and written:
+        await on_batch(written)
+
+
+async def import_products(
+    repository,
+    rows: AsyncIterator[Tuple[int, object]],
+    to_doc: Callable[[dict], dict],
+    batch_size: int = 500,
+    on_batch: Optional[Callable[[List[dict]], object]] = None,
+) -> ImportReport:
+    """Validate ``rows`` with ``to_doc`` and write them to ``repository`` in batches.
+
+    ``to_doc`` turns a raw row into the stored document and raises
+    ``ValidationError``/``ValueError`` for bad input. ``on_batch`` is awaited
+    with the documents of each written batch.
+    """
+    report = ImportReport()
+    batch = []
+    async for row_number, row in rows:
+        report.rows += 1
+        if isinstance(row, Exception):
+            report.add_error(row_number, f"unparseable row: {row}")
+            continue
+        if not isinstance(row, dict):
+            report.add_error(row_number, "row must be an object")
+            continue
+        try:
+            doc = to_doc(row)
+        except ValidationError as exc:
+            report.add_error(row_number, "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()))
+            continue
+        except ValueError as exc:
+            report.add_error(row_number, str(exc))
+            continue
+        batch.append((row_number, doc, bool(row.get("id"))))
+        if len(batch) >= batch_size:
+            await _flush(repository, batch, report, on_batch)
+            batch = []
+    if batch:
+        await _flush(repository, batch, report, on_batch)
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+async def import_file(
+    repository,
+    path: str,
+    fmt: str,
+    to_doc: Callable[[dict], dict],
+    batch_size: int = 500,
+    max_line_bytes: int = MAX_LINE_BYTES,
+) -> ImportReport:
+    """Import the file at ``path``, bumping the catalog version after each written batch."""
+    version = CatalogVersion(repository)
+
+    async def changed(docs: List[dict]) -> None:
+        await version.bump()
+
+    rows = parse_rows(iter_file_lines(path, max_line_bytes), fmt)
+    return await import_products(repository, rows, to_doc, batch_size=batch_size, on_batch=changed)
+
+
+def main():
+    import typer
+
+    from app.backend.core.config import settings
+    from app.backend.db.repository import create_repository
+
+    def run(
+        path: str,
+        format: Optional[str] = typer.Option(None, help="ndjson or csv; guessed from the extension if omitted"),
+        batch_size: int = 500,
+        mongo_url: Optional[str] = None,
+        db_name: Optional[str] = None,
+    ):
+        from app.backend.core.images import ImageStore
+        from app.backend.core.products import product_doc_from_row
+
+        fmt = format or ("csv" if path.lower().endswith(".csv") else "ndjson")
+        db = None
+        if settings.STORAGE_BACKEND == "mongo":
+            from app.backend.db.mongo import connect_from_env
+
+            _, db = connect_from_env(mongo_url, db_name)
+        repository = create_repository(settings.STORAGE_BACKEND, db=db)
+        # Only read, to fill image_variants for rows that name an uploaded image_id
+        images = ImageStore(settings.IMAGE_ROOT, settings.IMAGE_WIDTHS, settings.IMAGE_FORMATS, settings.IMAGE_QUALITY)
+
+        async def load() -> ImportReport:
+            await repository.init()
+            try:
+                return await import_file(
+                    repository,
+                    path,
+                    fmt,
+                    lambda row: product_doc_from_row(row, images),
+                    batch_size=batch_size,
+                    max_line_bytes=settings.IMPORT_MAX_LINE_BYTES,
+                )
+            finally:
+                await repository.close()
+
+        report = asyncio.run(load())
+        for error in report.errors:
+            typer.echo(f"row {error['row']}: {error['error']}", err=True)
+        typer.echo(
+            f"{report.rows} rows: {report.inserted} inserted, {report.upserted} upserted, {report.failed} failed "
+            f"in {report.elapsed:.2f}s ({report.rows_per_second} rows/s)"
+        )
+        if report.failed:
+            raise typer.Exit(code=1)
+
+    typer.run(run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Convert ISO-string timestamps left by older releases into native BSON dates.
+
+    python -m app.backend.utils.migrate_dates --batch-size 1000
+
+Work is done in ``_id`` order and a checkpoint is stored in the
+``migrations`` collection after every batch, so an interrupted run picks
+up where it stopped. Documents that already hold a date are never touched.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+DATE_FIELDS = {
+    "products": ["created_at"],
+    "orders": ["created_at"],
+}
+
+
+def parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+async def migrate_field(db, collection: str, field: str, batch_size: int = 1000, restart: bool = False) -> dict:
+    checkpoint_id = f"dates:{collection}.{field}"
+    checkpoint = None if restart else await db.migrations.find_one({"_id": checkpoint_id})
+    last_id = checkpoint.get("last_id") if checkpoint else None
+    converted = skipped = 0
+    while True:
+        query = {field: {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[collection].find(query, {field: 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        ops = []
+        for doc in batch:
+            try:
+                value = parse_timestamp(doc[field])
+            except ValueError:
+                skipped += 1
+                logger.warning("%s %s: unparseable %s %r", collection, doc["_id"], field, doc[field])
+                continue
+            # Match on the old value so a concurrent writer is never overwritten
+            ops.append(UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}}))
+        if ops:
+            result = await db[collection].bulk_write(ops, ordered=False)
+            converted += result.modified_count
+        last_id = batch[-1]["_id"]
+        await db.migrations.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"last_id": last_id, "updated_at": datetime.now(timezone.utc)}, "$inc": {"converted": len(ops)}},
+            upsert=True,
+        )
+        logger.info("%s.%s: %d converted so far", collection, field, converted)
+    return {"collection": collection, "field": field, "converted": converted, "skipped": skipped}
+
+
+async def migrate_dates(db, collections: Optional[List[str]] = None, batch_size: int = 1000, restart: bool = False) -> List[dict]:
+    results = []
+    for collection, fields in DATE_FIELDS.items():
+        if collections and collection not in collections:
+            continue
+        for field in fields:
+            results.append(await migrate_field(db, collection, field, batch_size=batch_size, restart=restart))
+    return results
+
+
+def main():
+    import typer
+
+    from app.backend.db.mongo import connect_from_env
+
+    def run(
+        collection: Optional[List[str]] = typer.Option(None, help="Limit to these collections"),
+        batch_size: int = 1000,
+        restart: bool = typer.Option(False, help="Ignore saved checkpoints"),
+        mongo_url: Optional[str] = None,
+        db_name: Optional[str] = None,
+    ):
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        client, db = connect_from_env(mongo_url, db_name)
+        results = asyncio.run(migrate_dates(db, collection, batch_size=batch_size, restart=restart))
+        client.close()
+        for result in results:
+            typer.echo(f"{result['collection']}.{result['field']}: {result['converted']} converted, {result['skipped']} skipped")
+
+    typer.run(run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import base64
+import json
+from datetime import datetime
+from typing import Tuple
+
+# Listing order shared by every keyset-paginated query: newest first, id breaks ties
+PRODUCT_SORT = [("created_at", -1), ("id", -1)]
+
+
+def encode_cursor(doc: dict) -> str:
+    """Opaque cursor pointing just after ``doc`` in PRODUCT_SORT order."""
+    created_at = doc["created_at"]
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, doc["id"]], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(created_at, str) or not isinstance(last_id, str):
+        raise ValueError("Invalid cursor")
+    return created_at, last_id
+
+
+def cursor_position(cursor: str) -> Tuple[datetime, str]:
+    """``(created_at, id)`` of the last document before ``cursor``."""
+    created_at, last_id = decode_cursor(cursor)
+    try:
+        return datetime.fromisoformat(created_at), last_id
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def keyset_filter(after: Tuple[datetime, str]) -> dict:
+    """Mongo filter selecting the documents that follow ``after`` (see ``cursor_position``)."""
+    created_at, last_id = after
+    return {
+        "$or": [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": last_id}},
+        ]
+    }
@@ -2,6 +2,7 @@ import { Card } from "@/components/ui/card";
 import { Button } from "@/components/ui/button";
 import { useCart } from "@/context/CartContext";
 import { Link } from "react-router-dom";
+import { ProductImage } from "@/components/ProductImage";
 
 export const ProductCard = ({ product }) => {
   const { add } = useCart();
@@ -9,7 +10,7 @@ export const ProductCard = ({ product }) => {
     <Card className="group overflow-hidden border hover:shadow-md transition-shadow" data-testid={`product-card-${product.id}`}>
       <Link to={`/product/${product.id}`} className="block" data-testid="product-card-link">
         <div className="aspect-[4/3] overflow-hidden bg-gray-50">
-          <img src={product.image_url} alt={product.title} className="h-full w-full object-cover group-hover:scale-[1.03] transition-transform" />
+          <ProductImage product={product} sizes="(min-width: 1024px) 33vw, (min-width: 640px) 50vw, 100vw" className="h-full w-full object-cover group-hover:scale-[1.03] transition-transform" />
         </div>
       </Link>
       <div className="p-4">
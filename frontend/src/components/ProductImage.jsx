@@ -0,0 +1,33 @@
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+
+// Derivative URLs are served by the API (/api/images/...); remote image_urls are used as-is
+const resolve = (url) => (url && url.startsWith("/") ? `${BACKEND_URL}${url}` : url);
+
+export const ProductImage = ({ product, sizes, className, loading = "lazy" }) => {
+  const variants = product.image_variants || [];
+  const byType = {};
+  for (const v of variants) (byType[v.type] = byType[v.type] || []).push(v);
+  const srcset = (list) => list.map((v) => `${resolve(v.url)} ${v.width}w`).join(", ");
+  const fallback = byType["image/jpeg"] || [];
+  const largest = fallback[fallback.length - 1];
+  return (
+    <picture>
+      {Object.entries(byType)
+        .filter(([type]) => type !== "image/jpeg")
+        .map(([type, list]) => (
+          <source key={type} type={type} srcSet={srcset(list)} sizes={sizes} />
+        ))}
+      <img
+        src={resolve(product.image_url)}
+        srcSet={fallback.length ? srcset(fallback) : undefined}
+        sizes={fallback.length ? sizes : undefined}
+        width={largest ? largest.width : undefined}
+        height={largest ? largest.height : undefined}
+        alt={product.title}
+        loading={loading}
+        decoding="async"
+        className={className}
+      />
+    </picture>
+  );
+};
@@ -5,8 +5,9 @@ import { Textarea } from "@/components/ui/textarea";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import { useCart } from "@/context/CartContext";
 import axios from "axios";
-import { useMemo, useState } from "react";
+import { useEffect, useMemo, useState } from "react";
 import { useNavigate } from "react-router-dom";
+import { ProductImage } from "@/components/ProductImage";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -21,8 +22,24 @@ export default function Checkout(){
   const [loading, setLoading] = useState(false);
   const navigate = useNavigate();
 
-  const deliveryFee = useMemo(()=> deliveryMethod === 'delivery' && items.some(i=>["prints","local"].includes(i.product.category_slug)) ? 7 : 0, [deliveryMethod, items]);
-  const total = useMemo(()=> (subtotal + deliveryFee).toFixed(2), [subtotal, deliveryFee]);
+  const [quote, setQuote] = useState(null);
+
+  // Server-side pricing (no order is written); debounced so quantity clicks coalesce
+  useEffect(()=>{
+    if (items.length === 0) { setQuote(null); return; }
+    const payload = { delivery_method: deliveryMethod, items: items.map(i=>({ product_id: i.product.id, quantity: i.quantity })) };
+    let cancelled = false;
+    const timer = setTimeout(()=>{
+      axios.post(`${API}/quote`, payload).then(r=>{ if (!cancelled) setQuote(r.data); }).catch(()=>{ if (!cancelled) setQuote(null); });
+    }, 250);
+    return ()=>{ cancelled = true; clearTimeout(timer); };
+  },[items, deliveryMethod]);
+
+  // Local estimate until the quote arrives
+  const estimatedFee = useMemo(()=> deliveryMethod === 'delivery' && items.some(i=>["prints","local"].includes(i.product.category_slug)) ? 7 : 0, [deliveryMethod, items]);
+  const shownSubtotal = quote ? quote.subtotal : subtotal;
+  const deliveryFee = quote ? quote.delivery_fee : estimatedFee;
+  const total = (quote ? quote.total : subtotal + estimatedFee).toFixed(2);
 
   const placeOrder = async () => {
     setLoading(true);
@@ -33,12 +50,11 @@ export default function Checkout(){
         address: deliveryMethod==='delivery'?address:null,
         items: items.map(i=>({ product_id: i.product.id, quantity: i.quantity }))
       };
-      const orderRes = await axios.post(`${API}/orders`, payload);
-      const sessionRes = await axios.post(`${API}/checkout/session`, { order_id: orderRes.data.id });
+      const res = await axios.post(`${API}/checkout`, payload);
       clear();
-      navigate(`/success?order=${orderRes.data.id}`);
-      window.open(sessionRes.data.checkout_url, '_blank');
-    }catch(e){ console.error(e); alert('Checkout failed. Please try again.'); }
+      navigate(`/success?order=${res.data.order.id}`);
+      window.open(res.data.session.checkout_url, '_blank');
+    }catch(e){ console.error(e); alert(e.response?.status === 409 ? e.response.data.detail : 'Checkout failed. Please try again.'); }
     finally{ setLoading(false); }
   };
 
@@ -74,7 +90,7 @@ export default function Checkout(){
           <div className="mt-4 space-y-3">
             {items.map(i=> (
               <div key={i.product.id} className="flex items-center gap-3 border rounded-lg p-3" data-testid="summary-item">
-                <img src={i.product.image_url} alt={i.product.title} className="h-14 w-14 object-cover rounded" />
+                <ProductImage product={i.product} sizes="56px" className="h-14 w-14 object-cover rounded" />
                 <div className="flex-1">
                   <div className="font-medium">{i.product.title}</div>
                   <div className="text-xs text-gray-500">Qty {i.quantity}</div>
@@ -83,7 +99,7 @@ export default function Checkout(){
               </div>
             ))}
             <div className="flex items-center justify-between text-sm pt-2">
-              <span>Subtotal</span><span data-testid="summary-subtotal">${subtotal.toFixed(2)}</span>
+              <span>Subtotal</span><span data-testid="summary-subtotal">${shownSubtotal.toFixed(2)}</span>
             </div>
             <div className="flex items-center justify-between text-sm">
               <span>Delivery</span><span data-testid="summary-delivery">${deliveryFee.toFixed(2)}</span>
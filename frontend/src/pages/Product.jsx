@@ -4,6 +4,7 @@ import { useEffect, useState } from "react";
 import { useParams } from "react-router-dom";
 import { Button } from "@/components/ui/button";
 import { useCart } from "@/context/CartContext";
+import { ProductImage } from "@/components/ProductImage";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -27,7 +28,7 @@ export default function Product(){
     <Layout>
       <div className="mx-auto max-w-6xl px-4 py-10 grid md:grid-cols-2 gap-10">
         <div className="rounded-xl overflow-hidden border">
-          <img src={product.image_url} alt={product.title} className="w-full h-full object-cover" />
+          <ProductImage product={product} sizes="(min-width: 768px) 576px, 100vw" loading="eager" className="w-full h-full object-cover" />
         </div>
         <div>
           <h1 className="text-3xl font-bold" data-testid="product-detail-title">{product.title}</h1>